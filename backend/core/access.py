@@ -0,0 +1,84 @@
+# backend/core/access.py
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .models import Material, Schedule, User
+
+GENERATION_KEY = 'material-access:generation'
+
+
+def _generation():
+    return cache.get_or_set(GENERATION_KEY, 1, None)
+
+
+def _index_key(user_id, generation=None):
+    return f'material-access:{generation or _generation()}:{user_id}'
+
+
+def _build_index(user):
+    """
+    (ids, seconds the index stays valid) for what `user` may open, using the
+    same rules view_content always applied. One query (two for trainers).
+    """
+    timeout = settings.MATERIAL_ACCESS_CACHE_TIMEOUT
+    if user.role == 'STUDENT':
+        # Direct grants, batch-level grants, and materials of their batches' courses
+        materials = Material.objects.filter(
+            Q(assigned_users=user) | Q(assigned_batches__students=user) | Q(course__batches__students=user)
+        )
+    elif user.role == 'TRAINER':
+        # Own uploads, public (admin) uploads, and materials of schedules not yet over
+        now = timezone.now()
+        materials = Material.objects.filter(
+            Q(uploader=user) | Q(uploader__isnull=True) | Q(schedule__trainer=user, schedule__end_date__gte=now)
+        )
+        # Expire with the first schedule that ends, since access ends with it
+        ends = Schedule.objects.filter(trainer=user, end_date__gte=now).aggregate(first=Min('end_date'))['first']
+        if ends is not None:
+            timeout = max(1, min(timeout, int((ends - now).total_seconds()) + 1))
+    else:
+        return frozenset(), timeout
+    return frozenset(materials.values_list('id', flat=True).distinct()), timeout
+
+
+def accessible_material_ids(user):
+    """Ids of the materials `user` (a student or trainer) may open, cached per user."""
+    key = _index_key(user.pk)
+    entry = cache.get(key)
+    # The role is part of the entry so a role change can't reuse the old index
+    if entry is None or entry[0] != user.role:
+        ids, timeout = _build_index(user)
+        entry = (user.role, ids)
+        cache.set(key, entry, timeout)
+    return entry[1]
+
+
+def can_view_material(user, material_id):
+    if user.role == 'ADMIN' or user.is_staff:
+        return True
+    return material_id in accessible_material_ids(user)
+
+
+def invalidate_material_access(user_ids):
+    """Drop the cached index of the given users, once the current transaction commits."""
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: cache.delete_many([_index_key(user_id) for user_id in user_ids]))
+
+
+def invalidate_all_material_access():
+    """Start a new generation; every user's index is rebuilt on next use."""
+    def bump():
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError: # Evicted; any fresh value different from the old one works
+            cache.set(GENERATION_KEY, int(timezone.now().timestamp()), None)
+    transaction.on_commit(bump)
+
+
+def batch_student_ids(batch_ids):
+    return User.batches.through.objects.filter(batch_id__in=list(batch_ids)).values_list('user_id', flat=True)
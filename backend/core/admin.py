@@ -5,7 +5,7 @@ from .models import (
     User, College, Material, Schedule, Module, Course, Batch,
     TrainerApplication, EmployeeApplication, Task,
     Bill, Expense, Assessment, StudentAttempt, EmployeeDocument, EducationEntry,
-    WorkExperienceEntry, Certification
+    WorkExperienceEntry, Certification, OutboundEmail, ImportJob
 )
 
 # Register your models here to make them appear in the admin site.
@@ -26,4 +26,6 @@ admin.site.register(StudentAttempt)
 admin.site.register(EmployeeDocument)
 admin.site.register(EducationEntry)
 admin.site.register(WorkExperienceEntry)
-admin.site.register(Certification)
\ No newline at end of file
+admin.site.register(Certification)
+admin.site.register(OutboundEmail)
+admin.site.register(ImportJob)
@@ -0,0 +1,185 @@
+# backend/core/analytics.py
+
+import hashlib
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Assessment, Batch, ModelVersion, Schedule, StudentAttempt, User
+
+# Attempt scores are percentages
+SCORE_RANGE = (0, 100)
+
+
+def score_frequencies(attempts, group_field):
+    """
+    {group: {score: count}} for `attempts`, grouped by `group_field`.
+
+    The database does the heavy lifting with one GROUP BY (group, score);
+    scores are small integers, so each group comes back as at most ~100 rows
+    however many attempts it has.
+    """
+    frequencies = defaultdict(dict)
+    rows = (
+        attempts.filter(**{f'{group_field}__isnull': False})
+        .values_list(group_field, 'score').annotate(n=Count('id')).order_by()
+    )
+    for group, score, count in rows:
+        frequencies[group][score] = count
+    return frequencies
+
+
+def _percentile(scores, cumulative, total, q):
+    # Linear interpolation between closest ranks, like numpy.percentile's default
+    position = q * (total - 1)
+    lower, upper = math.floor(position), math.ceil(position)
+
+    def value_at(rank):
+        for score, running in zip(scores, cumulative):
+            if rank < running:
+                return score
+        return scores[-1]
+
+    low = value_at(lower)
+    return low + (value_at(upper) - low) * (position - lower)
+
+
+def summarize(frequency, bins=10, pass_mark=None):
+    """Histogram, mean, median, p90 and pass rate from a {score: count} table."""
+    pass_mark = settings.ANALYTICS_PASS_MARK if pass_mark is None else pass_mark
+    scores = sorted(frequency)
+    counts = [frequency[score] for score in scores]
+    total = sum(counts)
+    if not total:
+        return {'attempts': 0, 'mean': None, 'median': None, 'p90': None, 'pass_rate': None, 'histogram': []}
+
+    cumulative, running = [], 0
+    for count in counts:
+        running += count
+        cumulative.append(running)
+
+    low, high = min(SCORE_RANGE[0], scores[0]), max(SCORE_RANGE[1], scores[-1])
+    width = (high - low) / bins
+    histogram = [0] * bins
+    for score, count in zip(scores, counts):
+        histogram[min(int((score - low) / width), bins - 1)] += count # Last bucket includes the top score
+
+    return {
+        'attempts': total,
+        'mean': round(sum(score * count for score, count in zip(scores, counts)) / total, 2),
+        'median': round(_percentile(scores, cumulative, total, 0.5), 2),
+        'p90': round(_percentile(scores, cumulative, total, 0.9), 2),
+        'pass_rate': round(sum(count for score, count in zip(scores, counts) if score >= pass_mark) / total, 4),
+        'histogram': [
+            {'start': round(low + i * width, 2), 'end': round(low + (i + 1) * width, 2), 'count': histogram[i]}
+            for i in range(bins)
+        ],
+    }
+
+
+def build_score_report(course=None, assessment_id=None, batch_id=None, bins=10, pass_mark=None):
+    """
+    Score distribution per assessment and per batch (plus overall) for the
+    attempts matching the filters. `course` is the course name assessments
+    are tagged with. A student in several batches counts towards each.
+    """
+    attempts = StudentAttempt.objects.all()
+    if course:
+        # Resolve to ids first so the scan stays on the (assessment, student, score) index
+        attempts = attempts.filter(assessment_id__in=list(Assessment.objects.filter(course=course).values_list('id', flat=True)))
+    if assessment_id:
+        attempts = attempts.filter(assessment_id=assessment_id)
+    if batch_id:
+        attempts = attempts.filter(student__batches=batch_id)
+
+    by_assessment = score_frequencies(attempts, 'assessment_id')
+    by_batch = score_frequencies(attempts, 'student__batches')
+    if batch_id: # The join above would otherwise report the student's other batches too
+        by_batch = {batch_id: by_batch.get(batch_id, {})}
+
+    overall = defaultdict(int)
+    for frequency in by_assessment.values():
+        for score, count in frequency.items():
+            overall[score] += count
+
+    titles = dict(Assessment.objects.filter(id__in=list(by_assessment)).values_list('id', 'title'))
+    names = dict(Batch.objects.filter(id__in=list(by_batch)).values_list('id', 'name'))
+    return {
+        'bins': bins,
+        'pass_mark': settings.ANALYTICS_PASS_MARK if pass_mark is None else pass_mark,
+        'overall': summarize(overall, bins, pass_mark),
+        'assessments': [
+            {'assessment_id': group, 'title': titles.get(group), **summarize(frequency, bins, pass_mark)}
+            for group, frequency in sorted(by_assessment.items())
+        ],
+        'batches': [
+            {'batch_id': group, 'name': names.get(group), **summarize(frequency, bins, pass_mark)}
+            for group, frequency in sorted(by_batch.items())
+        ],
+    }
+
+
+def cached_score_report(**filters):
+    """
+    build_score_report behind the cache. The key carries the ModelVersion
+    stamps of attempts, assessments, batches and users (enrolment), so a new
+    attempt makes the next read recompute instead of waiting for a timeout.
+    """
+    labels = sorted(model._meta.label_lower for model in (StudentAttempt, Assessment, Batch, User))
+    versions = dict(ModelVersion.objects.filter(label__in=labels).values_list('label', 'version'))
+    key = '|'.join([*(f"{label}:{versions.get(label, 0)}" for label in labels), *(f"{k}={v}" for k, v in sorted(filters.items()))])
+    cache_key = 'score-report:' + hashlib.md5(key.encode()).hexdigest()
+
+    report = cache.get(cache_key)
+    if report is None:
+        report = build_score_report(**filters)
+        cache.set(cache_key, report, settings.ANALYTICS_CACHE_TIMEOUT)
+    return report
+
+
+def college_summary(college, now=None):
+    """
+    Headline numbers for one college's dashboard. Every figure is a COUNT
+    over that college's own batches, enrolments and schedules (four
+    aggregate queries), so the cost follows the college's size rather than
+    the platform's.
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    in_college = Q(batches__college=college)
+
+    batches = Batch.objects.filter(college=college).aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(start_date__lte=today, end_date__gte=today)),
+    )
+    students = User.batches.through.objects.filter(batch__college=college).aggregate(
+        total=Count('user', distinct=True),
+    )
+    schedules = Schedule.objects.filter(batch__college=college).aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(start_date__lte=now, end_date__gte=now)),
+        upcoming=Count('id', filter=Q(start_date__gt=now)),
+    )
+    courses = list(
+        college.courses.annotate(
+            batch_count=Count('batches', filter=in_college, distinct=True),
+            student_count=Count('batches__students', filter=in_college, distinct=True),
+        ).order_by('name').values('id', 'name', 'batch_count', 'student_count')
+    )
+    return {
+        'college': college.id,
+        'name': college.name,
+        'student_count': students['total'],
+        'batch_count': batches['total'],
+        'active_batch_count': batches['active'],
+        'course_count': len(courses),
+        'courses_with_batches': sum(1 for course in courses if course['batch_count']),
+        'courses': courses,
+        'schedule_count': schedules['total'],
+        'active_schedule_count': schedules['active'],
+        'upcoming_schedule_count': schedules['upcoming'],
+    }
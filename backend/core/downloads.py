@@ -0,0 +1,226 @@
+# backend/core/downloads.py
+
+import hashlib
+import mimetypes
+import os
+import re
+import secrets
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+RANGE_BLOCK_SIZE = 64 * 1024
+# More (coalesced) ranges than this and the whole file is cheaper for everyone
+MAX_RANGES = 16
+
+_RANGE_SPEC = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+
+
+def parse_range_header(header, size):
+    """
+    Byte ranges requested by a `Range: bytes=...` header as inclusive
+    (start, end) pairs, sorted with overlapping/adjacent ranges merged.
+
+    Returns None when the header is absent or malformed (serve the whole
+    file, as RFC 9110 asks) and [] when no range is satisfiable (416).
+    """
+    if not header:
+        return None
+    unit, _, specs = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not specs:
+        return None
+
+    ranges = []
+    for spec in specs.split(','):
+        match = _RANGE_SPEC.match(spec)
+        if not match or match.groups() == ('', ''):
+            return None
+        first, last = match.groups()
+        if first == '': # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                continue
+            ranges.append((max(size - length, 0), size - 1))
+            continue
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start >= size:
+            continue # Unsatisfiable on its own; others may still be fine
+        ranges.append((start, min(int(last), size - 1) if last else size - 1))
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _read_ranges(file_obj, pieces):
+    """Yield bytes pieces, or (start, end) ranges of `file_obj` read in blocks; closes the file."""
+    try:
+        for piece in pieces:
+            if isinstance(piece, bytes):
+                yield piece
+                continue
+            start, end = piece
+            file_obj.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = file_obj.read(min(RANGE_BLOCK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+    finally:
+        file_obj.close()
+
+
+def _validators(file_field, size):
+    try:
+        modified = int(file_field.storage.get_modified_time(file_field.name).timestamp())
+    except (NotImplementedError, AttributeError):
+        modified = None
+    etag = quote_etag(hashlib.md5(f"{file_field.name}:{size}:{modified}".encode()).hexdigest())
+    return etag, modified
+
+
+def _if_range_matches(header, etag, modified):
+    # If-Range needs a strong match: the exact ETag or the exact Last-Modified date
+    if not header:
+        return True
+    header = header.strip()
+    if header.startswith(('"', 'W/')):
+        return header == etag
+    return modified is not None and parse_http_date_safe(header) == modified
+
+
+def stream_file(request, file_field, content_type, filename, as_attachment):
+    """
+    The pure-Python delivery backend (development, or storages nginx/Apache
+    can't reach): Range / If-Range (single and multi-range), If-None-Match /
+    If-Modified-Since and Accept-Ranges, with bodies streamed in blocks so a
+    seek in a video player only costs the bytes asked for.
+    """
+    size = file_field.size
+    etag, modified = _validators(file_field, size)
+
+    response = get_conditional_response(request, etag=etag, last_modified=modified)
+    ranges = None
+    if response is None:
+        ranges = parse_range_header(request.META.get('HTTP_RANGE'), size)
+        if ranges is not None and not _if_range_matches(request.META.get('HTTP_IF_RANGE'), etag, modified):
+            ranges = None # The client's copy is stale: send the current file whole
+        if ranges is not None and len(ranges) > MAX_RANGES:
+            ranges = None
+
+        if ranges == []:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+        elif ranges is None:
+            response = FileResponse(file_field.open('rb'), content_type=content_type,
+                                    as_attachment=as_attachment, filename=filename)
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            response = StreamingHttpResponse(_read_ranges(file_field.open('rb'), ranges), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+        else:
+            boundary = secrets.token_hex(16)
+            pieces, length = [], 0
+            for start, end in ranges:
+                head = (
+                    f'--{boundary}\r\nContent-Type: {content_type}\r\n'
+                    f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n'
+                ).encode()
+                pieces += [head, (start, end), b'\r\n']
+                length += len(head) + (end - start + 1) + 2
+            pieces.append(f'--{boundary}--\r\n'.encode())
+            length += len(pieces[-1])
+            response = StreamingHttpResponse(
+                _read_ranges(file_field.open('rb'), pieces), status=206,
+                content_type=f'multipart/byteranges; boundary={boundary}',
+            )
+            response['Content-Length'] = str(length)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    if modified is not None:
+        response['Last-Modified'] = http_date(modified)
+    return response
+
+
+def _local_path(file_field):
+    try:
+        return file_field.path
+    except NotImplementedError: # Remote storage; there is no path to hand over
+        return None
+
+
+def nginx_redirect(request, file_field, content_type, filename, as_attachment):
+    """
+    Hand the transfer to nginx with X-Accel-Redirect. nginx serves the file
+    from an `internal` location (FILE_DELIVERY_INTERNAL_URL aliased to
+    MEDIA_ROOT) and takes care of Range, If-Range and validators itself.
+    """
+    if _local_path(file_field) is None:
+        return stream_file(request, file_field, content_type, filename, as_attachment)
+    response = HttpResponse(content_type=content_type)
+    response['X-Accel-Redirect'] = settings.FILE_DELIVERY_INTERNAL_URL.rstrip('/') + '/' + quote(file_field.name)
+    return response
+
+
+def apache_sendfile(request, file_field, content_type, filename, as_attachment):
+    """Hand the transfer to Apache mod_xsendfile with an X-Sendfile header (absolute path)."""
+    path = _local_path(file_field)
+    if path is None:
+        return stream_file(request, file_field, content_type, filename, as_attachment)
+    response = HttpResponse(content_type=content_type)
+    response['X-Sendfile'] = path
+    return response
+
+
+DELIVERY_BACKENDS = {
+    'python': stream_file,
+    'nginx': nginx_redirect,
+    'apache': apache_sendfile,
+}
+
+
+def download_name(label, field_file):
+    """
+    A readable download name: `label` plus the stored file's extension.
+    Stored names are content hashes, so they make poor filenames.
+    """
+    label = ' '.join(str(label or '').split()) or 'download'
+    return label + os.path.splitext(field_file.name)[1]
+
+
+def file_response(request, file_field, content_type=None, filename=None, as_attachment=False):
+    """
+    Serve a FileField through the FILE_DELIVERY_BACKEND. Views do their
+    permission checks first; with 'nginx' or 'apache' the worker then only
+    sets a header and the web server moves the bytes.
+
+    Raises FileNotFoundError, like FileField.open(), when the Python backend
+    can't find the file in storage.
+    """
+    filename = filename or os.path.basename(file_field.name)
+    content_type = content_type or mimetypes.guess_type(file_field.name)[0] or 'application/octet-stream'
+    deliver = DELIVERY_BACKENDS.get(settings.FILE_DELIVERY_BACKEND)
+    if deliver is None:
+        raise ImproperlyConfigured(
+            f"FILE_DELIVERY_BACKEND must be one of {', '.join(DELIVERY_BACKENDS)}, not {settings.FILE_DELIVERY_BACKEND!r}."
+        )
+    response = deliver(request, file_field, content_type, filename, as_attachment)
+    if response.status_code in (200, 206):
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    # The file is only readable by whoever passed the view's permission check
+    patch_cache_control(response, private=True)
+    return response
@@ -0,0 +1,231 @@
+# backend/core/filters.py
+
+import datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, Q
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+
+def queryset_plan(serializer, model):
+    """
+    What rendering `serializer` reads from `model` rows, as
+    (select_related paths, prefetch_related paths, root fields for only()).
+    The only() set is None when a field reads something the model doesn't
+    describe (a SerializerMethodField, a method source such as
+    `get_full_name`), since deferring columns would then cost a query per row.
+    """
+    selects, prefetches, only = set(), set(), {model._meta.pk.name}
+    _walk(serializer, model, (), False, selects, prefetches, only)
+    return selects, prefetches, (only if None not in only else None)
+
+
+def _walk(serializer, model, prefix, in_prefetch, selects, prefetches, only):
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        attrs = [] if field.source == '*' else field.source_attrs
+        if not attrs and not prefix:
+            only.add(None)
+        current, path, many = model, prefix, in_prefetch
+        for position, attr in enumerate(attrs):
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                if not prefix and not position: # e.g. `get_full_name`; `students.count` is fine
+                    only.add(None)
+                break
+            if not path and model_field.concrete:
+                only.add(model_field.name)
+            if not model_field.is_relation:
+                break
+            last = position == len(attrs) - 1
+            path = path + (attr,)
+            many = many or model_field.many_to_many or model_field.one_to_many
+            if last and not many and not isinstance(nested, serializers.BaseSerializer):
+                break # A foreign key rendered as its id needs no join
+            (prefetches if many else selects).add('__'.join(path))
+            current = model_field.related_model
+        else:
+            if attrs and isinstance(nested, serializers.BaseSerializer):
+                _walk(nested, current, path, many, selects, prefetches, only)
+
+
+def _covered(path, lookups):
+    return any(lookup == path or lookup.startswith(path + '__') for lookup in lookups)
+
+
+def _trimmed(path, needed):
+    """The longest prefix of `path` that is still needed, or None."""
+    parts = path.split('__')
+    for end in range(len(parts), 0, -1):
+        if '__'.join(parts[:end]) in needed:
+            return '__'.join(parts[:end])
+    return None
+
+
+def _flatten(tree, prefix=''):
+    for name, subtree in tree.items():
+        yield prefix + name
+        yield from _flatten(subtree, f"{prefix}{name}__")
+
+
+def prune_queryset(queryset, serializer, keep=()):
+    """
+    Narrow `queryset` to what `serializer` will read: drop the joins and
+    prefetches of relations that are no longer rendered, add any that are
+    missing, and load only the needed columns where that is safe. A
+    viewset's own Prefetch objects (role-scoped querysets) are kept when
+    their relation is still needed. `keep` names extra root columns to load,
+    such as the ordering fields.
+    """
+    selects, prefetches, only = queryset_plan(serializer, queryset.model)
+    every_select = {
+        '__'.join(path.split('__')[:end]) for path in selects for end in range(1, path.count('__') + 2)
+    }
+
+    lookups = []
+    for lookup in queryset._prefetch_related_lookups:
+        path = lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup
+        if path in prefetches:
+            lookups.append(lookup)
+        elif (trimmed := _trimmed(path, prefetches)) and trimmed not in lookups:
+            lookups.append(trimmed)
+    paths = [lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup for lookup in lookups]
+    lookups += sorted(path for path in prefetches if not _covered(path, paths))
+    queryset = queryset.prefetch_related(None).prefetch_related(*lookups)
+
+    if queryset.query.select_related is not True:
+        existing = set(_flatten(queryset.query.select_related or {}))
+        joins = {path for path in existing if path in every_select} | selects
+        queryset = queryset.select_related(None)
+        if joins:
+            queryset = queryset.select_related(*sorted(joins))
+
+    if only is not None and not queryset.query.annotations:
+        concrete = {field.name for field in queryset.model._meta.concrete_fields}
+        queryset = queryset.only(*sorted(only | (set(keep) & concrete)))
+    return queryset
+
+
+class SparseFieldsFilter(BaseFilterBackend):
+    """
+    Makes `?fields=` / `?expand=` (core.serializers.SparseFieldsMixin)
+    cheap in SQL too: list and retrieve querysets are pruned to the
+    relations and columns the trimmed serializer actually renders.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if (
+            getattr(view, 'action', None) not in ('list', 'retrieve')
+            or ('fields' not in request.query_params and 'expand' not in request.query_params)
+        ):
+            return queryset
+        serializer = view.get_serializer()
+        if getattr(getattr(serializer, 'Meta', None), 'model', None) is not queryset.model:
+            return queryset
+        ordering = [
+            name.lstrip('-') for name in (*queryset.query.order_by, *(getattr(view, 'cursor_ordering', None) or ('id',)))
+            if isinstance(name, str) and '__' not in name
+        ]
+        return prune_queryset(queryset, serializer, keep=ordering)
+
+
+class FilterParam:
+    """
+    One query parameter a viewset filters its list by. The value is
+    validated with a DRF `field` (a bad value is a 400), then applied as
+    `lookup`: a field lookup string, or a callable returning a Q. With
+    `many`, the parameter may repeat or hold comma-separated values
+    (`?role=STUDENT,TRAINER`). `distinct` is for lookups across a to-many
+    relation, which can repeat rows.
+    """
+
+    def __init__(self, lookup, field, many=False, distinct=False):
+        self.lookup, self.field, self.many, self.distinct = lookup, field, many, distinct
+
+    def values(self, request, name):
+        raw = [item.strip() for value in request.query_params.getlist(name) for item in value.split(',')]
+        raw = [item for item in raw if item]
+        if not raw:
+            return None
+        try:
+            values = [self.field.run_validation(item) for item in raw]
+        except serializers.ValidationError as exc:
+            raise ValidationError({name: exc.detail})
+        if len(values) > 1 and not self.many:
+            raise ValidationError({name: ["Only one value is allowed."]})
+        return values
+
+    def q(self, values):
+        if callable(self.lookup):
+            return Q(*(self.lookup(value) for value in values), _connector=Q.OR)
+        if len(values) > 1:
+            return Q(**{f"{self.lookup}__in": values})
+        return Q(**{self.lookup: values[0]})
+
+
+def month_of(field):
+    """Q for `field` (a DateField) falling in the month of the given date: a range, not __month."""
+    def lookup(value):
+        first = value.replace(day=1)
+        following = (first + datetime.timedelta(days=32)).replace(day=1)
+        return Q(**{f"{field}__gte": first, f"{field}__lt": following})
+    return lookup
+
+
+def moment():
+    """A field for instants: ISO datetimes or plain dates (midnight, current time zone)."""
+    return serializers.DateTimeField(input_formats=['iso-8601', '%Y-%m-%d'])
+
+
+def month():
+    """A field for `YYYY-MM`, validated to the first day of that month."""
+    return serializers.DateField(input_formats=['%Y-%m'])
+
+
+class ParamFilter(BaseFilterBackend):
+    """
+    Narrows list querysets by the viewset's declared `filter_params`
+    ({query parameter: FilterParam}); parameters a viewset doesn't declare
+    are ignored.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = getattr(view, 'filter_params', None)
+        if not params or getattr(view, 'action', None) != 'list':
+            return queryset
+        distinct = False
+        for name, param in params.items():
+            values = param.values(request, name)
+            if values is not None:
+                queryset = queryset.filter(param.q(values))
+                distinct = distinct or param.distinct
+        return queryset.distinct() if distinct else queryset
+
+
+class CheckedOrderingFilter(OrderingFilter):
+    """
+    `?ordering=name,-date` over the viewset's declared `ordering_fields`
+    only; anything else is a 400 rather than silently ignored. Keyset pages
+    (core.pagination) follow the same ordering.
+    """
+
+    def get_valid_fields(self, queryset, view, context={}):
+        fields = getattr(view, 'ordering_fields', None) or ()
+        return [(field, field) for field in fields]
+
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        if not params:
+            return self.get_default_ordering(view)
+        terms = [term.strip() for term in params.split(',') if term.strip()]
+        valid = {name for name, _ in self.get_valid_fields(queryset, view, {'request': request})}
+        invalid = [term for term in terms if term.lstrip('-') not in valid]
+        if invalid:
+            allowed = ', '.join(sorted(valid)) or 'none'
+            raise ValidationError({self.ordering_param: [f"Cannot order by {', '.join(invalid)}; allowed: {allowed}."]})
+        return terms
@@ -0,0 +1,203 @@
+# backend/core/importers.py
+
+import secrets
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .access import invalidate_material_access
+from .leaderboard import refresh_leaderboard
+from .models import User, Batch, ImportJob
+from .rosters import chunked, read_roster
+from .search import index_queryset
+from .signals import bump_model_versions, record_access_changes, record_changes
+from .utils import (
+    queue_emails, student_credentials_email, student_activation_email,
+    make_activation_token, uses_activation_links,
+)
+
+
+def split_name(full_name):
+    name_parts = full_name.split(" ", 1)
+    return name_parts[0], name_parts[1] if len(name_parts) > 1 else ""
+
+
+def normalize_roster(rows, seen=None):
+    """
+    Validate and dedupe roster rows given as (row_number, name, email).
+    Returns ({email: (row_number, name)}, errors); the first occurrence of an
+    email wins, including across chunks when the same `seen` set is passed.
+    """
+    seen = set() if seen is None else seen
+    students, errors = {}, []
+    for row_number, name, email in rows:
+        if not name or not email or not isinstance(email, str) or '@' not in email:
+            errors.append(f"Row {row_number}: Missing name or invalid email.")
+            continue
+        email = email.strip().lower()
+        if email in seen:
+            continue # Same student listed twice; enroll once
+        seen.add(email)
+        students[email] = (row_number, str(name).strip())
+    return students, errors
+
+
+IMPORT_CHUNK_SIZE = 1000
+
+
+def import_students(batch, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Set-based roster import: enroll every valid row in `batch`, creating the
+    student accounts that don't exist yet.
+
+    Rows are consumed `chunk_size` at a time, so a streamed roster never has
+    to be held in memory. Per chunk, one query finds existing users, one
+    INSERT creates the new ones, one INSERT writes the batch memberships and
+    one queues the welcome emails. New students get activation links by
+    default (ROSTER_ONBOARDING_MODE), so no password is hashed at all; in
+    'password' mode hashing happens before each chunk's transaction opens so
+    locks are only held for those few statements.
+    Returns the import summary the batch endpoints report.
+    """
+    summary = {'added_to_batch': 0, 'newly_created': 0, 'skipped': 0, 'errors': []}
+    seen = set()
+    for chunk in chunked(rows, chunk_size):
+        chunk_summary = import_student_chunk(batch, chunk, seen)
+        for key in ('added_to_batch', 'newly_created', 'skipped'):
+            summary[key] += chunk_summary[key]
+        summary['errors'].extend(chunk_summary['errors'])
+    return summary
+
+
+def import_student_chunk(batch, rows, seen=None):
+    students, errors = normalize_roster(rows, seen)
+    skipped_count = len(errors)
+
+    existing = {
+        user.username: user
+        for user in User.objects.filter(username__in=list(students)).only('id', 'username', 'role')
+    }
+    for email in list(students):
+        user = existing.get(email)
+        if user is not None and user.role != 'STUDENT':
+            errors.append(f"Row {students[email][0]}: Email {email} exists but is not a student.")
+            skipped_count += 1
+            del students[email]
+
+    activation = uses_activation_links(roster=True)
+    new_users, passwords = [], {}
+    for email, (_, name) in students.items():
+        if email in existing:
+            continue
+        first_name, last_name = split_name(name)
+        if activation:
+            # Unusable password: no hashing now, the student sets one via the link
+            password_hash = make_password(None)
+        else:
+            passwords[email] = secrets.token_urlsafe(8)
+            password_hash = make_password(passwords[email])
+        new_users.append(User(
+            username=email, email=email, first_name=first_name, last_name=last_name,
+            role='STUDENT', must_change_password=True, password=password_hash,
+        ))
+
+    Membership = User.batches.through
+    with transaction.atomic():
+        # ignore_conflicts covers a concurrent import creating the same account;
+        # the re-read below tells our rows apart from theirs by password hash
+        User.objects.bulk_create(new_users, ignore_conflicts=True)
+        hashes = {user.username: user.password for user in new_users}
+        enrolled = list(
+            User.objects.filter(username__in=list(students), role='STUDENT')
+            .only('id', 'username', 'password', 'first_name', 'email')
+        )
+        created = [user for user in enrolled if hashes.get(user.username) == user.password]
+
+        Membership.objects.bulk_create(
+            [Membership(user_id=user.id, batch_id=batch.id) for user in enrolled],
+            ignore_conflicts=True,
+        )
+        if activation:
+            emails = [student_activation_email(user, make_activation_token(user)) for user in created]
+        else:
+            emails = [student_credentials_email(user, passwords[user.username]) for user in created]
+        queue_emails([(subject, message, [user.email]) for (subject, message), user in zip(emails, created)])
+
+        # bulk_create bypasses the model signals, so stamp the changes by hand
+        bump_model_versions([User, Batch])
+        record_changes([('users', user.id) for user in enrolled] + [('batches', batch.id)])
+        record_access_changes([user.id for user in enrolled]) # Their next sync reloads the course they joined
+        index_queryset(User.objects.filter(id__in=[user.id for user in created]))
+        # Returning students bring their scores into the batch/college/course boards
+        created_ids = {user.id for user in created}
+        refresh_leaderboard([user.id for user in enrolled if user.id not in created_ids])
+        # Nor does the membership INSERT fire m2m_changed: the batch's course materials are new to them
+        invalidate_material_access([user.id for user in enrolled])
+
+    return {
+        'added_to_batch': len(enrolled),
+        'newly_created': len(created),
+        'skipped': skipped_count,
+        'errors': errors,
+    }
+
+
+MAX_JOB_ERRORS = 1000
+
+
+def claim_import_job():
+    """
+    Atomically move the oldest PENDING job to RUNNING and return it (or None).
+    A RUNNING job that has not saved progress for IMPORT_JOB_STALE_AFTER seconds
+    (its worker died) is claimed again and resumes after its processed rows.
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.IMPORT_JOB_STALE_AFTER)
+    claimable = Q(status='PENDING') | Q(status='RUNNING', updated_at__lt=stale_before)
+    with transaction.atomic():
+        job = ImportJob.objects.select_for_update(skip_locked=True).filter(claimable).order_by('id').first()
+        if job is None:
+            return None
+        job.status = 'RUNNING'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'updated_at'])
+    return job
+
+
+def run_import_job(job, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Import a stored roster chunk by chunk, saving the counters after each
+    chunk. A requeued job skips the rows it had already imported. A failed
+    CREATE_BATCH job removes its batch if nothing was enrolled.
+    """
+    seen = set()
+    try:
+        with job.file.open('rb') as roster:
+            rows = islice(read_roster(roster), job.rows_processed, None)
+            for chunk in chunked(rows, chunk_size):
+                chunk_summary = import_student_chunk(job.batch, chunk, seen)
+                job.rows_processed += len(chunk)
+                job.added_to_batch += chunk_summary['added_to_batch']
+                job.newly_created += chunk_summary['newly_created']
+                job.skipped += chunk_summary['skipped']
+                job.errors = (job.errors + chunk_summary['errors'])[:MAX_JOB_ERRORS]
+                job.save(update_fields=['rows_processed', 'added_to_batch', 'newly_created', 'skipped', 'errors', 'updated_at'])
+    except Exception as e:
+        job.status = 'FAILED'
+        job.error = str(e)
+        if job.kind == 'CREATE_BATCH' and job.batch and not job.batch.students.exists():
+            job.batch.delete()
+            job.batch = None
+    else:
+        job.status = 'COMPLETED'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'batch', 'finished_at', 'updated_at'])
+    # The roster has been consumed; keep the job row, drop the upload (signals.py releases the file)
+    job.file = ''
+    job.save(update_fields=['file'])
+    return job
+
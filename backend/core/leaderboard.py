@@ -0,0 +1,136 @@
+# backend/core/leaderboard.py
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Assessment, Course, LeaderboardEntry, StudentAttempt, User
+
+SCOPES = ('GLOBAL', 'BATCH', 'COLLEGE', 'COURSE')
+
+
+def assessment_courses(assessment_ids):
+    """
+    Map assessment id -> course id. An assessment belongs to its material's
+    course, else to the course its `course` name tag names (None if neither).
+    """
+    rows = list(Assessment.objects.filter(id__in=set(assessment_ids)).values_list('id', 'material__course_id', 'course'))
+    by_name = dict(Course.objects.filter(name__in={name for _, course_id, name in rows if not course_id}).values_list('name', 'id'))
+    return {assessment_id: course_id or by_name.get(name) for assessment_id, course_id, name in rows}
+
+
+def _course_scopes(memberships):
+    """
+    Map (student id, course id) -> {(scope, scope_id)} from (student, batch,
+    college, course) rows: the boards an attempt in that course counts on.
+    """
+    scopes = {}
+    for student_id, batch_id, college_id, course_id in memberships:
+        keys = scopes.setdefault((student_id, course_id), {('COURSE', course_id)})
+        keys.add(('BATCH', batch_id))
+        if college_id:
+            keys.add(('COLLEGE', college_id))
+    return scopes
+
+
+def _memberships(student_ids, **filters):
+    return (
+        User.batches.through.objects.filter(user_id__in=student_ids, **filters)
+        .values_list('user_id', 'batch_id', 'batch__college_id', 'batch__course_id')
+    )
+
+
+def refresh_leaderboard(student_ids):
+    """
+    Rebuild the leaderboard rows of the given students from their attempts.
+
+    Used when something other than a single attempt moved (batch membership,
+    a batch changing college or course, an edited or deleted attempt, a first
+    attempt). GLOBAL counts every attempt; a BATCH, COLLEGE or COURSE board
+    only attempts at assessments of that course (of the student's batches in
+    that college). Four queries for any number of students, plus the row
+    rewrite. Rows are upserted rather than deleted and re-inserted, so two
+    transactions refreshing the same student both succeed instead of one
+    hitting the unique constraint.
+    """
+    student_ids = set(student_ids)
+    if not student_ids:
+        return
+    groups = list(
+        StudentAttempt.objects.filter(student_id__in=student_ids, student__role='STUDENT')
+        .values_list('student', 'assessment').annotate(total=Sum('score'), count=Count('id'))
+    )
+    course_of = assessment_courses(assessment_id for _, assessment_id, _, _ in groups)
+    scopes = _course_scopes(_memberships({student_id for student_id, *_ in groups}))
+    keys = {}
+    for student_id, assessment_id, total, count in groups:
+        for scope, scope_id in {('GLOBAL', 0)} | scopes.get((student_id, course_of.get(assessment_id)), set()):
+            sums = keys.setdefault((scope, scope_id, student_id), [0, 0])
+            sums[0] += total
+            sums[1] += count
+    # Sorted, so concurrent upserts take their row locks in the same order
+    entries = [
+        LeaderboardEntry(scope=scope, scope_id=scope_id, student_id=student_id, total_score=total, attempts=count)
+        for (scope, scope_id, student_id), (total, count) in sorted(keys.items())
+    ]
+    with transaction.atomic():
+        stale = [
+            entry_id for entry_id, *key in LeaderboardEntry.objects.filter(student_id__in=student_ids)
+            .values_list('id', 'scope', 'scope_id', 'student_id')
+            if tuple(key) not in keys
+        ]
+        if stale:
+            LeaderboardEntry.objects.filter(id__in=stale).delete()
+        LeaderboardEntry.objects.bulk_create(
+            entries, update_conflicts=True, unique_fields=['scope', 'scope_id', 'student'],
+            update_fields=['total_score', 'attempts'],
+        )
+
+
+def record_attempt(attempt):
+    """
+    Add a new attempt's score to the GLOBAL row of its student and to the
+    rows of the boards its course counts on, in a single UPDATE.
+    """
+    course_id = assessment_courses([attempt.assessment_id]).get(attempt.assessment_id)
+    keys = {('GLOBAL', 0)}
+    if course_id:
+        keys |= _course_scopes(_memberships([attempt.student_id], batch__course_id=course_id)).get((attempt.student_id, course_id), set())
+    boards = Q()
+    for scope, scope_id in keys:
+        boards |= Q(scope=scope, scope_id=scope_id)
+    updated = LeaderboardEntry.objects.filter(boards, student_id=attempt.student_id).update(
+        total_score=F('total_score') + attempt.score, attempts=F('attempts') + 1,
+    )
+    if updated < len(keys):
+        # First scored attempt on one of those boards (or a non-student): build the rows
+        refresh_leaderboard([attempt.student_id])
+
+
+def forget_attempt(attempt):
+    """Take a deleted attempt back out; its student's rows are rebuilt, dropping emptied boards."""
+    refresh_leaderboard([attempt.student_id])
+
+
+def top_entries(scope='GLOBAL', scope_id=0, limit=20):
+    return (
+        LeaderboardEntry.objects.filter(scope=scope, scope_id=scope_id)
+        .select_related('student').order_by('-total_score', 'student_id')[:limit]
+    )
+
+
+def rank_of(entry):
+    """1-based rank (ties share a rank); a count over the score index."""
+    return LeaderboardEntry.objects.filter(
+        scope=entry.scope, scope_id=entry.scope_id, total_score__gt=entry.total_score,
+    ).count() + 1
+
+
+def serialize_entry(entry, rank=None):
+    data = {
+        'studentId': entry.student_id,
+        'studentName': f"{entry.student.first_name} {entry.student.last_name}".strip(),
+        'totalScore': entry.total_score,
+    }
+    if rank is not None:
+        data['rank'] = rank
+    return data
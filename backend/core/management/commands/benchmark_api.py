@@ -0,0 +1,134 @@
+# backend/core/management/commands/benchmark_api.py
+
+import gzip
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core import middleware, renderers
+from core.models import College, Course, Material, Module, User
+from core.views import CollegeViewSet, CourseViewSet, UserViewSet
+
+ENDPOINTS = (
+    ('/api/users/', UserViewSet),
+    ('/api/courses/', CourseViewSet),
+    ('/api/colleges/', CollegeViewSet),
+)
+
+
+def cpu_ms(func, repeat):
+    """Best-of-`repeat` CPU time of func() in milliseconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        func()
+        elapsed = (time.process_time() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's stdlib JSON with the orjson renderer/parser and the bytes on the wire "
+        "with gzip/brotli for the large list endpoints. Seeds a dataset inside a transaction "
+        "that is always rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--colleges', type=int, default=20)
+        parser.add_argument('--courses', type=int, default=40)
+        parser.add_argument('--modules', type=int, default=8, help="Modules per course.")
+        parser.add_argument('--materials', type=int, default=6, help="Materials per module.")
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per measurement; the best is reported.")
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            self.stderr.write("orjson is not installed; both columns measure the stdlib encoder.")
+        if middleware.brotli is None:
+            self.stderr.write("brotli is not installed; only gzip is measured.")
+
+        # The requests are built in-process with Host: testserver, which the URL fields'
+        # build_absolute_uri() would reject under the deployment's ALLOWED_HOSTS
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver']):
+            admin = self.seed(options)
+            self.stdout.write(
+                f"{'CPU ms / bytes':<16}{'render json':>12}{'orjson':>8}{'parse json':>12}{'orjson':>8}"
+                f"{'bytes':>10}{'gzip':>9}{'gzip ms':>9}{'br':>9}{'br ms':>7}"
+            )
+            for path, viewset in ENDPOINTS:
+                self.report(path, viewset, admin, options['repeat'])
+            transaction.set_rollback(True) # Leave the database as it was
+
+    def seed(self, options):
+        admin = User(username='benchmark-admin@example.com', email='benchmark-admin@example.com', role='ADMIN')
+        admin.set_unusable_password()
+        admin.save()
+        courses = Course.objects.bulk_create(
+            Course(name=f"Benchmark course {i}", description="Synthetic course for benchmark_api. " * 4)
+            for i in range(options['courses'])
+        )
+        materials = Material.objects.bulk_create(
+            Material(title=f"Material {c.id}-{m}", course=c, type='PDF', content=f"materials/benchmark/{c.id}-{m}.pdf",
+                     duration_in_minutes=15)
+            for c in courses for m in range(options['modules'] * options['materials'])
+        )
+        modules = Module.objects.bulk_create(
+            Module(course=c, module_number=n + 1, title=f"Module {n + 1} of {c.name}")
+            for c in courses for n in range(options['modules'])
+        )
+        per_course = {}
+        for material in materials:
+            per_course.setdefault(material.course_id, []).append(material)
+        Module.materials.through.objects.bulk_create(
+            Module.materials.through(module_id=module.id, material_id=material.id)
+            for module in modules
+            for material in per_course[module.course_id][(module.module_number - 1) * options['materials']:module.module_number * options['materials']]
+        )
+        colleges = College.objects.bulk_create(
+            College(name=f"Benchmark college {i}", address="1 Example Street", contact_email=f"college{i}@example.com")
+            for i in range(options['colleges'])
+        )
+        College.courses.through.objects.bulk_create(
+            College.courses.through(college_id=college.id, course_id=course.id)
+            for i, college in enumerate(colleges) for course in courses[i % len(courses):][:5]
+        )
+        User.objects.bulk_create(
+            User(username=f"student{i}@example.com", email=f"student{i}@example.com", first_name="Student",
+                 last_name=str(i), role='STUDENT', password='!')
+            for i in range(options['users'])
+        )
+        return admin
+
+    def report(self, path, viewset, admin, repeat):
+        request = APIRequestFactory().get(path)
+        force_authenticate(request, user=admin)
+        data = viewset.as_view({'get': 'list'})(request).data
+
+        stdlib, fast = JSONRenderer(), renderers.ORJSONRenderer()
+        body = stdlib.render(data)
+        assert renderers.ORJSONParser().parse(io.BytesIO(fast.render(data))) == JSONParser().parse(io.BytesIO(body))
+
+        render_json = cpu_ms(lambda: stdlib.render(data), repeat)
+        render_orjson = cpu_ms(lambda: fast.render(data), repeat)
+        parse_json = cpu_ms(lambda: JSONParser().parse(io.BytesIO(body)), repeat)
+        parse_orjson = cpu_ms(lambda: renderers.ORJSONParser().parse(io.BytesIO(body)), repeat)
+        gzipped = gzip.compress(body, compresslevel=middleware.GZIP_LEVEL, mtime=0)
+        gzip_ms = cpu_ms(lambda: gzip.compress(body, compresslevel=middleware.GZIP_LEVEL, mtime=0), repeat)
+        if middleware.brotli is not None:
+            br = len(middleware.brotli.compress(body, quality=middleware.BROTLI_QUALITY))
+            br_ms = cpu_ms(lambda: middleware.brotli.compress(body, quality=middleware.BROTLI_QUALITY), repeat)
+        else:
+            br, br_ms = '-', float('nan')
+
+        self.stdout.write(
+            f"{path:<16}{render_json:>12.1f}{render_orjson:>8.1f}{parse_json:>12.1f}{parse_orjson:>8.1f}"
+            f"{len(body):>10}{len(gzipped):>9}{gzip_ms:>9.1f}{br:>9}{br_ms:>7.1f}"
+        )
+
@@ -0,0 +1,51 @@
+# backend/core/management/commands/build_derivatives.py
+
+import os
+
+from django.core.management.base import BaseCommand
+
+from core.models import Course, Material, PdfPageIndex, StoredBlob
+from core.pdfpages import index_pdf
+from core.thumbnails import (
+    build_cover_variants, build_pdf_preview, derived_source_hash, derived_storage, is_pdf, previews_enabled,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the missing course cover variants, PDF first-page previews and PDF page indexes "
+        "(run after `dedupe_media`; files outside the content-addressed layout are skipped)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Re-render variants that already exist.")
+        parser.add_argument('--prune', action='store_true', help="Delete variants whose source file is gone.")
+
+    def handle(self, *args, **options):
+        force = options['force']
+        covers = previews = indexed = 0
+        for course in Course.objects.exclude(cover_photo='').exclude(cover_photo__isnull=True).iterator():
+            covers += len(build_cover_variants(course, force=force))
+        if not previews_enabled():
+            self.stderr.write("pypdfium2 is not installed; PDF previews skipped.")
+        for material in Material.objects.exclude(content='').iterator():
+            if is_pdf(material):
+                previews += len(build_pdf_preview(material, force=force))
+                indexed += index_pdf(material) is not None
+
+        pruned = 0
+        if options['prune']:
+            live = set(StoredBlob.objects.values_list('sha256', flat=True))
+            root = derived_storage.path('derived')
+            for directory, _, filenames in os.walk(root):
+                for filename in filenames:
+                    name = os.path.relpath(os.path.join(directory, filename), derived_storage.location).replace(os.sep, '/')
+                    digest = derived_source_hash(name)
+                    if digest and digest not in live:
+                        derived_storage.delete(name)
+                        pruned += 1
+            pruned += PdfPageIndex.objects.exclude(sha256__in=live).delete()[0]
+
+        self.stdout.write(
+            f"Wrote {covers} cover variants and {previews} previews, indexed {indexed} PDFs, pruned {pruned}."
+        )
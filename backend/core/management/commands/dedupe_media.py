@@ -0,0 +1,103 @@
+# backend/core/management/commands/dedupe_media.py
+
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+
+from core.models import StoredBlob
+from core.signals import SYNC_SECTIONS, bump_model_versions, record_changes
+from core.storage import content_hash, is_content_addressed
+
+
+def file_references():
+    """{stored name: [(model, field name, pk), ...]} for every FileField in core."""
+    references = defaultdict(list)
+    for model in apps.get_app_config('core').get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField):
+                for pk, name in model.objects.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True}) \
+                        .values_list('pk', field.name):
+                    references[name].append((model, field.name, pk))
+    return references
+
+
+class Command(BaseCommand):
+    help = (
+        "Move uploads saved before ContentAddressedStorage into its SHA-256 layout "
+        "(collapsing duplicates), then recount StoredBlob references."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change without touching files or rows.")
+        parser.add_argument('--prune', action='store_true', help="Delete stored blobs no row points at any more.")
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, 'add_reference'):
+            raise CommandError("The default storage is not core.storage.ContentAddressedStorage.")
+        dry_run = options['dry_run']
+        references = file_references()
+
+        moved = missing = 0
+        for old_name, rows in references.items():
+            if is_content_addressed(old_name):
+                continue
+            if not default_storage.exists(old_name):
+                missing += 1
+                self.stderr.write(f"Missing on disk, left as is: {old_name}")
+                continue
+            moved += 1
+            if dry_run:
+                self.stdout.write(f"Would move {old_name} ({len(rows)} references)")
+                continue
+
+            with default_storage.open(old_name, 'rb') as source:
+                new_name = default_storage.save(old_name, source) # Counts the first reference
+            for _ in rows[1:]:
+                default_storage.add_reference(new_name)
+
+            touched = defaultdict(list)
+            for model, field_name, pk in rows:
+                touched[(model, field_name)].append(pk)
+            for (model, field_name), pks in touched.items():
+                # .update() skips the signals, so stamp the sync feed by hand
+                model.objects.filter(pk__in=pks).update(**{field_name: new_name})
+                section = SYNC_SECTIONS.get(model)
+                if section:
+                    record_changes([(section, pk) for pk in pks])
+            bump_model_versions([model for model, _ in touched])
+
+            FileSystemStorage.delete(default_storage, old_name) # The legacy copy, bypassing the ref count
+            self.stdout.write(f"{old_name} -> {new_name}")
+
+        if dry_run:
+            self.stdout.write(f"{moved} files would move, {missing} missing.")
+            return
+
+        # Recount from the rows themselves; also repairs counts after restores or raw SQL
+        counts = Counter({
+            name: len(rows) for name, rows in file_references().items() if is_content_addressed(name)
+        })
+        fixed = pruned = 0
+        for blob in StoredBlob.objects.all():
+            actual = counts.get(blob.name, 0)
+            if actual == 0 and options['prune']:
+                FileSystemStorage.delete(default_storage, blob.name)
+                blob.delete()
+                pruned += 1
+            elif blob.ref_count != actual:
+                StoredBlob.objects.filter(pk=blob.pk).update(ref_count=actual)
+                fixed += 1
+        known = set(StoredBlob.objects.values_list('name', flat=True))
+        for name, count in counts.items():
+            if name not in known and default_storage.exists(name):
+                StoredBlob.objects.create(
+                    name=name, sha256=content_hash(name),
+                    size=default_storage.size(name), ref_count=count,
+                )
+                fixed += 1
+        self.stdout.write(
+            f"Moved {moved} files ({missing} missing), fixed {fixed} reference counts, pruned {pruned} blobs."
+        )
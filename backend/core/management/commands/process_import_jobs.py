@@ -0,0 +1,31 @@
+# backend/core/management/commands/process_import_jobs.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.importers import claim_import_job, run_import_job, IMPORT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Process queued roster ImportJobs in chunks, recording progress and per-row errors."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help="Rows imported per transaction.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new jobs instead of exiting when the queue is empty.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_import_job()
+            if job is not None:
+                self.stdout.write(f"Running import job #{job.id} ...")
+                job = run_import_job(job, chunk_size=options['chunk_size'])
+                self.stdout.write(
+                    f"Import job #{job.id} {job.status.lower()}: {job.rows_processed} rows, "
+                    f"{job.newly_created} created, {job.added_to_batch} enrolled, {job.skipped} skipped."
+                )
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
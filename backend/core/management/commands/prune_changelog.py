@@ -0,0 +1,35 @@
+# backend/core/management/commands/prune_changelog.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from core.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete ChangeLog entries older than CHANGELOG_RETENTION_DAYS. The newest entry is always kept, "
+        "so /api/sync/ can tell a pruned-away version apart and answer it with `reset`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHANGELOG_RETENTION_DAYS)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        keep_from = (
+            ChangeLog.objects.filter(changed_at__gte=cutoff).order_by('id').values_list('id', flat=True).first()
+            or ChangeLog.objects.order_by('-id').values_list('id', flat=True).first()
+        )
+        if keep_from is None:
+            self.stdout.write("The change log is empty.")
+            return
+        # One statement: QuerySet.delete() would load every row to send delete signals nobody needs here
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {connection.ops.quote_name(ChangeLog._meta.db_table)} WHERE id < %s", [keep_from])
+            pruned = cursor.rowcount
+        self.stdout.write(f"Pruned {pruned} change log entries older than {options['days']} days.")
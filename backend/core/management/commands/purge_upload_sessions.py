@@ -0,0 +1,16 @@
+# backend/core/management/commands/purge_upload_sessions.py
+
+from django.core.management.base import BaseCommand
+
+from core.uploads import discard, expired_sessions
+
+
+class Command(BaseCommand):
+    help = "Delete resumable uploads that were never finalized (idle longer than UPLOAD_SESSION_TTL) and their partial files."
+
+    def handle(self, *args, **options):
+        purged = 0
+        for session in expired_sessions().iterator():
+            discard(session)
+            purged += 1
+        self.stdout.write(f"Purged {purged} abandoned upload sessions.")
@@ -0,0 +1,24 @@
+# backend/core/management/commands/rebuild_leaderboard.py
+
+from django.core.management.base import BaseCommand
+
+from core.leaderboard import refresh_leaderboard
+from core.models import LeaderboardEntry, User
+
+
+class Command(BaseCommand):
+    help = "Recompute every leaderboard row from StudentAttempts (repair after raw SQL edits or restores)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Students recomputed per transaction.")
+
+    def handle(self, *args, **options):
+        # Students that have rows or attempts; anyone else has nothing to rebuild
+        student_ids = sorted(
+            set(User.objects.filter(attempts__isnull=False).values_list('id', flat=True))
+            | set(LeaderboardEntry.objects.values_list('student_id', flat=True))
+        )
+        size = options['chunk_size']
+        for start in range(0, len(student_ids), size):
+            refresh_leaderboard(student_ids[start:start + size])
+        self.stdout.write(f"Rebuilt leaderboard for {len(student_ids)} students ({LeaderboardEntry.objects.count()} rows).")
@@ -0,0 +1,17 @@
+# backend/core/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand
+
+from core.models import SearchEntry
+from core.search import KINDS, index_queryset
+
+
+class Command(BaseCommand):
+    help = "Re-index every user, course, material, college and batch for /api/search/ (after upgrading, bulk SQL edits or restores)."
+
+    def handle(self, *args, **options):
+        for kind, (model, _, _, _) in KINDS.items():
+            index_queryset(model.objects.all())
+            # Entries whose row is gone (deleted without signals, e.g. raw SQL)
+            stale, _ = SearchEntry.objects.filter(kind=kind).exclude(object_id__in=model.objects.values('pk')).delete()
+            self.stdout.write(f"{kind}: {SearchEntry.objects.filter(kind=kind).count()} entries, {stale} stale removed.")
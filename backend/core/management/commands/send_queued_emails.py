@@ -0,0 +1,33 @@
+# backend/core/management/commands/send_queued_emails.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.utils import deliver_queued_emails
+
+
+class Command(BaseCommand):
+    help = "Deliver pending OutboundEmail rows over a reused SMTP connection, with retries and backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Emails sent per SMTP connection.")
+        parser.add_argument('--max-attempts', type=int, default=5, help="Attempts before an email is marked FAILED.")
+        parser.add_argument('--retry-delay', type=int, default=60, help="Base backoff in seconds; doubles on every failure.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling the outbox instead of exiting once it is drained.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = deliver_queued_emails(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts'],
+                retry_delay=options['retry_delay'],
+            )
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} email(s), {failed} failed.")
+            if sent + failed >= options['batch_size']:
+                continue # More may be due right away
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
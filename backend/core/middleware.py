@@ -0,0 +1,87 @@
+# backend/core/middleware.py
+
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError: # Optional; gzip only without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+# Dynamic responses: fast levels that still get most of the size win
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def accepted_encodings(header):
+    """{coding: q} from an Accept-Encoding header; q=0 marks a refused coding."""
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header):
+    """The coding to use: highest q-value first, brotli on a tie (it is smaller at similar cost)."""
+    accepted = accepted_encodings(header)
+    candidates = ('br', 'gzip') if brotli is not None else ('gzip',)
+    ranked = [(accepted.get(coding, accepted.get('*', 0)), coding) for coding in candidates]
+    q, coding = max(ranked, key=lambda item: item[0]) # max() keeps the first of equal items
+    return coding if q > 0 else None
+
+
+class CompressionMiddleware:
+    """
+    Compress JSON (and text) responses of API_COMPRESSION_MIN_SIZE bytes or
+    more with the best coding the client accepts: brotli when the `brotli`
+    package is installed, otherwise gzip. The nested course/college payloads
+    are highly repetitive and shrink ~10x. Files are streamed and left alone.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming or response.has_header('Content-Encoding')
+            or not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES)
+        ):
+            return response
+        # Whatever happens below, the body now depends on Accept-Encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.API_COMPRESSION_MIN_SIZE:
+            return response
+
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding == 'br':
+            compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        elif encoding == 'gzip':
+            compressed = gzip.compress(response.content, compresslevel=GZIP_LEVEL, mtime=0)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # Same resource, different bytes: a strong validator no longer fits (as GZipMiddleware does)
+            response['ETag'] = 'W/' + etag
+        return response
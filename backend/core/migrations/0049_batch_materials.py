@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0048_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batch',
+            name='materials',
+            field=models.ManyToManyField(blank=True, related_name='assigned_batches', to='core.material'),
+        ),
+    ]
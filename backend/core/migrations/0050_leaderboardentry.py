@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_leaderboard(apps, schema_editor):
+    # Same rows core.leaderboard.refresh_leaderboard would build, for every student at once
+    StudentAttempt = apps.get_model('core', 'StudentAttempt')
+    LeaderboardEntry = apps.get_model('core', 'LeaderboardEntry')
+    Membership = apps.get_model('core', 'User').batches.through
+
+    totals = {
+        row['student']: (row['total'], row['count'])
+        for row in StudentAttempt.objects.filter(student__role='STUDENT')
+        .values('student').annotate(total=Sum('score'), count=Count('id'))
+    }
+    scopes = {student_id: {('GLOBAL', 0)} for student_id in totals}
+    for student_id, batch_id, college_id, course_id in Membership.objects.filter(user_id__in=list(totals)) \
+            .values_list('user_id', 'batch_id', 'batch__college_id', 'batch__course_id'):
+        scopes[student_id].update({('BATCH', batch_id), ('COURSE', course_id)})
+        if college_id:
+            scopes[student_id].add(('COLLEGE', college_id))
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(scope=scope, scope_id=scope_id, student_id=student_id, total_score=total, attempts=count)
+        for student_id, (total, count) in totals.items()
+        for scope, scope_id in scopes[student_id]
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0049_batch_materials'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('GLOBAL', 'All students'), ('BATCH', 'Batch'), ('COLLEGE', 'College'), ('COURSE', 'Course')], max_length=10)),
+                ('scope_id', models.PositiveIntegerField(default=0)),
+                ('total_score', models.IntegerField(default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scope', 'scope_id', '-total_score', 'student'], name='leaderboard_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('scope', 'scope_id', 'student'), name='unique_leaderboard_entry')],
+            },
+        ),
+        migrations.RunPython(backfill_leaderboard, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0050_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentattempt',
+            index=models.Index(fields=['assessment', 'score'], name='attempt_assessment_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentattempt',
+            index=models.Index(fields=['assessment', 'student', 'score'], name='attempt_score_report_idx'),
+        ),
+    ]
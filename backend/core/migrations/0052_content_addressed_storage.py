@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:04
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0051_attempt_score_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.BigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='certification',
+            name='certificate_file',
+            field=models.FileField(blank=True, max_length=255, null=True, upload_to=core.models.employee_certificate_path),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='cover_photo',
+            field=models.ImageField(blank=True, max_length=255, null=True, upload_to='course_covers/'),
+        ),
+        migrations.AlterField(
+            model_name='educationentry',
+            name='marksheet_file',
+            field=models.FileField(blank=True, max_length=255, null=True, upload_to=core.models.employee_marksheet_path),
+        ),
+        migrations.AlterField(
+            model_name='employeeapplication',
+            name='resume',
+            field=models.FileField(max_length=255, upload_to='resumes/'),
+        ),
+        migrations.AlterField(
+            model_name='employeedocument',
+            name='document',
+            field=models.FileField(max_length=255, upload_to=core.models.employee_document_path),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='file',
+            field=models.FileField(max_length=255, upload_to='imports/'),
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='content',
+            field=models.FileField(max_length=255, upload_to='materials/'),
+        ),
+        migrations.AlterField(
+            model_name='trainerapplication',
+            name='resume',
+            field=models.FileField(max_length=255, upload_to='resumes/'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='resume',
+            field=models.FileField(blank=True, max_length=255, null=True, upload_to='resumes/'),
+        ),
+    ]
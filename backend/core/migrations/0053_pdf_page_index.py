@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0052_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PdfPageIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('page_count', models.PositiveIntegerField(default=0)),
+                ('page_sizes', models.JSONField(default=list)),
+                ('metadata', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
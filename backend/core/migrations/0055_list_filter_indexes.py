@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0054_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['trainer', 'date'], name='bill_trainer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['status', 'date'], name='bill_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['course', 'type'], name='material_course_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['trainer', 'start_date'], name='schedule_trainer_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['start_date', 'end_date'], name='schedule_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentattempt',
+            index=models.Index(fields=['student', 'timestamp'], name='attempt_student_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'is_active'], name='user_role_active_idx'),
+        ),
+    ]
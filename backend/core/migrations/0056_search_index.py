@@ -0,0 +1,94 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:38
+
+from django.db import migrations, models
+from django.db.utils import OperationalError
+
+# The text index proper (core.search); SearchEntry rows are the source for both
+POSTGRES_INDEX = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE core_searchentry ADD COLUMN vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(subtitle, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(document, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX core_searchentry_vector_idx ON core_searchentry USING GIN (vector)",
+    "CREATE INDEX core_searchentry_title_trgm_idx ON core_searchentry USING GIN (title gin_trgm_ops)",
+    "CREATE INDEX core_searchentry_subtitle_trgm_idx ON core_searchentry USING GIN (subtitle gin_trgm_ops)",
+]
+
+SQLITE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE core_searchentry_fts USING fts5(
+        title, subtitle, document, content='core_searchentry', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER core_searchentry_fts_insert AFTER INSERT ON core_searchentry BEGIN
+        INSERT INTO core_searchentry_fts(rowid, title, subtitle, document)
+        VALUES (new.id, new.title, new.subtitle, new.document);
+    END
+    """,
+    """
+    CREATE TRIGGER core_searchentry_fts_delete AFTER DELETE ON core_searchentry BEGIN
+        INSERT INTO core_searchentry_fts(core_searchentry_fts, rowid, title, subtitle, document)
+        VALUES ('delete', old.id, old.title, old.subtitle, old.document);
+    END
+    """,
+    """
+    CREATE TRIGGER core_searchentry_fts_update AFTER UPDATE ON core_searchentry BEGIN
+        INSERT INTO core_searchentry_fts(core_searchentry_fts, rowid, title, subtitle, document)
+        VALUES ('delete', old.id, old.title, old.subtitle, old.document);
+        INSERT INTO core_searchentry_fts(rowid, title, subtitle, document)
+        VALUES (new.id, new.title, new.subtitle, new.document);
+    END
+    """,
+]
+
+
+def create_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for statement in POSTGRES_INDEX:
+            schema_editor.execute(statement)
+    elif vendor == 'sqlite':
+        try:
+            for statement in SQLITE_INDEX:
+                schema_editor.execute(statement)
+        except OperationalError:
+            pass # SQLite built without FTS5: core.search falls back to LIKE matching
+
+
+def drop_text_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS core_searchentry_fts")
+    # On PostgreSQL the column and its indexes go with the table
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0055_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('USER', 'User'), ('COURSE', 'Course'), ('MATERIAL', 'Material'), ('COLLEGE', 'College'), ('BATCH', 'Batch')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('subtitle', models.CharField(blank=True, max_length=255)),
+                ('document', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_text_index, drop_text_index),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:40
+
+import re
+
+from django.db import migrations
+
+TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def words(*values):
+    return ' '.join(' '.join(TERM.findall(value)) for value in values if value)
+
+
+def backfill_search_index(apps, schema_editor):
+    # Same entries core.search.index_queryset builds, for rows that predate 0056
+    SearchEntry = apps.get_model('core', 'SearchEntry')
+    User = apps.get_model('core', 'User')
+    Course = apps.get_model('core', 'Course')
+    Material = apps.get_model('core', 'Material')
+    College = apps.get_model('core', 'College')
+    Batch = apps.get_model('core', 'Batch')
+
+    def user_entry(user):
+        name = f"{user.first_name} {user.last_name}".strip() or user.email or user.username
+        return name, user.email or '', words(user.email, user.role, user.department, user.expertise)
+
+    def batch_entry(batch):
+        where = [batch.course.name] + ([batch.college.name] if batch.college else [])
+        return batch.name, ' · '.join(where), ''
+
+    sources = [
+        ('USER', User.objects.all(), user_entry),
+        ('COURSE', Course.objects.all(), lambda course: (course.name, '', course.description or '')),
+        ('MATERIAL', Material.objects.select_related('course'),
+         lambda material: (material.title, material.course.name if material.course else '', material.type)),
+        ('COLLEGE', College.objects.all(),
+         lambda college: (college.name, college.contact_email or '', words(college.contact_email, college.contact_person, college.address))),
+        ('BATCH', Batch.objects.select_related('course', 'college'), batch_entry),
+    ]
+    for kind, queryset, build in sources:
+        entries = []
+        for instance in queryset.order_by('pk').iterator(chunk_size=500):
+            title, subtitle, document = build(instance)
+            entries.append(SearchEntry(kind=kind, object_id=instance.pk, title=title[:255], subtitle=subtitle[:255], document=document))
+        SearchEntry.objects.bulk_create(
+            entries, batch_size=500, update_conflicts=True, unique_fields=['kind', 'object_id'],
+            update_fields=['title', 'subtitle', 'document', 'updated_at'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0057_importjob_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
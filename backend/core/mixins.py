@@ -0,0 +1,59 @@
+# backend/core/mixins.py
+
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import ModelVersion
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for list and retrieve on a ModelViewSet.
+
+    The validators come from the ModelVersion stamps of `etag_models` (the
+    queryset's model by default; list every model the serializer nests), so
+    a matching If-None-Match is answered with 304 before the queryset runs
+    or the serializer is touched.
+    """
+    etag_models = None
+
+    def get_etag_models(self):
+        return self.etag_models or (self.get_queryset().model,)
+
+    def get_version_stamp(self, request):
+        labels = sorted(model._meta.label_lower for model in self.get_etag_models())
+        stamps = {
+            label: (version, updated_at)
+            for label, version, updated_at in ModelVersion.objects.filter(label__in=labels)
+            .values_list('label', 'version', 'updated_at')
+        }
+        # Querysets are role-scoped, so the caller is part of the validator
+        key = '|'.join([
+            str(request.user.pk), request.get_full_path(),
+            *(f"{label}:{stamps.get(label, (0, None))[0]}" for label in labels),
+        ])
+        etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+        updated = [updated_at for _, updated_at in stamps.values() if updated_at]
+        last_modified = int(max(updated).timestamp()) if updated else None
+        return etag, last_modified
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        etag, last_modified = self.get_version_stamp(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().retrieve, *args, **kwargs)
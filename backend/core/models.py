@@ -21,11 +21,16 @@ class User(AbstractUser):
     batches = models.ManyToManyField('Batch', blank=True, related_name='students') # Primarily for Students
     access_expiry_date = models.DateTimeField(null=True, blank=True) # Primarily for Trainers
     assigned_materials = models.ManyToManyField('Material', blank=True, related_name='assigned_users') # Primarily for Students
-    resume = models.FileField(upload_to='resumes/', null=True, blank=True) # For Trainers & Employees
+    resume = models.FileField(upload_to='resumes/', null=True, blank=True, max_length=255) # For Trainers & Employees
     assigned_assessments = models.ManyToManyField('Assessment', blank=True, related_name='assigned_students') # Primarily for Students
     must_change_password = models.BooleanField(default=False)
     department = models.CharField(max_length=100, blank=True, null=True)
     bio = models.TextField(blank=True, null=True, help_text="Professional summary or bio")
+
+    class Meta(AbstractUser.Meta):
+        # Filter indexes for the list endpoints (core.filters / UserViewSet.filter_params)
+        indexes = [models.Index(fields=['role', 'is_active'], name='user_role_active_idx')]
+
     @property
     def get_full_name(self):
         full_name = '%s %s' % (self.first_name, self.last_name)
@@ -53,7 +58,7 @@ class EducationEntry(models.Model):
     website = models.URLField(max_length=200, blank=True, null=True)
     academic_performance = models.TextField(blank=True, null=True, help_text="e.g., 7.67 CGPA or 84.96%")
     # --- ADD THIS LINE ---
-    marksheet_file = models.FileField(upload_to=employee_marksheet_path, null=True, blank=True)
+    marksheet_file = models.FileField(upload_to=employee_marksheet_path, null=True, blank=True, max_length=255)
 
     class Meta:
         ordering = ['-start_date'] # Show newest education first
@@ -98,9 +103,13 @@ class Material(models.Model):
     title = models.CharField(max_length=100)
     course = models.ForeignKey('Course', on_delete=models.CASCADE, related_name='materials', null=True)
     type = models.CharField(max_length=10, choices=MATERIAL_TYPE_CHOICES)
-    content = models.FileField(upload_to='materials/')
+    content = models.FileField(upload_to='materials/', max_length=255)
     uploader = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='uploaded_materials')
     duration_in_minutes = models.PositiveIntegerField(default=0, help_text="Duration of the material in minutes.")
+
+    class Meta:
+        indexes = [models.Index(fields=['course', 'type'], name='material_course_type_idx')]
+
     def __str__(self):
         return self.title
 
@@ -111,6 +120,12 @@ class Schedule(models.Model):
     end_date = models.DateTimeField()
     materials = models.ManyToManyField(Material, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['trainer', 'start_date'], name='schedule_trainer_start_idx'),
+            models.Index(fields=['start_date', 'end_date'], name='schedule_dates_idx'),
+        ]
+
     def __str__(self):
         if self.batch:
             course_name = self.batch.course.name if self.batch.course else "N/A"
@@ -126,7 +141,7 @@ class TrainerApplication(models.Model):
     experience = models.PositiveIntegerField()
     tech_stack = models.CharField(max_length=255)
     expertise_domains = models.TextField()
-    resume = models.FileField(upload_to='resumes/')
+    resume = models.FileField(upload_to='resumes/', max_length=255)
     status = models.CharField(max_length=20, default='PENDING')
     submitted_at = models.DateTimeField(auto_now_add=True)
 
@@ -139,7 +154,7 @@ class EmployeeApplication(models.Model):
     phone = models.CharField(max_length=20)
     skills = models.TextField(blank=True, help_text="Relevant skills or experience")
     department = models.CharField(max_length=100, blank=True, help_text="Intended department or role")
-    resume = models.FileField(upload_to='resumes/')
+    resume = models.FileField(upload_to='resumes/', max_length=255)
     status = models.CharField(max_length=20, default='PENDING') # PENDING, APPROVED, DECLINED
     submitted_at = models.DateTimeField(auto_now_add=True)
 
@@ -152,10 +167,16 @@ class Bill(models.Model):
         ('PAID', 'Paid'),
     )
     trainer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bills')
-    date = models.DateField()
+    date = models.DateField(db_index=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
     invoice_number = models.CharField(max_length=20, unique=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['trainer', 'date'], name='bill_trainer_date_idx'),
+            models.Index(fields=['status', 'date'], name='bill_status_date_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.invoice_number:
             today = timezone.now().date()
@@ -193,7 +214,16 @@ class StudentAttempt(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attempts')
     assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE, related_name='attempts')
     score = models.IntegerField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        # Covering indexes for the per-assessment and per-batch score GROUP BYs in core.analytics
+        indexes = [
+            models.Index(fields=['assessment', 'score'], name='attempt_assessment_score_idx'),
+            models.Index(fields=['assessment', 'student', 'score'], name='attempt_score_report_idx'),
+            # A student's attempts in a time window (StudentAttemptViewSet.filter_params)
+            models.Index(fields=['student', 'timestamp'], name='attempt_student_time_idx'),
+        ]
 
     def __str__(self):
         student_name = self.student.username if self.student else "N/A"
@@ -203,7 +233,7 @@ class StudentAttempt(models.Model):
 class Course(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
-    cover_photo = models.ImageField(upload_to='course_covers/', null=True, blank=True)
+    cover_photo = models.ImageField(upload_to='course_covers/', null=True, blank=True, max_length=255)
 
     def __str__(self):
         return self.name
@@ -214,6 +244,8 @@ class Batch(models.Model):
     name = models.CharField(max_length=100)
     start_date = models.DateField()
     end_date = models.DateField()
+    # Batch-level grants: every current and future student of the batch can open these
+    materials = models.ManyToManyField(Material, blank=True, related_name='assigned_batches')
 
     class Meta:
         unique_together = ('course', 'name', 'college')
@@ -259,7 +291,7 @@ class Task(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='TODO')
     due_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         employee_name = self.employee.get_full_name if self.employee else "N/A"
@@ -277,7 +309,7 @@ class EmployeeDocument(models.Model):
         limit_choices_to={'role': 'EMPLOYEE'} # Ensure only employees can have documents
     )
     title = models.CharField(max_length=200, help_text="Name or description of the document")
-    document = models.FileField(upload_to=employee_document_path) # Use dynamic path
+    document = models.FileField(upload_to=employee_document_path, max_length=255) # Use dynamic path
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -305,10 +337,236 @@ class Certification(models.Model):
     end_date = models.DateField(null=True, blank=True, help_text="Expiry Date") # Re-using end_date as Expiry Date
     currently_ongoing = models.BooleanField(default=False, help_text="Mark if this certification does not expire")
     description = models.TextField(blank=True, null=True, help_text="Add any other details")
-    certificate_file = models.FileField(upload_to=employee_certificate_path, null=True, blank=True)
+    certificate_file = models.FileField(upload_to=employee_certificate_path, null=True, blank=True, max_length=255)
 
     class Meta:
         ordering = ['-start_date']
 
     def __str__(self):
-        return f"{self.title} from {self.institute} ({self.employee.username})"
\ No newline at end of file
+        return f"{self.title} from {self.institute} ({self.employee.username})"
+
+class ChangeLog(models.Model):
+    """
+    Append-only feed of changed rows for the /api/sync/ delta endpoint.
+
+    The auto-increment id is the sync version handed to clients, held back
+    by SYNC_SETTLE_SECONDS since ids are not assigned in commit order.
+    `section` is the client-side collection name (e.g. 'users', 'batches')
+    and rows are written by the receivers in signals.py; `prune_changelog`
+    drops those older than CHANGELOG_RETENTION_DAYS.
+    """
+    section = models.CharField(max_length=40)
+    object_id = models.BigIntegerField()
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"v{self.id}: {self.section} #{self.object_id}"
+
+
+class ModelVersion(models.Model):
+    """
+    Per-model version stamp, bumped from signals.py after a transaction that
+    changed a row of that model (or one of its m2m links) commits. Lets views build ETag and
+    Last-Modified headers without touching the model's own table.
+    """
+    label = models.CharField(max_length=100, unique=True) # e.g. 'core.course'
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
+
+
+class OutboundEmail(models.Model):
+    """
+    Transactional outbox for emails. Rows are written alongside the change
+    that triggers them and delivered later by `manage.py send_queued_emails`.
+    """
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    )
+    subject = models.CharField(max_length=255)
+    body = models.TextField(blank=True) # Cleared once sent; credential emails carry temporary passwords
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+
+class ImportJob(models.Model):
+    """
+    A roster upload processed in the background by `manage.py process_import_jobs`.
+    Counters are updated after every chunk so the UI can poll progress; a RUNNING
+    job whose `updated_at` stops moving is requeued (see claim_import_job).
+    """
+    KIND_CHOICES = (
+        ('CREATE_BATCH', 'Create batch with students'),
+        ('ADD_TO_BATCH', 'Add students to batch'),
+    )
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    batch = models.ForeignKey(Batch, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs')
+    file = models.FileField(upload_to='imports/', max_length=255)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    rows_processed = models.PositiveIntegerField(default=0)
+    added_to_batch = models.PositiveIntegerField(default=0)
+    newly_created = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list) # Per-row messages, capped
+    error = models.TextField(blank=True) # Why the job as a whole failed
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True) # Heartbeat: saved after every chunk
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"Import #{self.id} ({self.get_kind_display()}) - {self.status}"
+
+
+class LeaderboardEntry(models.Model):
+    """
+    A student's running score total within one leaderboard scope, kept up to
+    date from StudentAttempt changes (see core.leaderboard) so top-N and rank
+    reads are index range scans instead of a Sum() over every attempt.
+
+    Batch, college and course scopes rank the students enrolled there (via
+    any of their batches) by their score on that course's assessments (the
+    courses of their batches in that college); GLOBAL ranks every student
+    by their total score.
+    """
+    SCOPE_CHOICES = (
+        ('GLOBAL', 'All students'),
+        ('BATCH', 'Batch'),
+        ('COLLEGE', 'College'),
+        ('COURSE', 'Course'),
+    )
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    scope_id = models.PositiveIntegerField(default=0) # Batch/College/Course id; 0 for GLOBAL
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    total_score = models.IntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'scope_id', 'student'], name='unique_leaderboard_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['scope', 'scope_id', '-total_score', 'student'], name='leaderboard_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} in {self.scope} {self.scope_id}: {self.total_score}"
+
+
+class StoredBlob(models.Model):
+    """
+    One stored file of core.storage.ContentAddressedStorage and how many
+    FileField values point at it; the file is removed when the count drops to zero.
+    """
+    name = models.CharField(max_length=255, unique=True) # Storage name, <upload_to>/ab/cd/<hash><ext>
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+class PdfPageIndex(models.Model):
+    """
+    Page count, sizes and document info of a stored PDF, read once when it
+    is uploaded (core.pdfpages). Keyed by content hash, so copies share it.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    page_count = models.PositiveIntegerField(default=0)
+    page_sizes = models.JSONField(default=list) # [[width, height], ...] in PDF points, one per page
+    metadata = models.JSONField(default=dict) # Title, author, ... from the document info
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.page_count} pages)"
+
+class UploadSession(models.Model):
+    """
+    A resumable upload (core.uploads): the client PUTs chunks at increasing
+    offsets into a partial file under MEDIA_ROOT, then finalizes it into a
+    Material (or a course cover). `received` is the next offset expected.
+    """
+    TARGET_CHOICES = (
+        ('MATERIAL', 'Material content'),
+        ('COURSE_COVER', 'Course cover photo'),
+    )
+    STATUS_CHOICES = (
+        ('ACTIVE', 'Active'),
+        ('COMPLETED', 'Completed'),
+    )
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES, default='MATERIAL')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    part_name = models.CharField(max_length=100, unique=True) # MEDIA_ROOT-relative path of the partial file
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ACTIVE')
+    material = models.ForeignKey(Material, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_sessions')
+    course = models.ForeignKey(Course, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_sessions')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes, {self.status})"
+
+class SearchEntry(models.Model):
+    """
+    The searchable text of one user, course, material, college or batch
+    (core.search), kept current from model signals. The text index itself
+    lives in the database: a generated tsvector column with GIN and trigram
+    indexes on PostgreSQL, an FTS5 table fed by triggers on SQLite.
+    """
+    KIND_CHOICES = (
+        ('USER', 'User'),
+        ('COURSE', 'Course'),
+        ('MATERIAL', 'Material'),
+        ('COLLEGE', 'College'),
+        ('BATCH', 'Batch'),
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    title = models.CharField(max_length=255) # Name shown in results, weighted highest
+    subtitle = models.CharField(max_length=255, blank=True) # Email, course or college
+    document = models.TextField(blank=True) # Everything else worth matching
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
@@ -0,0 +1,52 @@
+# backend/core/pagination.py
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Opaque-cursor (keyset) pagination that clients opt into.
+
+    A request is only paginated when it sends `?page_size=` or `?cursor=`,
+    so the existing frontend keeps receiving plain lists. Each viewset picks
+    its indexed ordering via a `cursor_ordering` attribute; the first field
+    is the keyset column, the rest only break ties.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    opt_in = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.opt_in and self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        # A validated ?ordering= (core.filters.CheckedOrderingFilter) wins over cursor_ordering;
+        # the id tie-breaker keeps pages stable when the chosen column repeats
+        for backend in getattr(view, 'filter_backends', ()):
+            if hasattr(backend, 'get_ordering'):
+                ordering = tuple(backend().get_ordering(request, queryset, view) or ())
+                if ordering:
+                    if not any(term.lstrip('-') in ('id', 'pk') for term in ordering):
+                        ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+                    return ordering
+        ordering = getattr(view, 'cursor_ordering', None) or type(self).ordering
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+
+class RosterPagination(KeysetPagination):
+    """Always-on pages of a college's students (CollegeViewSet.roster), by name."""
+    opt_in = False
+
+    def get_ordering(self, request, queryset, view):
+        return ('first_name', 'last_name', 'id')
+
+
+class SearchPagination(PageNumberPagination):
+    """Numbered pages of search results (SearchView): ranked by relevance, which no keyset can follow."""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,111 @@
+# backend/core/pdfpages.py
+
+from django.db import IntegrityError
+
+from .models import PdfPageIndex
+from .storage import content_hash
+from .thumbnails import FORMATS, derived_storage, is_pdf, render_page, write_derivative, write_image
+
+# Split when the PDF is uploaded, so opening a document never waits on pypdf
+PRESPLIT_PAGES = 3
+# Most pages one request may ask for; a viewer fetches a few ahead, not the book
+MAX_PAGE_RANGE = 20
+# Widths (px) pages can be rasterised at
+PAGE_WIDTHS = (640, 1280)
+
+METADATA_KEYS = ('title', 'author', 'subject', 'creator', 'producer')
+
+
+def _reader(source):
+    # Imported lazily like openpyxl: only PDF requests need it
+    from pypdf import PdfReader
+
+    reader = PdfReader(source)
+    if reader.is_encrypted and not reader.decrypt(''): # Opens without a password, or not at all
+        raise ValueError("Encrypted PDF")
+    return reader
+
+
+def _page_size(page):
+    width, height = round(float(page.mediabox.width), 2), round(float(page.mediabox.height), 2)
+    # Sizes as displayed: a page rotated a quarter turn shows landscape
+    return [height, width] if (page.rotation or 0) % 180 else [width, height]
+
+
+def page_range_name(digest, first, last):
+    return f"derived/pages/{digest[:2]}/{digest[2:4]}/{digest[4:]}-p{first}-{last}.pdf"
+
+
+def page_image_name(digest, number, width, fmt):
+    return f"derived/pages/{digest[:2]}/{digest[2:4]}/{digest[4:]}-p{number}-w{width}.{FORMATS[fmt][1]}"
+
+
+def _split(reader, digest, first, last):
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for page in reader.pages[first - 1:last]:
+        writer.add_page(page)
+    name = page_range_name(digest, first, last)
+    write_derivative(name, writer.write)
+    return name
+
+
+def index_pdf(material):
+    """
+    The PdfPageIndex of a PDF material, reading the file (and splitting its
+    first pages) if this content hasn't been indexed yet. None for files the
+    index can't cover: non-PDFs, files outside the content-addressed layout,
+    and PDFs pypdf can't open.
+    """
+    digest = content_hash(material.content.name) if is_pdf(material) else None
+    if not digest:
+        return None
+    index = PdfPageIndex.objects.filter(sha256=digest).first()
+    if index is not None:
+        return index
+
+    from pypdf.errors import PyPdfError
+
+    try:
+        with material.content.open('rb') as source:
+            reader = _reader(source)
+            sizes = [_page_size(page) for page in reader.pages]
+            info = reader.metadata or {}
+            metadata = {
+                key: str(getattr(info, key)) for key in METADATA_KEYS if getattr(info, key, None)
+            }
+            for number in range(1, min(PRESPLIT_PAGES, len(sizes)) + 1):
+                _split(reader, digest, number, number)
+    except (PyPdfError, OSError, ValueError, KeyError, TypeError): # Damaged, encrypted or missing
+        return None
+
+    try:
+        index, _ = PdfPageIndex.objects.get_or_create(
+            sha256=digest, defaults={'page_count': len(sizes), 'page_sizes': sizes, 'metadata': metadata},
+        )
+    except IntegrityError: # Indexed concurrently by another request
+        index = PdfPageIndex.objects.get(sha256=digest)
+    return index
+
+
+def page_range_file(material, first, last):
+    """Name of a standalone PDF holding pages first..last (1-based, inclusive), split on first use."""
+    digest = content_hash(material.content.name)
+    name = page_range_name(digest, first, last)
+    if not derived_storage.exists(name):
+        with material.content.open('rb') as source:
+            _split(_reader(source), digest, first, last)
+    return name
+
+
+def page_image_file(material, number, width, fmt):
+    """Name of page `number` rasterised `width` px wide, or None without a rasteriser."""
+    digest = content_hash(material.content.name)
+    name = page_image_name(digest, number, width, fmt)
+    if not derived_storage.exists(name):
+        image = render_page(material.content, number - 1, width)
+        if image is None:
+            return None
+        write_image(image, name, fmt)
+    return name
@@ -0,0 +1,44 @@
+# backend/core/renderers.py
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError: # Optional; without it these classes are DRF's own
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed, several times faster
+    on the large nested course/college payloads. Indented output (the
+    browsable API, `Accept: application/json; indent=4`) still goes through
+    DRF's encoder.
+    """
+    # Anything orjson can't encode natively (Decimal, lazy translations,
+    # querysets, ...) is converted exactly as DRF's encoder would
+    encode_default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=self.encode_default, option=orjson.OPT_NON_STR_KEYS)
+        # As DRF does: U+2028/U+2029 are valid JSON but end a line in JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser backed by orjson when it is installed (orjson reads UTF-8 only)."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,84 @@
+# backend/core/rosters.py
+
+import csv
+import io
+from itertools import islice
+
+
+class RosterError(ValueError):
+    pass
+
+
+REQUIRED_COLUMNS = ('name', 'email')
+
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _rows_from_records(records):
+    """
+    Turn raw spreadsheet records (header first) into (row_number, name, email).
+    Row numbers match what the user sees in their spreadsheet, header = row 1.
+    """
+    header = next(records, None)
+    if header is None:
+        raise RosterError("The uploaded file is empty.")
+    columns = [(_clean(column) or '').lower() for column in header]
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise RosterError(f"Missing required column(s): {', '.join(missing)}.")
+    name_index, email_index = columns.index('name'), columns.index('email')
+
+    for row_number, record in enumerate(records, start=2):
+        if not record or all(_clean(value) is None for value in record):
+            continue # Blank line
+        name = _clean(record[name_index]) if name_index < len(record) else None
+        email = _clean(record[email_index]) if email_index < len(record) else None
+        yield row_number, name, email
+
+
+def _csv_records(file_obj):
+    text = io.TextIOWrapper(file_obj, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    finally:
+        if not text.closed:
+            text.detach() # Leave closing the upload to its owner
+
+
+def _xlsx_records(file_obj):
+    # Imported lazily so workers that never see a spreadsheet don't load it
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_roster(file_obj):
+    """
+    Stream (row_number, name, email) tuples from an uploaded CSV or XLSX roster.
+
+    Rows are read one at a time (csv module / openpyxl read-only mode), so
+    memory stays flat however long the roster is.
+    """
+    filename = (getattr(file_obj, 'name', '') or '').lower()
+    if filename.endswith('.xls'):
+        raise RosterError("Legacy .xls files are not supported. Please save the roster as .xlsx or .csv.")
+    records = _xlsx_records(file_obj) if filename.endswith('.xlsx') else _csv_records(file_obj)
+    return _rows_from_records(records)
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
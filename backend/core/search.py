@@ -0,0 +1,141 @@
+# backend/core/search.py
+
+import re
+from functools import lru_cache
+
+from django.db import connection
+from django.db.models import BooleanField, Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import Batch, College, Course, Material, SearchEntry, User
+
+# Search terms are runs of letters/digits; everything else (quotes, operators,
+# the dots and @ of an email) only separates them
+_TERM = re.compile(r'\w+', re.UNICODE)
+MAX_TERMS = 8
+
+
+def _words(*values):
+    # Emails and other punctuated values as separate words, so `doe` finds john.doe@example.com
+    return ' '.join(' '.join(_TERM.findall(value)) for value in values if value)
+
+
+def _user_entry(user):
+    name = user.get_full_name or user.email or user.username
+    return name, user.email or '', _words(user.email, user.role, user.department, user.expertise)
+
+
+def _course_entry(course):
+    return course.name, '', course.description or ''
+
+
+def _material_entry(material):
+    return material.title, material.course.name if material.course else '', material.type
+
+
+def _college_entry(college):
+    return college.name, college.contact_email or '', _words(college.contact_email, college.contact_person, college.address)
+
+
+def _batch_entry(batch):
+    where = [batch.course.name] + ([batch.college.name] if batch.college else [])
+    return batch.name, ' · '.join(where), ''
+
+
+# kind: (model, RoleScopedSnapshotMixin section deciding who sees it, (title, subtitle, document) builder, select_related)
+KINDS = {
+    'USER': (User, 'users', _user_entry, ()),
+    'COURSE': (Course, 'courses', _course_entry, ()),
+    'MATERIAL': (Material, 'materials', _material_entry, ('course',)),
+    'COLLEGE': (College, 'colleges', _college_entry, ()),
+    'BATCH': (Batch, 'batches', _batch_entry, ('course', 'college')),
+}
+KIND_OF_MODEL = {model: kind for kind, (model, _, _, _) in KINDS.items()}
+
+
+def _entry(kind, instance):
+    title, subtitle, document = KINDS[kind][2](instance)
+    return SearchEntry(kind=kind, object_id=instance.pk, title=title[:255], subtitle=subtitle[:255], document=document)
+
+
+def index_queryset(queryset):
+    """(Re)index every row of `queryset` (a model in KINDS) with one upsert per 500 rows."""
+    kind = KIND_OF_MODEL[queryset.model]
+    queryset = queryset.select_related(*KINDS[kind][3]).order_by('pk')
+    batch = []
+    for instance in queryset.iterator(chunk_size=500):
+        batch.append(_entry(kind, instance))
+        if len(batch) == 500:
+            _upsert(batch)
+            batch = []
+    if batch:
+        _upsert(batch)
+
+
+def _upsert(entries):
+    SearchEntry.objects.bulk_create(
+        entries, update_conflicts=True, unique_fields=['kind', 'object_id'],
+        update_fields=['title', 'subtitle', 'document', 'updated_at'],
+    )
+
+
+def index_object(instance):
+    index_queryset(type(instance).objects.filter(pk=instance.pk))
+
+
+def unindex_object(instance):
+    SearchEntry.objects.filter(kind=KIND_OF_MODEL[type(instance)], object_id=instance.pk).delete()
+
+
+@lru_cache(maxsize=None)
+def search_backend():
+    """'postgres', 'fts5' or 'basic' (LIKE), from what migration 0056 could create."""
+    if connection.vendor == 'postgresql':
+        return 'postgres'
+    if connection.vendor == 'sqlite' and 'core_searchentry_fts' in connection.introspection.table_names():
+        return 'fts5'
+    return 'basic'
+
+
+def search_terms(q):
+    return _TERM.findall(q or '')[:MAX_TERMS]
+
+
+def match(queryset, q):
+    """
+    `queryset` (of SearchEntry) narrowed to the entries matching `q` and
+    annotated with a `rank`, higher is better. Every term must match, as a
+    word prefix, so results narrow as the user types. On PostgreSQL a
+    trigram word similarity on the title and subtitle also matches, which
+    catches misspelled names and partial emails.
+    """
+    terms = search_terms(q)
+    backend = search_backend()
+    if backend == 'postgres':
+        tsquery = ' & '.join(f"{term}:*" for term in terms)
+        text = ' '.join(terms)
+        return queryset.filter(RawSQL(
+            "(core_searchentry.vector @@ to_tsquery('simple', %s)"
+            " OR %s <%% core_searchentry.title OR %s <%% core_searchentry.subtitle)",
+            [tsquery, text, text], output_field=BooleanField(),
+        )).annotate(rank=RawSQL(
+            "ts_rank_cd(core_searchentry.vector, to_tsquery('simple', %s))"
+            " + greatest(word_similarity(%s, core_searchentry.title), word_similarity(%s, core_searchentry.subtitle))",
+            [tsquery, text, text], output_field=FloatField(),
+        ))
+    if backend == 'fts5':
+        fts_query = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(RawSQL(
+            "core_searchentry.id IN (SELECT rowid FROM core_searchentry_fts WHERE core_searchentry_fts MATCH %s)",
+            [fts_query], output_field=BooleanField(),
+        )).annotate(rank=RawSQL(
+            # bm25() is lower-is-better; title matches weigh most
+            "(SELECT -bm25(core_searchentry_fts, 10.0, 4.0, 1.0) FROM core_searchentry_fts"
+            " WHERE core_searchentry_fts MATCH %s AND rowid = core_searchentry.id)",
+            [fts_query], output_field=FloatField(),
+        ))
+    for term in terms:
+        queryset = queryset.filter(Q(title__icontains=term) | Q(subtitle__icontains=term) | Q(document__icontains=term))
+    return queryset.annotate(rank=Case(
+        When(title__istartswith=terms[0], then=Value(1.0)), default=Value(0.0), output_field=FloatField(),
+    ))
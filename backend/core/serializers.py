@@ -6,14 +6,116 @@ from .models import (
     Batch, Module, StudentAttempt, User, College, Material, Schedule,
     TrainerApplication, EmployeeApplication, Task, # <-- Added EmployeeApplication, Task
     Expense, Bill, Assessment, Course, EmployeeDocument, EducationEntry, 
-    WorkExperienceEntry, Certification
+    WorkExperienceEntry, Certification, OutboundEmail, ImportJob, UploadSession, SearchEntry
 )
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.conf import settings
 from django.db import IntegrityError, transaction
+from django.urls import reverse
 from django.utils import timezone
-from .utils import send_student_credentials, send_employee_credentials # <-- Added send_employee_credentials
+from django.utils.http import urlencode
+from .utils import send_student_credentials, send_employee_credentials, send_student_activation, uses_activation_links
+from .downloads import download_name
+from .storage import content_hash
+from .thumbnails import COVER_WIDTHS, PREVIEW_WIDTHS, is_pdf, previews_enabled, variant_names
 import secrets
 
+def prefetch_plan(serializer_class, prefix=''):
+    """
+    The prefetch_related() lookups `serializer_class` needs to render a list
+    without a query per row: every to-many relation it reads, including the
+    ones inside nested serializers.
+    """
+    lookups = []
+    for field in serializer_class().fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        lookup = prefix + field.source.replace('.', '__')
+        if isinstance(field, serializers.ManyRelatedField):
+            lookups.append(lookup)
+        elif isinstance(field, serializers.ListSerializer):
+            lookups.append(lookup)
+            lookups.extend(prefetch_plan(type(field.child), lookup + '__'))
+    return lookups
+
+def sparse_selection(request):
+    """
+    ({level path: field names}, {expanded paths}) from `?fields=` and
+    `?expand=`, or None when a read sends neither (writes are never trimmed).
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    params = request.query_params
+    if 'fields' not in params and 'expand' not in params:
+        return None
+    levels, expand = {}, set()
+    for item in params.get('fields', '').split(','):
+        path = tuple(part.strip() for part in item.split('.') if part.strip())
+        for depth in range(len(path)):
+            levels.setdefault(path[:depth], set()).add(path[depth])
+            if depth:
+                expand.add(path[:depth]) # Selecting inside a relation expands it
+    for item in params.get('expand', '').split(','):
+        path = tuple(part.strip() for part in item.split('.') if part.strip())
+        expand.update(path[:depth] for depth in range(1, len(path) + 1))
+    return levels, expand
+
+
+class SparseFieldsMixin:
+    """
+    Sparse fieldsets for reads. `?fields=id,name,courses.name` returns only
+    the named fields (dotted names select inside nested objects). Once
+    `fields` or `expand` is sent, nested objects come back as primary keys
+    unless expanded, by `?expand=courses,courses.modules` or by selecting
+    into them. Without either parameter the full shape is returned.
+    """
+
+    def sparse_path(self):
+        # Field names from the root serializer down to this one
+        path, node = [], self
+        while node.parent is not None:
+            if node.field_name: # A ListSerializer's child is bound with ''
+                path.append(node.field_name)
+            node = node.parent
+        return tuple(reversed(path))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if 'sparse_selection' not in self.context:
+            self.context['sparse_selection'] = sparse_selection(self.context.get('request'))
+        selection = self.context['sparse_selection']
+        if selection is None:
+            return fields
+        levels, expand = selection
+        path = self.sparse_path()
+        prefix = ''.join(f"{name}." for name in path)
+
+        errors = {}
+        wanted = levels.get(path)
+        if wanted is not None and wanted - set(fields):
+            errors['fields'] = [f"Unknown field '{prefix}{name}'." for name in sorted(wanted - set(fields))]
+        expandable = {name for name, field in fields.items() if isinstance(field, serializers.BaseSerializer)}
+        not_expandable = {p[-1] for p in expand if p[:-1] == path} - expandable
+        if not_expandable:
+            errors['expand'] = [f"'{prefix}{name}' cannot be expanded." for name in sorted(not_expandable)]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        if wanted is not None:
+            fields = {name: field for name, field in fields.items() if name in wanted}
+        for name, field in fields.items():
+            if name in expandable and path + (name,) not in expand:
+                fields[name] = serializers.PrimaryKeyRelatedField(
+                    many=isinstance(field, serializers.ListSerializer), read_only=True,
+                    **({'source': field.source} if field.source else {}),
+                )
+        return fields
+
+
+class SparseModelSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    pass
+
+
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
@@ -52,7 +154,7 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
 
         return data
     
-class EducationEntrySerializer(serializers.ModelSerializer):
+class EducationEntrySerializer(SparseModelSerializer):
     # --- ADD THESE TWO LINES ---
     marksheet_url = serializers.SerializerMethodField()
     filename = serializers.SerializerMethodField()
@@ -90,10 +192,10 @@ class EducationEntrySerializer(serializers.ModelSerializer):
 
     def get_filename(self, obj):
         if obj.marksheet_file:
-            return os.path.basename(obj.marksheet_file.name)
+            return download_name(f"{obj.title} - Marksheet", obj.marksheet_file) # As view_marksheet names it
         return None
 
-class WorkExperienceEntrySerializer(serializers.ModelSerializer):
+class WorkExperienceEntrySerializer(SparseModelSerializer):
     class Meta:
         model = WorkExperienceEntry
         fields = [
@@ -102,7 +204,7 @@ class WorkExperienceEntrySerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['employee']
 
-class CertificationSerializer(serializers.ModelSerializer):
+class CertificationSerializer(SparseModelSerializer):
     certificate_url = serializers.SerializerMethodField()
     filename = serializers.SerializerMethodField()
     
@@ -133,10 +235,10 @@ class CertificationSerializer(serializers.ModelSerializer):
 
     def get_filename(self, obj):
         if obj.certificate_file:
-            return os.path.basename(obj.certificate_file.name)
+            return download_name(obj.title, obj.certificate_file) # As view_certificate names it
         return None
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseModelSerializer):
     name = serializers.CharField(write_only=True, required=True)
     full_name = serializers.CharField(source='get_full_name', read_only=True)
     username = serializers.CharField(read_only=True)
@@ -180,7 +282,9 @@ class UserSerializer(serializers.ModelSerializer):
         first_name = name_parts[0]
         last_name = name_parts[1] if len(name_parts) > 1 else ""
 
-        password = secrets.token_urlsafe(8)
+        # Students in activation mode get an unusable password and a link instead
+        activation = role == 'STUDENT' and uses_activation_links()
+        password = None if activation else secrets.token_urlsafe(8)
 
         try:
             user = User.objects.create_user(
@@ -195,7 +299,10 @@ class UserSerializer(serializers.ModelSerializer):
         if role == 'STUDENT':
             user.must_change_password = True
             user.save(update_fields=['must_change_password'])
-            send_student_credentials(user, password)
+            if activation:
+                send_student_activation(user)
+            else:
+                send_student_credentials(user, password)
         elif role == 'EMPLOYEE':
             user.must_change_password = True
             user.save(update_fields=['must_change_password'])
@@ -208,13 +315,52 @@ class UserSerializer(serializers.ModelSerializer):
 
         return user
 
-class EmployeeApplicationSerializer(serializers.ModelSerializer):
+class UserListSerializer(UserSerializer):
+    """
+    UserSerializer without the employee-profile nests (education, work
+    experience, certifications) for list responses; the detail endpoint
+    still returns them.
+    """
+    education_entries = None
+    work_experience_entries = None
+    certification_entries = None
+
+    class Meta(UserSerializer.Meta):
+        fields = tuple(
+            name for name in UserSerializer.Meta.fields
+            if name not in ('education_entries', 'work_experience_entries', 'certification_entries')
+        )
+
+class RosterStudentSerializer(SparseModelSerializer):
+    """
+    A row of a college roster (CollegeViewSet.roster): the student's batches
+    and courses at that college only, read from the `college_batches`
+    prefetch.
+    """
+    full_name = serializers.CharField(source='get_full_name', read_only=True)
+    batches = serializers.SerializerMethodField()
+    courses = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = ['id', 'full_name', 'email', 'batches', 'courses', 'assigned_materials']
+
+    def get_batches(self, obj):
+        return [
+            {'id': batch.id, 'name': batch.name, 'course': batch.course_id, 'course_name': batch.course.name}
+            for batch in obj.college_batches
+        ]
+
+    def get_courses(self, obj):
+        return sorted({batch.course.name for batch in obj.college_batches})
+
+class EmployeeApplicationSerializer(SparseModelSerializer):
     class Meta:
         model = EmployeeApplication
         fields = '__all__'
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseModelSerializer):
     employee_name = serializers.CharField(source='employee.get_full_name', read_only=True)
 
     class Meta:
@@ -228,7 +374,7 @@ class TaskSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Tasks can only be assigned to users with the EMPLOYEE role.")
         return value
 
-class EmployeeDocumentSerializer(serializers.ModelSerializer):
+class EmployeeDocumentSerializer(SparseModelSerializer):
     employee_name = serializers.CharField(source='employee.get_full_name', read_only=True)
     # Provide the URL for the document field
     document_url = serializers.SerializerMethodField()
@@ -264,22 +410,50 @@ class EmployeeDocumentSerializer(serializers.ModelSerializer):
 
     def get_filename(self, obj):
         if obj.document:
-            return os.path.basename(obj.document.name)
+            return download_name(obj.title, obj.document) # As view_document names it
         return None
 
 
-class MaterialSerializer(serializers.ModelSerializer):
+def absolute_url(serializer, url):
+    request = serializer.context.get('request')
+    return request.build_absolute_uri(url) if request else url
+
+class MaterialSerializer(SparseModelSerializer):
     course_name = serializers.CharField(source='course.name', read_only=True)
     uploader = serializers.PrimaryKeyRelatedField(read_only=True)
+    preview = serializers.SerializerMethodField()
 
     class Meta:
         model = Material
-        fields = ['id', 'title', 'course', 'course_name', 'type', 'content', 'uploader', 'duration_in_minutes']
+        fields = ['id', 'title', 'course', 'course_name', 'type', 'content', 'uploader', 'duration_in_minutes', 'preview']
         extra_kwargs = {
             'course': {'required': True, 'allow_null': True} # Allow null temporarily if needed? Check logic.
         }
 
-class ModuleSerializer(serializers.ModelSerializer):
+    def get_preview(self, obj):
+        # {format: [{width, url}]} of first-page images for PDFs; `v` pins the
+        # URL to this file's content so the response can be cached for good
+        if not (previews_enabled() and is_pdf(obj)):
+            return None
+        variants = variant_names('previews', obj.content, PREVIEW_WIDTHS)
+        if not variants:
+            return None
+        url = reverse('material-preview', kwargs={'pk': obj.pk})
+        version = content_hash(obj.content.name)[:16]
+        return {
+            fmt: [
+                {'width': width, 'url': absolute_url(self, f"{url}?{urlencode({'w': width, 'type': fmt, 'v': version})}")}
+                for width, _ in names
+            ]
+            for fmt, names in variants.items()
+        }
+
+class UploadedMaterialSerializer(MaterialSerializer):
+    # For finalizing a resumable upload: the file comes from the upload session
+    class Meta(MaterialSerializer.Meta):
+        read_only_fields = ['content']
+
+class ModuleSerializer(SparseModelSerializer):
     materials = MaterialSerializer(many=True, read_only=True)
     material_ids = serializers.PrimaryKeyRelatedField(
         queryset=Material.objects.all(), many=True, write_only=True, source='materials', required=False
@@ -289,21 +463,33 @@ class ModuleSerializer(serializers.ModelSerializer):
         model = Module
         fields = ['id', 'course', 'module_number', 'title', 'materials', 'material_ids']
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(SparseModelSerializer):
     modules = ModuleSerializer(many=True, read_only=True)
+    cover_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Course
-        fields = ['id', 'name', 'description', 'modules', 'cover_photo']
+        fields = ['id', 'name', 'description', 'modules', 'cover_photo', 'cover_variants']
+
+    def get_cover_variants(self, obj):
+        # {format: [{width, url}]}, ready for <picture>/srcset; empty until the
+        # cover is in the content-addressed layout
+        return {
+            fmt: [
+                {'width': width, 'url': absolute_url(self, reverse('cover-variant', kwargs={'name': name[len('derived/covers/'):]}))}
+                for width, name in names
+            ]
+            for fmt, names in variant_names('covers', obj.cover_photo, COVER_WIDTHS).items()
+        }
 
-class CollegeSerializer(serializers.ModelSerializer):
+class CollegeSerializer(SparseModelSerializer):
     courses = CourseSerializer(many=True, read_only=True)
 
     class Meta:
         model = College
         fields = '__all__'
 
-class ScheduleSerializer(serializers.ModelSerializer):
+class ScheduleSerializer(SparseModelSerializer):
     trainer_name = serializers.CharField(source='trainer.get_full_name', read_only=True)
     batch_name = serializers.CharField(source='batch.name', read_only=True)
     course_name = serializers.CharField(source='batch.course.name', read_only=True)
@@ -324,17 +510,17 @@ class ScheduleSerializer(serializers.ModelSerializer):
             'start_date', 'end_date', 'materials', 'material_ids'
         ]
 
-class TrainerApplicationSerializer(serializers.ModelSerializer):
+class TrainerApplicationSerializer(SparseModelSerializer):
     class Meta:
         model = TrainerApplication
         fields = '__all__'
 
-class ExpenseSerializer(serializers.ModelSerializer):
+class ExpenseSerializer(SparseModelSerializer):
     class Meta:
         model = Expense
         fields = ['id', 'type', 'description', 'amount']
 
-class BillSerializer(serializers.ModelSerializer):
+class BillSerializer(SparseModelSerializer):
     expenses = ExpenseSerializer(many=True)
     trainer_name = serializers.CharField(source='trainer.get_full_name', read_only=True)
 
@@ -350,12 +536,12 @@ class BillSerializer(serializers.ModelSerializer):
                 Expense.objects.create(bill=bill, **expense_data)
         return bill
 
-class AssessmentSerializer(serializers.ModelSerializer):
+class AssessmentSerializer(SparseModelSerializer):
     class Meta:
         model = Assessment
         fields = '__all__'
 
-class StudentAttemptSerializer(serializers.ModelSerializer):
+class StudentAttemptSerializer(SparseModelSerializer):
     student_name = serializers.CharField(source='student.get_full_name', read_only=True)
     assessment_title = serializers.CharField(source='assessment.title', read_only=True)
     course = serializers.CharField(source='assessment.course', read_only=True)
@@ -364,11 +550,68 @@ class StudentAttemptSerializer(serializers.ModelSerializer):
         model = StudentAttempt
         fields = ['id', 'student', 'student_name', 'assessment', 'assessment_title', 'course', 'score', 'timestamp']
 
-class BatchSerializer(serializers.ModelSerializer):
+class BatchSerializer(SparseModelSerializer):
     course_name = serializers.CharField(source='course.name', read_only=True)
     college_name = serializers.CharField(source='college.name', read_only=True, allow_null=True)
     student_count = serializers.IntegerField(source='students.count', read_only=True)
 
     class Meta:
         model = Batch
-        fields = ['id', 'course', 'course_name', 'college', 'college_name', 'name', 'start_date', 'end_date', 'student_count']
\ No newline at end of file
+        fields = ['id', 'course', 'course_name', 'college', 'college_name', 'name', 'start_date', 'end_date', 'student_count', 'materials']
+        extra_kwargs = {
+            'materials': {'read_only': True}, # Managed via the assign_materials / remove_materials actions
+        }
+
+class OutboundEmailSerializer(SparseModelSerializer):
+    class Meta:
+        model = OutboundEmail
+        # body is left out on purpose: credential emails contain temporary passwords
+        fields = ['id', 'subject', 'recipients', 'status', 'attempts', 'last_error', 'next_attempt_at', 'created_at', 'sent_at']
+        read_only_fields = fields
+
+class ImportJobSerializer(SparseModelSerializer):
+    batch_name = serializers.CharField(source='batch.name', read_only=True, allow_null=True)
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'kind', 'batch', 'batch_name', 'status', 'rows_processed', 'added_to_batch',
+            'newly_created', 'skipped', 'errors', 'error', 'created_at', 'started_at', 'finished_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+class UploadSessionSerializer(SparseModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'target', 'filename', 'content_type', 'size', 'received', 'status',
+            'material', 'course', 'chunk_size', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['received', 'status', 'material', 'course', 'created_at', 'updated_at']
+
+    def get_chunk_size(self, obj):
+        return settings.UPLOAD_CHUNK_SIZE
+
+    def validate_filename(self, value):
+        value = os.path.basename(value.replace('\\', '/')).strip()
+        if not value:
+            raise serializers.ValidationError("A file name is required.")
+        return value
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("The file is empty.")
+        if value > settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Files may be at most {settings.UPLOAD_MAX_SIZE} bytes.")
+        return value
+
+
+class SearchEntrySerializer(SparseModelSerializer):
+    """A search hit (SearchView): what it is, its id in that collection, and how well it matched."""
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = SearchEntry
+        fields = ['kind', 'object_id', 'title', 'subtitle', 'rank']
@@ -1,9 +1,27 @@
 # backend/core/signals.py
 
-from django.db.models.signals import post_save
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, m2m_changed
+from django.utils import timezone
 from django.dispatch import receiver
 # --- UPDATE IMPORTS ---
-from .models import Certification, EmployeeDocument, EducationEntry
+from .models import (
+    Certification, EmployeeDocument, EducationEntry, WorkExperienceEntry, User, College,
+    Material, Schedule, TrainerApplication, EmployeeApplication, Bill, Expense, Assessment,
+    StudentAttempt, Course, Batch, Module, Task, ChangeLog, ModelVersion, OutboundEmail, ImportJob,
+    LeaderboardEntry, StoredBlob, PdfPageIndex, UploadSession, SearchEntry
+)
+from .leaderboard import record_attempt, forget_attempt, refresh_leaderboard
+from .storage import counted_file_fields, is_content_addressed, share_file
+from .thumbnails import build_cover_variants, build_pdf_preview, is_pdf
+from .pdfpages import index_pdf
+from .search import KIND_OF_MODEL, index_object, index_queryset, unindex_object
+from .access import (
+    invalidate_material_access, invalidate_all_material_access, batch_student_ids,
+)
 
 @receiver(post_save, sender=Certification)
 def create_employee_document_from_certificate(sender, instance, created, **kwargs):
@@ -21,6 +39,7 @@ def create_employee_document_from_certificate(sender, instance, created, **kwarg
                 title=f"Certificate: {instance.title}", # Prepend title
                 document=instance.certificate_file # Link to the same file path
             )
+            share_file(instance.certificate_file)
     
     # Handle update? If the certificate_file is *changed*, should we update the EmployeeDocument?
     # This is more complex. For now, we only handle creation.
@@ -42,4 +61,442 @@ def create_employee_document_from_marksheet(sender, instance, **kwargs):
                 title=f"Marksheet: {instance.title} ({instance.institute})",
                 document=instance.marksheet_file
             )
-# --- END ADD ---
\ No newline at end of file
+            share_file(instance.marksheet_file)
+# --- END ADD ---
+
+
+# --- Change log for /api/sync/ ---
+
+# Model -> client collection it is served in
+SYNC_SECTIONS = {
+    User: 'users',
+    Material: 'materials',
+    Schedule: 'schedules',
+    College: 'colleges',
+    TrainerApplication: 'trainer_applications',
+    EmployeeApplication: 'employee_applications',
+    Bill: 'bills',
+    StudentAttempt: 'student_attempts',
+    Assessment: 'assessments',
+    Course: 'courses',
+    Batch: 'batches',
+    Task: 'tasks',
+    EmployeeDocument: 'employee_documents',
+}
+
+
+def _sync_parents(instance):
+    """
+    Rows whose serialized form nests `instance`, as (section, id) pairs.
+    A changed module, for example, changes how its course serializes.
+    """
+    if isinstance(instance, Module):
+        return [('courses', instance.course_id)]
+    if isinstance(instance, Expense):
+        return [('bills', instance.bill_id)]
+    if isinstance(instance, (EducationEntry, WorkExperienceEntry, Certification)):
+        return [('users', instance.employee_id)]
+    if isinstance(instance, Material) and instance.pk:
+        return _material_parents([instance.pk])
+    if isinstance(instance, Course) and instance.pk:
+        return [('colleges', college_id) for college_id in instance.colleges.values_list('id', flat=True)]
+    return []
+
+
+def _material_parents(material_ids):
+    """Courses nesting any of the given materials, directly or through a module; two queries."""
+    course_ids = set(Module.objects.filter(materials__in=material_ids).values_list('course_id', flat=True))
+    course_ids.update(
+        Material.objects.filter(pk__in=material_ids, course__isnull=False).values_list('course_id', flat=True)
+    )
+    return [('courses', course_id) for course_id in course_ids]
+
+
+def bump_model_versions(models):
+    """
+    Advance the ModelVersion stamp of each given model class once the current
+    transaction commits. Bumping inside it would hold the stamp row's lock until
+    the writer commits and queue every concurrent writer of that model behind
+    it; after commit each UPDATE is its own short statement. A reader between
+    the commit and the bump gets fresh data under the old ETag and refetches
+    on its next request, never stale data under the new one.
+    """
+    labels = sorted({model._meta.label_lower for model in models})
+    transaction.on_commit(lambda: _bump_labels(labels))
+
+
+def _bump_labels(labels):
+    now = timezone.now()
+    for label in labels:
+        updated = ModelVersion.objects.filter(label=label).update(version=F('version') + 1, updated_at=now)
+        if not updated:
+            ModelVersion.objects.get_or_create(label=label, defaults={'version': 1, 'updated_at': now})
+
+
+def record_changes(pairs):
+    entries = [ChangeLog(section=section, object_id=object_id) for section, object_id in set(pairs) if object_id]
+    if entries:
+        ChangeLog.objects.bulk_create(entries)
+
+
+def _changed_rows(instance):
+    pairs = list(_sync_parents(instance))
+    section = SYNC_SECTIONS.get(type(instance))
+    if section:
+        pairs.append((section, instance.pk))
+    return pairs
+
+
+# Only core models carry version stamps; sessions, tokens etc. are skipped
+def _is_versioned(model):
+    return model._meta.app_label == 'core' and model not in (ChangeLog, ModelVersion, OutboundEmail, ImportJob, LeaderboardEntry, StoredBlob, PdfPageIndex, UploadSession, SearchEntry)
+
+
+@receiver(post_save)
+def log_saved_row(sender, instance, raw=False, **kwargs):
+    if raw or not _is_versioned(sender):
+        return
+    bump_model_versions([sender])
+    record_changes(_changed_rows(instance))
+
+
+@receiver(post_delete)
+def log_deleted_row(sender, instance, **kwargs):
+    if not _is_versioned(sender):
+        return
+    bump_model_versions([sender])
+    record_changes(_changed_rows(instance))
+
+
+@receiver(m2m_changed)
+def log_m2m_change(sender, instance, action, model, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear') or not _is_versioned(type(instance)):
+        return
+    bump_model_versions([type(instance), model])
+    pairs = _changed_rows(instance)
+    if pk_set:
+        # The other side changed too (e.g. a batch's student_count)
+        if model is Material:
+            # Resolved as a set so assigning many materials at once stays a few queries
+            pairs.extend(('materials', pk) for pk in pk_set)
+            pairs.extend(_material_parents(pk_set))
+        elif model in (Module, Course):
+            for related in model.objects.filter(pk__in=pk_set):
+                pairs.extend(_changed_rows(related))
+        elif model in SYNC_SECTIONS:
+            pairs.extend((SYNC_SECTIONS[model], pk) for pk in pk_set)
+    record_changes(pairs)
+
+
+
+# --- Visibility changes (see SyncView) ---
+# Which rows a user may see (views.RoleScopedSnapshotMixin) hangs on these
+# columns and on the m2m tables below. A change logs an 'access' entry for
+# every user whose visible set may have moved; their next /api/sync/ answers
+# `reset` and the client reloads /api/bootstrap/.
+ACCESS_FIELDS = {
+    User: ('role', 'is_staff'),
+    Schedule: ('trainer', 'batch'),
+    Batch: ('course',),
+    Material: ('course',),
+    Bill: ('trainer',),
+    Task: ('employee',),
+    EmployeeDocument: ('employee',),
+}
+# m2m table -> the side whose rows resolve to the affected users
+ACCESS_M2M = {
+    User.batches.through: User,
+    User.assigned_materials.through: User,
+    Batch.materials.through: Batch,
+    Schedule.materials.through: Schedule,
+}
+
+
+def record_access_changes(user_ids):
+    record_changes(('access', user_id) for user_id in user_ids)
+
+
+def _users_of(model, ids):
+    ids = [pk for pk in ids if pk]
+    if not ids:
+        return []
+    if model is User:
+        return ids
+    if model is Batch:
+        return list(batch_student_ids(ids))
+    if model is Schedule:
+        return list(Schedule.objects.filter(pk__in=ids).values_list('trainer_id', flat=True))
+    return []
+
+
+def _access_values(instance):
+    return {name: getattr(instance, type(instance)._meta.get_field(name).attname) for name in ACCESS_FIELDS[type(instance)]}
+
+
+def _affected_users(instance, values):
+    """Users whose visible rows depend on `instance` holding these ACCESS_FIELDS values."""
+    if isinstance(instance, User):
+        return [instance.pk]
+    if isinstance(instance, Schedule): # Its trainer sees the batch's students and materials; students see the schedule
+        return [values['trainer'], *_users_of(Batch, [values['batch']])]
+    if isinstance(instance, Batch):
+        return _users_of(Batch, [instance.pk])
+    if isinstance(instance, Material):
+        if not values['course']:
+            return []
+        return list(User.objects.filter(batches__course=values['course']).values_list('id', flat=True).distinct())
+    if isinstance(instance, Bill):
+        return [values['trainer']]
+    return [values['employee']] # Task, EmployeeDocument
+
+
+@receiver(pre_save)
+def remember_access_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    fields = ACCESS_FIELDS.get(sender)
+    if raw or not fields or not instance.pk or (update_fields is not None and not set(fields) & set(update_fields)):
+        return
+    instance._access_before = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(post_save)
+def log_access_change(sender, instance, created, raw=False, **kwargs):
+    if raw or sender not in ACCESS_FIELDS:
+        return
+    before = instance.__dict__.pop('_access_before', None)
+    after = _access_values(instance)
+    if created and sender is Schedule:
+        record_access_changes(_affected_users(instance, after))
+    elif before is not None and before != after:
+        record_access_changes(set(_affected_users(instance, before)) | set(_affected_users(instance, after)))
+
+
+@receiver(post_delete)
+def log_access_loss(sender, instance, **kwargs):
+    # Deleted rows become tombstones; these deletions also hide other, surviving rows
+    if sender is Schedule:
+        record_access_changes([instance.trainer_id])
+    elif sender is Batch:
+        record_access_changes(getattr(instance, '_enrolled_students', []))
+
+
+@receiver(m2m_changed)
+def log_access_grant(sender, instance, action, pk_set, **kwargs):
+    holder = ACCESS_M2M.get(sender)
+    if holder is None:
+        return
+    holder_field = next(field for field in sender._meta.fields if field.related_model is holder)
+    if action == 'pre_clear' and not isinstance(instance, holder):
+        other_field = next(field for field in sender._meta.fields if field.is_relation and field is not holder_field)
+        instance._cleared_holders = list(
+            sender.objects.filter(**{other_field.attname: instance.pk}).values_list(holder_field.attname, flat=True)
+        )
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if isinstance(instance, holder):
+        ids = [instance.pk]
+    elif action == 'post_clear':
+        ids = instance.__dict__.pop('_cleared_holders', [])
+    else:
+        ids = pk_set or []
+    record_access_changes(_users_of(holder, ids))
+
+
+
+# --- Leaderboard maintenance (see core.leaderboard) ---
+
+@receiver(pre_save, sender=StudentAttempt)
+def remember_attempt_student(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_student_id = StudentAttempt.objects.filter(pk=instance.pk).values_list('student_id', flat=True).first()
+
+
+@receiver(post_save, sender=StudentAttempt)
+def update_leaderboard_on_attempt(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        record_attempt(instance)
+    else:
+        # Score, assessment or student may have been edited; the old student loses the attempt
+        refresh_leaderboard({instance.student_id, instance.__dict__.pop('_previous_student_id', None)} - {None})
+
+
+@receiver(post_delete, sender=StudentAttempt)
+def update_leaderboard_on_attempt_delete(sender, instance, **kwargs):
+    forget_attempt(instance)
+
+
+@receiver(m2m_changed, sender=User.batches.through)
+def update_on_enrollment(sender, instance, action, reverse, pk_set, **kwargs):
+    # `reverse` is True when called from the batch side (batch.students.add(...))
+    if action == 'pre_clear' and reverse:
+        instance._enrolled_students = list(instance.students.values_list('id', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        students = [instance.pk]
+    elif action == 'post_clear':
+        students = getattr(instance, '_enrolled_students', [])
+    else:
+        students = list(pk_set or [])
+    refresh_leaderboard(students)
+    invalidate_material_access(students)
+
+
+@receiver(post_save, sender=Batch)
+def update_on_batch_change(sender, instance, created, raw=False, **kwargs):
+    # The batch may have moved to another college or course
+    if not created and not raw:
+        students = list(instance.students.values_list('id', flat=True))
+        refresh_leaderboard(students)
+        invalidate_material_access(students)
+
+
+@receiver(pre_delete, sender=Batch)
+def remember_batch_students(sender, instance, **kwargs):
+    instance._enrolled_students = list(instance.students.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Batch)
+def update_on_batch_delete(sender, instance, **kwargs):
+    students = getattr(instance, '_enrolled_students', [])
+    refresh_leaderboard(students)
+    invalidate_material_access(students)
+
+
+# --- Material access index (see core.access) ---
+
+@receiver(m2m_changed, sender=User.assigned_materials.through)
+def invalidate_access_on_assignment(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_material_access([instance.pk])
+    elif action == 'post_clear':
+        invalidate_all_material_access() # material.assigned_users.clear(): holders unknown by now
+    else:
+        invalidate_material_access(pk_set or [])
+
+
+@receiver(m2m_changed, sender=Batch.materials.through)
+def invalidate_access_on_batch_grant(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_material_access(batch_student_ids([instance.pk]))
+    elif action == 'post_clear':
+        invalidate_all_material_access()
+    else:
+        invalidate_material_access(batch_student_ids(pk_set or []))
+
+
+@receiver(m2m_changed, sender=Schedule.materials.through)
+def invalidate_access_on_schedule_materials(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_material_access([instance.trainer_id])
+    elif action == 'post_clear':
+        invalidate_all_material_access()
+    else:
+        invalidate_material_access(Schedule.objects.filter(pk__in=pk_set or []).values_list('trainer_id', flat=True))
+
+
+@receiver(pre_save, sender=Schedule)
+def remember_schedule_trainer(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_trainer_id = Schedule.objects.filter(pk=instance.pk).values_list('trainer_id', flat=True).first()
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def invalidate_access_on_schedule_change(sender, instance, **kwargs):
+    invalidate_material_access({instance.trainer_id, getattr(instance, '_previous_trainer_id', None)} - {None})
+
+
+@receiver(post_save, sender=Material)
+@receiver(post_delete, sender=Material)
+def invalidate_access_on_material_change(sender, instance, **kwargs):
+    # A new, re-coursed or deleted material can change anyone's list
+    invalidate_all_material_access()
+
+
+@receiver(post_save, sender=Course)
+def build_course_cover_variants(sender, instance, raw=False, **kwargs):
+    # After commit, so a rolled-back upload leaves nothing to render; the
+    # names are content hashes, so an unchanged cover is a no-op
+    if instance.cover_photo and not raw:
+        transaction.on_commit(lambda: build_cover_variants(instance))
+
+
+@receiver(post_save, sender=Material)
+def build_material_preview(sender, instance, raw=False, **kwargs):
+    # First-page image, page index and the first few single-page PDFs, so
+    # the viewer's first requests find everything ready
+    if is_pdf(instance) and not raw:
+        transaction.on_commit(lambda: (build_pdf_preview(instance), index_pdf(instance)))
+
+
+# --- Stored file references (see core.storage) ---
+# Every row pointing at a content-addressed file holds one StoredBlob reference.
+# Deleting the row or replacing its file gives that reference back once the
+# change commits; the file itself goes with the last reference.
+
+def _release_after_commit(files):
+    for storage, name in files:
+        if is_content_addressed(name):
+            transaction.on_commit(partial(storage.delete, name))
+
+
+@receiver(pre_save)
+def remember_replaced_files(sender, instance, raw=False, update_fields=None, **kwargs):
+    fields = [
+        field for field in counted_file_fields(sender)
+        if update_fields is None or field.name in update_fields
+    ]
+    if raw or not fields or not instance.pk:
+        return
+    before = sender._base_manager.filter(pk=instance.pk).values(*(field.attname for field in fields)).first()
+    if before is None:
+        return
+    replaced = []
+    for field in fields:
+        old_name, current = before[field.attname], getattr(instance, field.attname)
+        # A fresh upload of identical bytes keeps the name but takes a new reference
+        if old_name and (old_name != current.name or not current._committed):
+            replaced.append((field.storage, old_name))
+    instance._replaced_files = replaced
+
+
+@receiver(post_save)
+def release_replaced_files(sender, instance, raw=False, **kwargs):
+    _release_after_commit(instance.__dict__.pop('_replaced_files', []))
+
+
+@receiver(post_delete)
+def release_deleted_files(sender, instance, **kwargs):
+    _release_after_commit(
+        (field.storage, getattr(instance, field.attname).name)
+        for field in counted_file_fields(sender) if getattr(instance, field.attname)
+    )
+
+
+# --- Search index (see core.search) ---
+
+@receiver(post_save)
+def update_search_entry(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or sender not in KIND_OF_MODEL or update_fields == frozenset({'last_login'}):
+        return
+    index_object(instance)
+    # Material and batch entries show their course/college name
+    if sender is Course:
+        index_queryset(Material.objects.filter(course=instance))
+        index_queryset(Batch.objects.filter(course=instance))
+    elif sender is College:
+        index_queryset(Batch.objects.filter(college=instance))
+
+
+@receiver(post_delete)
+def remove_search_entry(sender, instance, **kwargs):
+    if sender in KIND_OF_MODEL:
+        unindex_object(instance)
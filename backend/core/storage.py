@@ -0,0 +1,151 @@
+# backend/core/storage.py
+
+import hashlib
+import os
+import re
+import tempfile
+from functools import lru_cache
+
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction
+from django.db.models import F
+
+# <upload_to>/ab/cd/<remaining 60 hex chars><ext>
+CONTENT_ADDRESSED_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{60}(\.[\w-]+)?$')
+
+
+def is_content_addressed(name):
+    return bool(name and CONTENT_ADDRESSED_NAME.search(name))
+
+
+def content_hash(name):
+    """The SHA-256 a content-addressed name was built from, or None for other names."""
+    if not is_content_addressed(name):
+        return None
+    first, second, rest = name.split('/')[-3:]
+    return first + second + os.path.splitext(rest)[0]
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that keeps one copy of each distinct file.
+
+    Uploads are hashed (SHA-256) while they stream to a temporary file, then
+    moved to <upload_to>/<2 hex>/<2 hex>/<rest of hash><ext>. The two fan-out
+    levels keep any one directory small. Uploading bytes that already exist
+    reuses the stored file. A StoredBlob row counts the references to each
+    file, and delete() only removes the file when the last one goes.
+    Rows that copy a file name from another row instead of uploading it
+    must call share_file() so the count stays right; signals.py releases a
+    row's reference when the row is deleted or its file replaced.
+
+    Files saved before this backend was enabled keep their names and are
+    deleted as before; `manage.py dedupe_media` moves them over.
+    """
+    chunk_size = 64 * 1024
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is decided by the content in _save(); nothing to avoid here
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        os.makedirs(self.location, exist_ok=True)
+
+        digest, size = hashlib.sha256(), 0
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        # Same filesystem as the target, so the final move is an atomic rename
+        with tempfile.NamedTemporaryFile(dir=self.location, prefix='.upload-', delete=False) as temp:
+            try:
+                for chunk in content.chunks(self.chunk_size):
+                    digest.update(chunk)
+                    temp.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                temp.close()
+                os.unlink(temp.name)
+                raise
+
+        return self._store(directory, extension, digest.hexdigest(), size, temp.name)
+
+    def _store(self, directory, extension, sha256, size, source):
+        # Moves `source` into place (or drops it if the content is already stored)
+        name = '/'.join(part for part in (directory, sha256[:2], sha256[2:4], sha256[4:] + extension) if part)
+        try:
+            self._add_reference(name, sha256=sha256, size=size, source=source)
+        finally:
+            if os.path.exists(source):
+                os.unlink(source)
+        return name
+
+    def adopt(self, name, path, sha256=None):
+        """
+        Store the file at `path` as an upload named like `name`, renaming it
+        rather than copying, and return the stored name. `path` must be on
+        the same filesystem as the storage (resumable uploads assemble their
+        file under MEDIA_ROOT for this). The file is hashed in place once,
+        unless the caller already knows its `sha256`.
+        """
+        directory, filename = os.path.split(name)
+        if sha256 is None:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as source:
+                for chunk in iter(lambda: source.read(self.chunk_size), b''):
+                    digest.update(chunk)
+            sha256 = digest.hexdigest()
+        return self._store(directory, os.path.splitext(filename)[1].lower(), sha256, os.path.getsize(path), path)
+
+    def _add_reference(self, name, sha256=None, size=None, source=None):
+        from .models import StoredBlob # Storage is imported before the app registry is ready
+
+        path = self.path(name)
+        with transaction.atomic():
+            # The row lock serialises this against delete() of the same blob
+            blob, _ = StoredBlob.objects.select_for_update().get_or_create(
+                name=name, defaults={'sha256': sha256 or '', 'size': size or 0, 'ref_count': 0},
+            )
+            if source and not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True, mode=self.directory_permissions_mode or 0o777)
+                os.replace(source, path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(path, self.file_permissions_mode)
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+
+    def add_reference(self, name):
+        """Record one more row pointing at an already stored content-addressed file."""
+        if is_content_addressed(name):
+            self._add_reference(name)
+
+    def delete(self, name):
+        if not is_content_addressed(name):
+            return super().delete(name)
+        from .models import StoredBlob
+
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is not None and blob.ref_count > 1:
+                StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return
+            if blob is not None:
+                blob.delete()
+            super().delete(name)
+
+
+@lru_cache(maxsize=None)
+def counted_file_fields(model):
+    """The model's FileFields whose storage counts references (see signals.py)."""
+    return [
+        field for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and hasattr(field.storage, 'add_reference')
+    ]
+
+
+def share_file(field_file):
+    """
+    Call after pointing another row at `field_file`'s stored file (instead
+    of uploading a copy), so deleting either row leaves the other's file.
+    """
+    if field_file and hasattr(field_file.storage, 'add_reference'):
+        field_file.storage.add_reference(field_file.name)
@@ -1,3 +1,1581 @@
-from django.test import TestCase
+# backend/core/tests.py
 
-# Create your tests here.
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+import openpyxl
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .models import (
+    Assessment, Batch, Bill, Certification, ChangeLog, College, Course, EmployeeDocument, ImportJob, LeaderboardEntry,
+    Material, ModelVersion, Module, OutboundEmail, Schedule, SearchEntry, StoredBlob, StudentAttempt, User,
+)
+from .access import accessible_material_ids, can_view_material
+from .downloads import parse_range_header
+from .importers import claim_import_job, import_students, run_import_job
+from .leaderboard import refresh_leaderboard
+from .renderers import ORJSONParser, ORJSONRenderer
+from .rosters import RosterError, read_roster
+from .serializers import UserListSerializer, UserSerializer, prefetch_plan
+from .signals import record_changes
+from .storage import content_hash
+from .thumbnails import COVER_WIDTHS, FORMATS, derived_storage, variant_names
+from .utils import (
+    deliver_queued_emails, make_activation_token, queue_email, queue_emails, read_activation_token,
+    send_student_credentials,
+)
+from .views import SyncView
+from . import middleware, uploads
+
+
+class RejectingBackend(EmailBackend):
+    """locmem backend whose server refuses any message addressed to a `bounce@` recipient."""
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any(recipient.startswith('bounce@') for recipient in message.recipients()):
+                raise SMTPException("550 mailbox unavailable")
+        return super().send_messages(messages)
+
+
+class UnreachableBackend(EmailBackend):
+    def open(self):
+        raise ConnectionRefusedError("Connection refused")
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url).json()
+            ids += [row['id'] for row in response['results']]
+            url, pages = response['next'], pages + 1
+        return ids, pages
+
+    def test_lists_stay_plain_without_page_size_or_cursor(self):
+        Course.objects.bulk_create([Course(name=f'Course {n}') for n in range(3)])
+        self.assertIsInstance(self.client.get('/api/courses/').json(), list)
+
+    def test_pages_follow_the_cursor_once_through_every_row(self):
+        courses = Course.objects.bulk_create([Course(name=f'Course {n}') for n in range(5)])
+        first = self.client.get('/api/courses/?page_size=2').json()
+        self.assertIsNone(first['previous'])
+        self.assertIn('cursor=', first['next'])
+        self.assertEqual(self.walk('/api/courses/?page_size=2'), ([course.id for course in courses], 3))
+
+    def test_ties_in_the_cursor_ordering_are_broken_by_id(self):
+        student = User.objects.create(username='s@example.com', email='s@example.com', role='STUDENT')
+        assessment = Assessment.objects.create(title='Quiz', course='Python', type='TEST')
+        attempts = [StudentAttempt.objects.create(student=student, assessment=assessment, score=10) for _ in range(5)]
+        StudentAttempt.objects.update(timestamp=timezone.now()) # Same keyset value for every row
+        ids, _ = self.walk('/api/attempts/?page_size=2')
+        self.assertEqual(ids, sorted((attempt.id for attempt in attempts), reverse=True))
+
+    def test_pages_follow_a_requested_ordering(self):
+        student = User.objects.create(username='s@example.com', email='s@example.com', role='STUDENT')
+        assessment = Assessment.objects.create(title='Quiz', course='Python', type='TEST')
+        attempts = [StudentAttempt.objects.create(student=student, assessment=assessment, score=score) for score in (30, 10, 30, 20, 10)]
+        ids, _ = self.walk('/api/attempts/?page_size=2&ordering=score')
+        self.assertEqual(ids, [attempt.id for attempt in sorted(attempts, key=lambda attempt: (attempt.score, attempt.id))])
+
+    def test_undecodable_cursor_is_rejected(self):
+        self.assertEqual(self.client.get('/api/courses/?cursor=zzz').status_code, 404)
+
+
+class BootstrapTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name='Python')
+        self.batch = Batch.objects.create(course=self.course, name='Morning', start_date='2026-01-01', end_date='2026-02-01')
+        self.trainer = User.objects.create(username='t@example.com', email='t@example.com', role='TRAINER')
+        self.student = User.objects.create(username='s@example.com', email='s@example.com', role='STUDENT')
+        self.stranger = User.objects.create(username='x@example.com', email='x@example.com', role='STUDENT')
+        self.batch.students.add(self.student)
+        Schedule.objects.create(trainer=self.trainer, batch=self.batch, start_date=timezone.now(), end_date=timezone.now())
+
+    def snapshot(self, user, **headers):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/api/bootstrap/', **headers)
+
+    def test_sections_follow_the_role(self):
+        employee = User.objects.create(username='e@example.com', email='e@example.com', role='EMPLOYEE')
+        self.assertEqual(set(self.snapshot(employee).json()), {'role', 'version', 'users', 'tasks', 'employee_documents'})
+        student = self.snapshot(self.student).json()
+        self.assertIn('leaderboard', student)
+        self.assertNotIn('bills', student)
+
+    def test_trainer_sees_the_students_of_their_batches_only(self):
+        users = {user['id'] for user in self.snapshot(self.trainer).json()['users']}
+        self.assertEqual(users, {self.trainer.id, self.student.id})
+
+    def test_query_count_does_not_grow_with_the_data(self):
+        admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        with CaptureQueriesContext(connection) as few:
+            self.snapshot(admin)
+        for n in range(5):
+            batch = Batch.objects.create(course=Course.objects.create(name=f'Course {n}'), name=f'B{n}', start_date='2026-01-01', end_date='2026-02-01')
+            batch.students.add(User.objects.create(username=f'{n}@example.com', email=f'{n}@example.com', role='STUDENT'))
+            Material.objects.create(title=f'M{n}', course=batch.course, type='PDF', content=f'm{n}.pdf')
+        with CaptureQueriesContext(connection) as many:
+            self.snapshot(admin)
+        self.assertEqual(len(many), len(few))
+
+    def test_unchanged_snapshot_is_not_modified(self):
+        etag = self.snapshot(self.student)['ETag']
+        self.assertEqual(self.snapshot(self.student, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class ActivationTokenTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create(username='s@example.com', email='s@example.com', role='STUDENT', must_change_password=True)
+        self.student.set_unusable_password()
+        self.student.save()
+        self.client = APIClient()
+
+    def activate(self, token, password='correct horse'):
+        return self.client.post('/api/auth/set-password/', {'password': password, 'token': token})
+
+    def test_token_sets_the_password_once(self):
+        token = make_activation_token(self.student)
+        self.assertEqual(self.activate(token).status_code, 200)
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.check_password('correct horse'))
+        self.assertFalse(self.student.must_change_password)
+        self.assertEqual(self.activate(token, 'another password').status_code, 400) # The password change used it up
+
+    def test_expired_token_is_rejected(self):
+        token = make_activation_token(self.student)
+        later = time.time() + settings.ACTIVATION_TOKEN_MAX_AGE + 60
+        with mock.patch('django.core.signing.time.time', return_value=later):
+            self.assertIsNone(read_activation_token(token))
+            self.assertEqual(self.activate(token).status_code, 400)
+
+    def test_tampered_token_is_rejected(self):
+        token = make_activation_token(self.student)
+        self.assertEqual(self.activate(token[:-2] + 'xx').status_code, 400)
+
+    def test_token_account_wins_over_the_logged_in_one(self):
+        other = User.objects.create(username='o@example.com', email='o@example.com', role='STUDENT')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.activate(make_activation_token(self.student)).status_code, 200)
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.check_password('correct horse'))
+
+    @override_settings(ROSTER_ONBOARDING_MODE='activation')
+    def test_roster_import_emails_links_instead_of_passwords(self):
+        batch = Batch.objects.create(course=Course.objects.create(name='Python'), name='Morning', start_date='2026-01-01', end_date='2026-02-01')
+        import_students(batch, [(2, 'Ada Lovelace', 'ada@example.com')])
+        ada = User.objects.get(username='ada@example.com')
+        self.assertFalse(ada.has_usable_password())
+        token = OutboundEmail.objects.get().body.split('/activate?token=')[1].split()[0]
+        self.assertEqual(read_activation_token(token), ada)
+
+
+class OutboxQueueTests(TestCase):
+    def test_queued_email_is_pending_and_due_now(self):
+        email = queue_email("Subject", "Body", ['a@example.com'], from_email='noreply@example.com')
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'PENDING')
+        self.assertEqual(email.attempts, 0)
+        self.assertEqual(email.recipients, ['a@example.com'])
+        self.assertLessEqual(email.next_attempt_at, timezone.now())
+        self.assertEqual(len(mail.outbox), 0) # Nothing is sent in the request
+
+    def test_queued_email_rolls_back_with_the_caller(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            queue_email("Subject", "Body", ['a@example.com'])
+            raise RuntimeError
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_queue_emails_is_one_insert(self):
+        with self.assertNumQueries(1):
+            queue_emails([("S1", "B1", ['a@example.com']), ("S2", "B2", ['b@example.com'])])
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+    def test_credentials_are_logged_not_printed(self):
+        user = User.objects.create(username='s@example.com', email='s@example.com', role='STUDENT')
+        with self.assertLogs('core.utils', level='INFO') as logs:
+            send_student_credentials(user, 'temporary')
+        self.assertIn('s@example.com', logs.output[0])
+        self.assertNotIn('temporary', logs.output[0])
+
+
+class DeliverQueuedEmailsTests(TestCase):
+    def test_sends_due_emails_and_clears_the_body(self):
+        email = queue_email("Welcome", "Password: secret", ['a@example.com'])
+        self.assertEqual(deliver_queued_emails(), (1, 0))
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'SENT')
+        self.assertEqual(email.attempts, 1)
+        self.assertIsNotNone(email.sent_at)
+        self.assertEqual(email.body, '') # Temporary passwords don't stay in the table
+        self.assertEqual([message.to for message in mail.outbox], [['a@example.com']])
+
+    def test_skips_emails_not_yet_due_and_already_finished(self):
+        later = queue_email("Later", "Body", ['a@example.com'])
+        later.next_attempt_at = timezone.now() + timedelta(minutes=5)
+        later.save()
+        OutboundEmail.objects.create(subject="Done", recipients=['b@example.com'], status='SENT')
+        OutboundEmail.objects.create(subject="Dead", recipients=['c@example.com'], status='FAILED')
+        self.assertEqual(deliver_queued_emails(), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_batch_size_limits_one_run(self):
+        queue_emails([("S", "B", [f'{i}@example.com']) for i in range(3)])
+        self.assertEqual(deliver_queued_emails(batch_size=2), (2, 0))
+        self.assertEqual(OutboundEmail.objects.filter(status='PENDING').count(), 1)
+
+    @override_settings(EMAIL_BACKEND='core.tests.RejectingBackend')
+    def test_failed_email_is_retried_with_doubling_backoff_then_failed(self):
+        email = queue_email("Welcome", "Body", ['bounce@example.com'])
+        good = queue_email("Welcome", "Body", ['a@example.com'])
+
+        start = timezone.now()
+        self.assertEqual(deliver_queued_emails(max_attempts=3, retry_delay=60), (1, 1))
+        email.refresh_from_db()
+        good.refresh_from_db()
+        self.assertEqual(good.status, 'SENT') # One bad recipient doesn't hold up the batch
+        self.assertEqual((email.status, email.attempts), ('PENDING', 1))
+        self.assertIn('550', email.last_error)
+        self.assertGreaterEqual(email.next_attempt_at, start + timedelta(seconds=60))
+        self.assertEqual(deliver_queued_emails(max_attempts=3, retry_delay=60), (0, 0)) # Not due yet
+
+        OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        start = timezone.now()
+        self.assertEqual(deliver_queued_emails(max_attempts=3, retry_delay=60), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('PENDING', 2))
+        self.assertGreaterEqual(email.next_attempt_at, start + timedelta(seconds=120))
+
+        OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        with self.assertLogs('core.utils', level='ERROR'):
+            self.assertEqual(deliver_queued_emails(max_attempts=3, retry_delay=60), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('FAILED', 3))
+        self.assertEqual(deliver_queued_emails(max_attempts=3, retry_delay=60), (0, 0))
+
+    @override_settings(EMAIL_BACKEND='core.tests.UnreachableBackend')
+    def test_unreachable_server_postpones_the_batch_without_using_attempts(self):
+        email = queue_email("Welcome", "Body", ['a@example.com'])
+        with self.assertLogs('core.utils', level='WARNING'):
+            self.assertEqual(deliver_queued_emails(retry_delay=30), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('PENDING', 0))
+        self.assertIn('refused', email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+    def test_command_drains_the_outbox(self):
+        queue_emails([("S", "B", [f'{i}@example.com']) for i in range(5)])
+        out = StringIO()
+        call_command('send_queued_emails', batch_size=2, stdout=out)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(OutboundEmail.objects.filter(status='PENDING').exists())
+        self.assertIn("Sent 2 email(s)", out.getvalue())
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class DeliverQueuedEmailsLockingTests(TransactionTestCase):
+    def test_rows_locked_by_another_worker_are_skipped(self):
+        locked = queue_email("Locked", "Body", ['a@example.com'])
+        free = queue_email("Free", "Body", ['b@example.com'])
+        holding, release = threading.Event(), threading.Event()
+
+        def other_worker():
+            try:
+                with transaction.atomic():
+                    list(OutboundEmail.objects.select_for_update().filter(pk=locked.pk))
+                    holding.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        try:
+            self.assertTrue(holding.wait(10))
+            self.assertEqual(deliver_queued_emails(), (1, 0))
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(OutboundEmail.objects.get(pk=free.pk).status, 'SENT')
+        self.assertEqual(OutboundEmail.objects.get(pk=locked.pk).status, 'PENDING')
+        self.assertEqual([message.subject for message in mail.outbox], ["Free"])
+
+
+class MediaTestCase(TestCase):
+    """A TestCase whose uploads land in a throwaway MEDIA_ROOT."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+
+class MaterialValidationTests(MediaTestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def post_material(self, **extra):
+        data = {'title': 'Slides', 'type': 'PDF', 'content': SimpleUploadedFile('slides.pdf', b'%PDF-1.4 test'), **extra}
+        return self.client.post('/api/materials/', data, format='multipart')
+
+    def test_course_is_required(self):
+        response = self.post_material()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('course', response.json())
+        self.assertFalse(Material.objects.exists())
+
+    def test_created_with_a_course(self):
+        course = Course.objects.create(name='Python')
+        response = self.post_material(course=course.id)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Material.objects.get().course, course)
+
+
+class ModelVersionTests(TestCase):
+    def course_version(self):
+        return ModelVersion.objects.filter(label='core.course').values_list('version', flat=True).first()
+
+    def test_bumped_after_the_writer_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.create(name='Python')
+            Course.objects.create(name='Java')
+            self.assertIsNone(self.course_version()) # No stamp write inside the transaction
+        self.assertEqual(self.course_version(), 2)
+
+    def test_rolled_back_write_keeps_the_stamp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Course.objects.create(name='Python')
+                raise RuntimeError
+        self.assertIsNone(self.course_version())
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course = Course.objects.create(name='Python')
+
+    def test_matching_etag_is_304_without_running_the_list(self):
+        etag = self.client.get('/api/courses/')['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/courses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1) # The ModelVersion stamps only
+
+    def test_detail_is_conditional_too(self):
+        url = f'/api/courses/{self.course.id}/'
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=self.client.get(url)['ETag']).status_code, 304)
+
+    def test_a_committed_write_changes_the_etag(self):
+        etag = self.client.get('/api/courses/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.name = 'Python 3'
+            self.course.save()
+        response = self.client.get('/api/courses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['name'], 'Python 3')
+
+    def test_etag_is_per_user(self):
+        other = APIClient()
+        other.force_authenticate(User.objects.create(username='t@example.com', email='t@example.com', role='TRAINER'))
+        etag = self.client.get('/api/courses/')['ETag']
+        self.assertNotEqual(other.get('/api/courses/')['ETag'], etag)
+        self.assertEqual(other.get('/api/courses/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class RosterParserTests(SimpleTestCase):
+    def upload(self, name, content):
+        return SimpleUploadedFile(name, content)
+
+    def test_csv_rows_keep_spreadsheet_row_numbers(self):
+        content = '\ufeffEmail,Name\n a@example.com , Ada \n\n,\nb@example.com,Bob\n'.encode('utf-8')
+        rows = list(read_roster(self.upload('roster.csv', content)))
+        self.assertEqual(rows, [(2, 'Ada', 'a@example.com'), (5, 'Bob', 'b@example.com')])
+
+    def test_xlsx_is_read(self):
+        workbook = openpyxl.Workbook()
+        workbook.active.append(['Name', 'Email', 'Phone'])
+        workbook.active.append(['Ada', 'a@example.com', '123'])
+        content = BytesIO()
+        workbook.save(content)
+        rows = list(read_roster(self.upload('roster.xlsx', content.getvalue())))
+        self.assertEqual(rows, [(2, 'Ada', 'a@example.com')])
+
+    def test_rows_are_streamed(self):
+        rows = read_roster(self.upload('roster.csv', b'name,email\n' + b'Ada,a@example.com\n' * 10000))
+        self.assertEqual(next(rows), (2, 'Ada', 'a@example.com'))
+
+    def test_unusable_files_are_rejected(self):
+        for name, content, message in (
+            ('roster.xls', b'', 'Legacy .xls'),
+            ('roster.csv', b'', 'empty'),
+            ('roster.csv', b'name,phone\nAda,123\n', 'Missing required column(s): email'),
+        ):
+            with self.subTest(name=name, message=message), self.assertRaisesMessage(RosterError, message):
+                list(read_roster(self.upload(name, content)))
+
+
+class StudentImportTests(TestCase):
+    def setUp(self):
+        self.batch = Batch.objects.create(
+            course=Course.objects.create(name='Python'), name='Morning', start_date='2026-01-01', end_date='2026-02-01'
+        )
+
+    def roster(self, count, start=0):
+        return [(row + 2, f'Student {row}', f'student{row}@example.com') for row in range(start, start + count)]
+
+    def test_creates_new_students_and_enrolls_existing_ones(self):
+        returning = User.objects.create(username='student0@example.com', email='student0@example.com', role='STUDENT')
+        summary = import_students(self.batch, self.roster(3))
+        self.assertEqual((summary['added_to_batch'], summary['newly_created'], summary['skipped']), (3, 2, 0))
+        self.assertEqual(self.batch.students.count(), 3)
+        self.assertIn(returning, self.batch.students.all())
+        self.assertEqual(User.objects.get(username='student1@example.com').first_name, 'Student')
+        self.assertEqual(OutboundEmail.objects.count(), 2) # Only the new accounts are emailed
+
+    def test_reports_bad_rows_and_non_students(self):
+        User.objects.create(username='boss@example.com', email='boss@example.com', role='ADMIN')
+        rows = [(2, 'Ada', 'ADA@example.com'), (3, 'Ada again', 'ada@example.com'), (4, '', 'x@example.com'),
+                (5, 'No email', 'not-an-email'), (6, 'Boss', 'boss@example.com')]
+        summary = import_students(self.batch, rows)
+        self.assertEqual((summary['added_to_batch'], summary['skipped']), (1, 3))
+        self.assertEqual(len(summary['errors']), 3)
+        self.assertTrue(summary['errors'][0].startswith('Row 4:'))
+        self.assertIn('boss@example.com exists but is not a student', summary['errors'][2])
+        self.assertEqual(list(self.batch.students.values_list('email', flat=True)), ['ada@example.com'])
+
+    def test_reimport_is_idempotent(self):
+        import_students(self.batch, self.roster(3))
+        summary = import_students(self.batch, self.roster(3))
+        self.assertEqual(summary['newly_created'], 0)
+        self.assertEqual(self.batch.students.count(), 3)
+
+    def test_query_count_does_not_grow_with_the_roster(self):
+        with CaptureQueriesContext(connection) as few:
+            import_students(self.batch, self.roster(2))
+        with CaptureQueriesContext(connection) as many:
+            import_students(self.batch, self.roster(40, start=100))
+        self.assertEqual(len(many), len(few))
+
+
+ROSTER = b"name,email\nAda Lovelace,ada@example.com\nAlan Turing,alan@example.com\n"
+
+
+class ImportJobTests(MediaTestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.batch = Batch.objects.create(
+            course=Course.objects.create(name='Python'), name='Morning', start_date='2026-01-01', end_date='2026-02-01'
+        )
+
+    def upload(self):
+        return self.client.post(
+            f'/api/batches/{self.batch.id}/add_students_from_file/',
+            {'file': SimpleUploadedFile('roster.csv', ROSTER), 'async': 'true'}, format='multipart',
+        )
+
+    def queue_job(self, **fields):
+        return ImportJob.objects.create(
+            kind='ADD_TO_BATCH', batch=self.batch, file=SimpleUploadedFile('roster.csv', ROSTER), **fields
+        )
+
+    def test_imports_during_the_request_without_a_worker(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['import_summary']['newly_created'], 2)
+        self.assertFalse(ImportJob.objects.exists())
+
+    @override_settings(IMPORT_JOBS_ASYNC=True)
+    def test_queues_a_job_when_a_worker_runs(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, 202, response.content)
+        job = ImportJob.objects.get(id=response.json()['import_job']['id'])
+        self.assertEqual(job.status, 'PENDING')
+        self.assertEqual(self.batch.students.count(), 0)
+
+    def test_stale_running_job_is_claimed_again(self):
+        fresh = self.queue_job(status='RUNNING')
+        stale = self.queue_job(status='RUNNING')
+        ImportJob.objects.filter(id=stale.id).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(claim_import_job(), stale)
+        self.assertIsNone(claim_import_job()) # The fresh job's worker is still alive
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, 'RUNNING')
+
+    def test_requeued_job_resumes_after_processed_rows(self):
+        job = self.queue_job(status='RUNNING', rows_processed=1, newly_created=1)
+        run_import_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'COMPLETED')
+        self.assertEqual((job.rows_processed, job.newly_created), (2, 2))
+        self.assertEqual(list(self.batch.students.values_list('email', flat=True)), ['alan@example.com'])
+
+
+class StoredFileReferenceTests(MediaTestCase):
+    def setUp(self):
+        self.employee = User.objects.create(username='e@example.com', email='e@example.com', role='EMPLOYEE')
+
+    def add_document(self, content=b'offer letter', title='Offer letter'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return EmployeeDocument.objects.create(
+                employee=self.employee, title=title, document=SimpleUploadedFile('scan-0042.pdf', content),
+            )
+
+    def delete(self, instance):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.delete()
+
+    def blob(self, name):
+        return StoredBlob.objects.filter(name=name).first()
+
+    def test_identical_uploads_share_one_file_until_both_rows_go(self):
+        first, second = self.add_document(), self.add_document()
+        name = first.document.name
+        self.assertEqual(second.document.name, name)
+        self.assertEqual(self.blob(name).ref_count, 2)
+        self.delete(first)
+        self.assertEqual(self.blob(name).ref_count, 1)
+        self.assertTrue(second.document.storage.exists(name))
+        self.delete(second)
+        self.assertIsNone(self.blob(name))
+        self.assertFalse(second.document.storage.exists(name))
+
+    def test_replacing_a_file_releases_the_old_one(self):
+        document = self.add_document()
+        old_name = document.document.name
+        document.document = SimpleUploadedFile('scan-0043.pdf', b'signed offer letter')
+        with self.captureOnCommitCallbacks(execute=True):
+            document.save()
+        self.assertIsNone(self.blob(old_name))
+        self.assertEqual(self.blob(document.document.name).ref_count, 1)
+
+    def test_reuploading_the_same_bytes_keeps_one_reference(self):
+        document = self.add_document()
+        document.document = SimpleUploadedFile('scan-0042.pdf', b'offer letter')
+        with self.captureOnCommitCallbacks(execute=True):
+            document.save()
+        self.assertEqual(self.blob(document.document.name).ref_count, 1)
+
+    def test_certificate_and_its_document_hold_a_reference_each(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            certification = Certification.objects.create(
+                employee=self.employee, title='AWS', institute='Amazon', start_date='2026-01-01',
+                certificate_file=SimpleUploadedFile('cert.pdf', b'certificate'),
+            )
+        name = certification.certificate_file.name
+        self.assertEqual(self.blob(name).ref_count, 2)
+        self.delete(certification)
+        self.assertEqual(self.blob(name).ref_count, 1)
+        self.assertTrue(EmployeeDocument.objects.get(employee=self.employee).document.storage.exists(name))
+
+    def test_filename_is_the_download_name_not_the_hash(self):
+        self.add_document()
+        client = APIClient()
+        client.force_authenticate(self.employee)
+        [document] = client.get('/api/employee-documents/').json()
+        self.assertEqual(document['filename'], 'Offer letter.pdf')
+
+
+class BatchMaterialGrantTests(MediaTestCase):
+    def setUp(self):
+        cache.clear() # The access index outlives each test's rolled-back rows
+        self.admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.batch = Batch.objects.create(course=Course.objects.create(name='Python'), name='Morning', start_date='2026-01-01', end_date='2026-02-01')
+        self.students = [User.objects.create(username=f'{n}@example.com', email=f'{n}@example.com', role='STUDENT') for n in range(3)]
+        self.batch.students.add(*self.students)
+        # A material of another course, so only the grant opens it
+        self.material = Material.objects.create(
+            title='Extra', course=Course.objects.create(name='Java'), type='PDF', content=SimpleUploadedFile('extra.pdf', b'%PDF-1.4 extra'),
+        )
+
+    def grant(self, action='assign_materials', ids=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/api/batches/{self.batch.id}/{action}/', {'material_ids': ids or [self.material.id]}, format='json')
+
+    def view_content(self, student):
+        client = APIClient()
+        client.force_authenticate(student)
+        return client.get(f'/api/materials/{self.material.id}/view_content/')
+
+    def test_one_grant_row_per_material_not_per_student(self):
+        self.assertEqual(self.grant().status_code, 200)
+        self.assertEqual(Batch.materials.through.objects.count(), 1)
+        self.assertFalse(User.assigned_materials.through.objects.exists())
+        self.assertEqual(self.view_content(self.students[0]).status_code, 200)
+
+    def test_students_joining_later_inherit_the_grant(self):
+        self.grant()
+        newcomer = User.objects.create(username='new@example.com', email='new@example.com', role='STUDENT')
+        self.assertEqual(self.view_content(newcomer).status_code, 403)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.batch.students.add(newcomer)
+        self.assertEqual(self.view_content(newcomer).status_code, 200)
+
+    def test_removing_the_grant_revokes_access(self):
+        self.grant()
+        self.assertEqual(self.view_content(self.students[0]).status_code, 200)
+        self.assertEqual(self.grant('remove_materials').status_code, 200)
+        self.assertEqual(self.view_content(self.students[0]).status_code, 403)
+
+    def test_unknown_material_ids_are_rejected(self):
+        self.assertEqual(self.grant(ids=[self.material.id, 9999]).status_code, 400)
+        self.assertFalse(Batch.materials.through.objects.exists())
+
+
+class RangeRequestTests(MediaTestCase):
+    body = b'%PDF-1.4 ' + bytes(range(48, 58)) * 10 # 109 bytes
+
+    def setUp(self):
+        admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        material = Material.objects.create(
+            title='Notes', course=Course.objects.create(name='Python'), type='PDF', content=SimpleUploadedFile('notes.pdf', self.body),
+        )
+        self.url = f'/api/materials/{material.id}/view_content/'
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        return response, b''.join(response.streaming_content) if response.streaming else response.content
+
+    def test_parse_range_header(self):
+        self.assertEqual(parse_range_header('bytes=0-9', 100), [(0, 9)])
+        self.assertEqual(parse_range_header('bytes=-10', 100), [(90, 99)])
+        self.assertEqual(parse_range_header('bytes=90-', 100), [(90, 99)])
+        self.assertEqual(parse_range_header('bytes=0-9, 5-19, 50-60', 100), [(0, 19), (50, 60)])
+        self.assertEqual(parse_range_header('bytes=200-300', 100), [])
+        self.assertIsNone(parse_range_header('bytes=9-0', 100))
+        self.assertIsNone(parse_range_header('items=0-9', 100))
+
+    def test_whole_file_advertises_ranges(self):
+        response, content = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, self.body)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_single_and_suffix_ranges(self):
+        response, content = self.get(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(content, self.body[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.body)}')
+
+        response, content = self.get(Range='bytes=-5')
+        self.assertEqual(content, self.body[-5:])
+
+    def test_multiple_ranges_are_multipart(self):
+        response, content = self.get(Range='bytes=0-3,100-')
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response['Content-Type'].startswith('multipart/byteranges; boundary='))
+        self.assertEqual(int(response['Content-Length']), len(content))
+        self.assertIn(b'Content-Range: bytes 0-3/109\r\n\r\n%PDF\r\n', content)
+        self.assertIn(b'Content-Range: bytes 100-108/109\r\n\r\n' + self.body[100:], content)
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.get(Range='bytes=500-600')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.body)}')
+
+    def test_if_range(self):
+        etag = self.get()[0]['ETag']
+        response, content = self.get(Range='bytes=0-3', If_Range=etag)
+        self.assertEqual((response.status_code, content), (206, b'%PDF'))
+        # A stale validator gets the current file whole
+        response, content = self.get(Range='bytes=0-3', If_Range='"stale"')
+        self.assertEqual((response.status_code, content), (200, self.body))
+
+    def test_if_none_match(self):
+        etag = self.get()[0]['ETag']
+        self.assertEqual(self.get(If_None_Match=etag)[0].status_code, 304)
+
+
+class FileDeliveryBackendTests(MediaTestCase):
+    def setUp(self):
+        admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.material = Material.objects.create(
+            title='Week 1 notes', course=Course.objects.create(name='Python'), type='PDF', content=SimpleUploadedFile('notes.pdf', b'%PDF-1.4 notes'),
+        )
+        self.url = f'/api/materials/{self.material.id}/view_content/'
+
+    @override_settings(FILE_DELIVERY_BACKEND='nginx', FILE_DELIVERY_INTERNAL_URL='/protected-media/')
+    def test_nginx_gets_an_internal_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.material.content.name)
+        self.assertEqual(response.content, b'')
+        self.assertIn('filename="Week 1 notes.pdf"', response['Content-Disposition'])
+        self.assertIn('private', response['Cache-Control'])
+
+    @override_settings(FILE_DELIVERY_BACKEND='apache')
+    def test_apache_gets_the_absolute_path(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], self.material.content.path)
+        self.assertEqual(response.content, b'')
+
+    @override_settings(FILE_DELIVERY_BACKEND='nginx')
+    def test_permission_check_runs_before_the_handover(self):
+        student = User.objects.create(username='s@example.com', email='s@example.com', role='STUDENT')
+        self.client.force_authenticate(student)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('X-Accel-Redirect', response)
+
+    @override_settings(FILE_DELIVERY_BACKEND='lighttpd')
+    def test_unknown_backend_is_a_configuration_error(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.client.get(self.url)
+
+
+class MaterialAccessIndexTests(TestCase):
+    def setUp(self):
+        cache.clear() # The index outlives each test's rolled-back rows
+        self.admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.student = User.objects.create(username='s@example.com', email='s@example.com', role='STUDENT')
+        self.trainer = User.objects.create(username='t@example.com', email='t@example.com', role='TRAINER')
+        self.batch = Batch.objects.create(course=Course.objects.create(name='Python'), name='Morning', start_date='2026-01-01', end_date='2026-02-01')
+        self.course_material = Material.objects.create(title='Course notes', course=self.batch.course, type='PDF', uploader=self.admin)
+        self.extra = Material.objects.create(title='Extra', course=Course.objects.create(name='Java'), type='PDF', uploader=self.admin)
+
+    def test_index_is_cached(self):
+        accessible_material_ids(self.student)
+        with self.assertNumQueries(0):
+            self.assertFalse(can_view_material(self.student, self.course_material.id))
+        self.assertTrue(can_view_material(self.admin, self.extra.id))
+
+    def test_enrolment_and_direct_grants_invalidate_the_student(self):
+        self.assertEqual(accessible_material_ids(self.student), frozenset())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.batch.students.add(self.student)
+        self.assertEqual(accessible_material_ids(self.student), {self.course_material.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.assigned_materials.add(self.extra)
+        self.assertEqual(accessible_material_ids(self.student), {self.course_material.id, self.extra.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.batch.students.remove(self.student)
+        self.assertEqual(accessible_material_ids(self.student), {self.extra.id})
+
+    def test_trainer_access_follows_schedules(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule = Schedule.objects.create(
+                trainer=self.trainer, batch=self.batch, start_date=timezone.now(), end_date=timezone.now() + timedelta(days=1),
+            )
+            schedule.materials.add(self.extra)
+        self.assertTrue(can_view_material(self.trainer, self.extra.id))
+        self.assertFalse(can_view_material(self.trainer, self.course_material.id))
+
+        other = User.objects.create(username='t2@example.com', email='t2@example.com', role='TRAINER')
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.trainer = other
+            schedule.save()
+        self.assertFalse(can_view_material(self.trainer, self.extra.id))
+        self.assertTrue(can_view_material(other, self.extra.id))
+
+    def test_material_changes_rebuild_every_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.batch.students.add(self.student)
+        self.assertFalse(can_view_material(self.student, self.extra.id))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.extra.course = self.batch.course
+            self.extra.save()
+        self.assertTrue(can_view_material(self.student, self.extra.id))
+
+    def test_role_change_does_not_reuse_the_old_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            public = Material.objects.create(title='Handbook', course=self.batch.course, type='PDF')
+        self.assertEqual(accessible_material_ids(self.student), frozenset())
+        self.student.role = 'TRAINER'
+        # Materials without an uploader are visible to every trainer
+        self.assertEqual(accessible_material_ids(self.student), {public.id})
+
+
+class CoverVariantTests(MediaTestCase):
+    def setUp(self):
+        source = BytesIO()
+        Image.new('RGBA', (800, 400), (200, 30, 30, 128)).save(source, 'PNG')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course = Course.objects.create(name='Python', cover_photo=SimpleUploadedFile('cover.png', source.getvalue()))
+        self.variants = variant_names('covers', self.course.cover_photo, COVER_WIDTHS)
+
+    def test_variants_are_built_on_upload_without_upscaling(self):
+        for fmt, names in self.variants.items():
+            for width, name in names:
+                with Image.open(derived_storage.path(name)) as image:
+                    self.assertEqual(image.format, FORMATS[fmt][0])
+                    self.assertEqual(image.size, (min(width, 800), min(width, 800) // 2))
+
+    def test_serializer_lists_every_format_and_width(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='s@example.com', email='s@example.com', role='STUDENT'))
+        data = client.get(f'/api/courses/{self.course.id}/').data['cover_variants']
+        self.assertEqual(set(data), {'webp', 'jpeg'})
+        self.assertEqual([variant['width'] for variant in data['webp']], list(COVER_WIDTHS))
+
+    def test_variant_is_public_and_immutable(self):
+        width, name = self.variants['webp'][0]
+        response = APIClient().get('/api/covers/' + name[len('derived/covers/'):])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+
+    def test_missing_variant_is_rebuilt_on_request(self):
+        _, name = self.variants['jpeg'][1]
+        os.remove(derived_storage.path(name))
+        self.assertEqual(APIClient().get('/api/covers/' + name[len('derived/covers/'):]).status_code, 200)
+        self.assertTrue(derived_storage.exists(name))
+
+    def test_unknown_widths_are_not_found(self):
+        _, name = self.variants['webp'][0]
+        self.assertEqual(APIClient().get('/api/covers/' + name[len('derived/covers/'):].replace('-320.', '-333.')).status_code, 404)
+
+
+class PdfPageTests(MediaTestCase):
+    def setUp(self):
+        writer = PdfWriter()
+        for width in (600, 600, 600, 800, 600):
+            writer.add_blank_page(width=width, height=400)
+        writer.add_metadata({'/Title': 'Week 1', '/Author': 'Trainer'})
+        source = BytesIO()
+        writer.write(source)
+        admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.material = Material.objects.create(
+                title='Notes', course=Course.objects.create(name='Python'), type='PDF', content=SimpleUploadedFile('notes.pdf', source.getvalue()),
+            )
+        self.url = f'/api/materials/{self.material.id}/pages/'
+
+    def page_count(self, response):
+        return len(PdfReader(BytesIO(b''.join(response.streaming_content))).pages)
+
+    def test_index_is_built_on_upload(self):
+        with self.assertNumQueries(2): # Material, then its stored PdfPageIndex
+            data = self.client.get(self.url).data
+        self.assertEqual(data['page_count'], 5)
+        self.assertEqual(data['pages'][3], {'number': 4, 'width': 800, 'height': 400})
+        self.assertEqual((data['metadata']['title'], data['metadata']['author']), ('Week 1', 'Trainer'))
+
+    def test_single_page_and_page_range(self):
+        response = self.client.get(self.url + '2/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(self.page_count(response), 1)
+        response = self.client.get(self.url + '2/', {'to': 4})
+        self.assertEqual(self.page_count(response), 3)
+        self.assertIn('pages 2-4', response['Content-Disposition'])
+
+    def test_versioned_url_is_immutable(self):
+        version = self.client.get(self.url).data['version']
+        self.assertIn('immutable', self.client.get(self.url + '1/', {'v': version})['Cache-Control'])
+        self.assertNotIn('immutable', self.client.get(self.url + '1/')['Cache-Control'])
+
+    def test_invalid_page_requests(self):
+        self.assertEqual(self.client.get(self.url + '6/').status_code, 400)
+        self.assertEqual(self.client.get(self.url + '3/', {'to': 2}).status_code, 400)
+        with mock.patch('core.views.MAX_PAGE_RANGE', 2):
+            self.assertEqual(self.client.get(self.url + '1/', {'to': 3}).status_code, 400)
+        self.assertEqual(self.client.get(self.url + '1/', {'type': 'gif'}).status_code, 400)
+
+    def test_page_images_need_the_rasteriser(self):
+        with mock.patch('core.thumbnails.previews_enabled', return_value=False):
+            self.assertEqual(self.client.get(self.url + '1/', {'type': 'webp', 'w': 640}).status_code, 404)
+
+    def test_non_pdf_has_no_pages(self):
+        video = Material.objects.create(
+            title='Intro', course=self.material.course, type='VIDEO', content=SimpleUploadedFile('intro.mp4', b'not a pdf'),
+        )
+        self.assertEqual(self.client.get(f'/api/materials/{video.id}/pages/').status_code, 404)
+
+
+class RendererTests(SimpleTestCase):
+    data = {
+        'price': Decimal('12.50'), 'when': datetime(2026, 1, 2, 3, 4, 5), 'note': 'line\u2028break',
+        'nested': [{'id': 1, 'tags': ('a', 'b')}], 1: 'numeric key',
+    }
+
+    def test_matches_drf_output(self):
+        self.assertEqual(json.loads(ORJSONRenderer().render(self.data)), json.loads(JSONRenderer().render(self.data)))
+        self.assertIn(b'\\u2028', ORJSONRenderer().render(self.data))
+
+    def test_indented_output_uses_drf(self):
+        self.assertEqual(
+            ORJSONRenderer().render({'a': 1}, 'application/json; indent=4'),
+            JSONRenderer().render({'a': 1}, 'application/json; indent=4'),
+        )
+
+    def test_parser(self):
+        self.assertEqual(ORJSONParser().parse(BytesIO('{"name": "Zoë"}'.encode())), {'name': 'Zoë'})
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b'{"name": '))
+
+
+@mock.patch.object(middleware, 'brotli', None)
+class CompressionMiddlewareTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        Course.objects.bulk_create(Course(name=f'Course {n}', description='An introduction ' * 20) for n in range(20))
+
+    def test_choose_encoding(self):
+        self.assertEqual(middleware.choose_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(middleware.choose_encoding('*;q=0.5'), 'gzip')
+        self.assertIsNone(middleware.choose_encoding('gzip;q=0, identity'))
+        self.assertIsNone(middleware.choose_encoding(''))
+
+    def test_large_json_is_gzipped(self):
+        plain = self.client.get('/api/courses/')
+        response = self.client.get('/api/courses/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content) / 5)
+        self.assertTrue(response['ETag'].startswith('W/'))
+
+    @override_settings(API_COMPRESSION_MIN_SIZE=10**6)
+    def test_small_responses_are_left_alone(self):
+        response = self.client.get('/api/courses/', headers={'Accept-Encoding': 'gzip'})
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+
+class UserListQueryTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.batch = Batch.objects.create(course=Course.objects.create(name='Python'), name='Morning', start_date='2026-01-01', end_date='2026-02-01')
+        self.add_users(0, 3)
+
+    def add_users(self, start, stop):
+        for n in range(start, stop):
+            student = User.objects.create(username=f'{n}@example.com', email=f'{n}@example.com', role='STUDENT')
+            student.batches.add(self.batch)
+            employee = User.objects.create(username=f'e{n}@example.com', email=f'e{n}@example.com', role='EMPLOYEE')
+            Certification.objects.create(employee=employee, title='AWS', institute='Amazon', start_date='2026-01-01')
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/users/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_prefetch_plan_follows_the_serializer(self):
+        self.assertEqual(set(prefetch_plan(UserListSerializer)), {'assigned_materials', 'assigned_assessments', 'batches'})
+        self.assertLessEqual(
+            {'education_entries', 'certification_entries', 'work_experience_entries'}, set(prefetch_plan(UserSerializer)),
+        )
+
+    def test_list_query_count_does_not_grow_with_users(self):
+        few, _ = self.list_queries()
+        self.add_users(3, 12)
+        many, response = self.list_queries()
+        self.assertEqual(few, many)
+        self.assertNotIn('certification_entries', response.data[0])
+        self.assertIn(self.batch.id, next(row for row in response.data if row['role'] == 'STUDENT')['batches'])
+
+    def test_detail_keeps_the_profile_nests(self):
+        employee = User.objects.filter(role='EMPLOYEE').first()
+        data = self.client.get(f'/api/users/{employee.id}/').data
+        self.assertEqual([entry['title'] for entry in data['certification_entries']], ['AWS'])
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.course = Course.objects.create(name='Python')
+        material = Material.objects.create(title='Notes', course=self.course, type='PDF')
+        module = Module.objects.create(course=self.course, module_number=1, title='Basics')
+        module.materials.add(material)
+        self.college = College.objects.create(name='North')
+        self.college.courses.add(self.course)
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/colleges/', params)
+        return response, [query['sql'] for query in queries]
+
+    def test_full_shape_without_parameters(self):
+        response, _ = self.get()
+        self.assertEqual(response.data[0]['courses'][0]['modules'][0]['materials'][0]['title'], 'Notes')
+
+    def test_fields_trim_the_json_and_the_sql(self):
+        response, queries = self.get(fields='id,name')
+        self.assertEqual(response.data, [{'id': self.college.id, 'name': 'North'}])
+        self.assertFalse([sql for sql in queries if 'core_course' in sql or 'core_material' in sql])
+        self.assertNotIn('"address"', next(sql for sql in queries if 'FROM "core_college"' in sql))
+
+    def test_relations_are_ids_unless_expanded(self):
+        response, queries = self.get(fields='id,courses')
+        self.assertEqual(response.data[0]['courses'], [self.course.id])
+        self.assertFalse([sql for sql in queries if 'core_module' in sql])
+
+        response, _ = self.get(expand='courses')
+        course = response.data[0]['courses'][0]
+        self.assertEqual((course['name'], course['modules']), ('Python', [self.course.modules.get().id]))
+
+    def test_selecting_inside_a_relation_expands_it(self):
+        response, queries = self.get(fields='name,courses.name,courses.modules.title')
+        self.assertEqual(response.data, [{'name': 'North', 'courses': [{'name': 'Python', 'modules': [{'title': 'Basics'}]}]}])
+        self.assertFalse([sql for sql in queries if 'core_material' in sql])
+
+    def test_unknown_or_unexpandable_fields_are_rejected(self):
+        self.assertEqual(self.get(fields='id,colour')[0].status_code, 400)
+        self.assertEqual(self.get(fields='courses.colour')[0].status_code, 400)
+        self.assertEqual(self.get(expand='name')[0].status_code, 400)
+
+
+class CollegeSummaryTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.college, other_college = College.objects.create(name='North'), College.objects.create(name='South')
+        python, java, sql = (Course.objects.create(name=name) for name in ('Python', 'Java', 'SQL'))
+        self.college.courses.add(python, java, sql)
+        today = timezone.localdate()
+        self.current = Batch.objects.create(course=python, college=self.college, name='Now', start_date=today - timedelta(days=5), end_date=today + timedelta(days=5))
+        past = Batch.objects.create(course=java, college=self.college, name='Past', start_date=today - timedelta(days=50), end_date=today - timedelta(days=20))
+        elsewhere = Batch.objects.create(course=python, college=other_college, name='Elsewhere', start_date=today, end_date=today)
+        self.students = [
+            User.objects.create(username=f'{name}@example.com', email=f'{name}@example.com', first_name=name, role='STUDENT')
+            for name in ('Cara', 'Abe', 'Bea', 'Dan')
+        ]
+        self.current.students.add(*self.students[:3])
+        past.students.add(self.students[0])
+        elsewhere.students.add(self.students[0], self.students[3])
+        trainer = User.objects.create(username='t@example.com', email='t@example.com', role='TRAINER')
+        now = timezone.now()
+        Schedule.objects.create(trainer=trainer, batch=self.current, start_date=now - timedelta(hours=1), end_date=now + timedelta(hours=1))
+        Schedule.objects.create(trainer=trainer, batch=self.current, start_date=now + timedelta(days=1), end_date=now + timedelta(days=2))
+        Schedule.objects.create(trainer=trainer, batch=elsewhere, start_date=now - timedelta(hours=1), end_date=now + timedelta(hours=1))
+
+    def test_summary_counts_only_this_college(self):
+        with self.assertNumQueries(5): # The college, then one aggregate each for batches, students, schedules and courses
+            data = self.client.get(f'/api/colleges/{self.college.id}/summary/').data
+        self.assertEqual(
+            (data['student_count'], data['batch_count'], data['active_batch_count']), (3, 2, 1),
+        )
+        self.assertEqual((data['course_count'], data['courses_with_batches']), (3, 2))
+        self.assertEqual((data['schedule_count'], data['active_schedule_count'], data['upcoming_schedule_count']), (2, 1, 1))
+        python = next(course for course in data['courses'] if course['name'] == 'Python')
+        self.assertEqual((python['batch_count'], python['student_count']), (1, 3))
+
+    def test_roster_pages_by_name_with_this_college_batches(self):
+        url = f'/api/colleges/{self.college.id}/roster/'
+        first = self.client.get(url, {'page_size': 2}).data
+        self.assertEqual([row['full_name'] for row in first['results']], ['Abe', 'Bea'])
+        rest = self.client.get(first['next']).data
+        self.assertEqual([row['full_name'] for row in rest['results']], ['Cara'])
+        self.assertIsNone(rest['next'])
+        self.assertEqual(rest['results'][0]['courses'], ['Java', 'Python']) # Not the other college's batch
+
+    def test_admins_only(self):
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get(f'/api/colleges/{self.college.id}/summary/').status_code, 403)
+        self.assertEqual(self.client.get(f'/api/colleges/{self.college.id}/roster/').status_code, 403)
+
+    def test_unknown_college(self):
+        self.assertEqual(self.client.get('/api/colleges/9999/summary/').status_code, 404)
+
+
+class ListFilterTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create(username='admin@example.com', email='admin@example.com', first_name='Zed', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.batch = Batch.objects.create(course=Course.objects.create(name='Python'), name='Morning', start_date='2026-01-01', end_date='2026-02-01')
+        self.trainer = User.objects.create(username='t@example.com', email='t@example.com', first_name='Tess', role='TRAINER')
+        for name in ('Bea', 'Abe'):
+            student = User.objects.create(username=f'{name}@example.com', email=f'{name}@example.com', first_name=name, role='STUDENT')
+            student.batches.add(self.batch)
+
+    def ids(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['id'] for row in response.data]
+
+    def names(self, **params):
+        response = self.client.get('/api/users/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['full_name'] for row in response.data]
+
+    def test_users_by_role_and_batch_with_ordering(self):
+        self.assertEqual(self.names(role='STUDENT', ordering='first_name'), ['Abe', 'Bea'])
+        self.assertEqual(self.names(role='STUDENT,TRAINER', ordering='-first_name'), ['Tess', 'Bea', 'Abe'])
+        # A to-many filter doesn't repeat rows
+        self.batch.students.add(self.trainer)
+        self.assertEqual(self.names(batch=self.batch.id, ordering='first_name'), ['Abe', 'Bea', 'Tess'])
+
+    def test_schedule_date_window(self):
+        now = timezone.now()
+        past = Schedule.objects.create(trainer=self.trainer, batch=self.batch, start_date=now - timedelta(days=3), end_date=now - timedelta(days=2))
+        current = Schedule.objects.create(trainer=self.trainer, batch=self.batch, start_date=now - timedelta(hours=1), end_date=now + timedelta(hours=1))
+        Schedule.objects.create(trainer=self.trainer, batch=self.batch, start_date=now + timedelta(days=2), end_date=now + timedelta(days=3))
+        window = {'since': (now - timedelta(days=1)).isoformat(), 'until': timezone.localdate(now + timedelta(days=1)).isoformat()}
+        self.assertEqual(self.ids('/api/schedules/', **window), [current.id])
+        self.assertEqual(self.ids('/api/schedules/', until=timezone.localdate(now - timedelta(days=1)).isoformat()), [past.id])
+
+    def test_bills_by_month_and_status(self):
+        march = Bill.objects.create(trainer=self.trainer, date='2026-03-31', status='PAID', invoice_number='INV-1')
+        Bill.objects.create(trainer=self.trainer, date='2026-04-01', invoice_number='INV-2')
+        self.assertEqual(self.ids('/api/bills/', month='2026-03'), [march.id])
+        self.assertEqual(self.ids('/api/bills/', status='PAID', trainer=self.trainer.id), [march.id])
+
+    def test_invalid_values_are_rejected(self):
+        self.assertEqual(self.client.get('/api/users/', {'role': 'WIZARD'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/users/', {'batch': 'morning'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/users/', {'is_active': 'true,false'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/bills/', {'month': '2026-13'}).status_code, 400)
+
+    def test_undeclared_ordering_is_rejected(self):
+        response = self.client.get('/api/users/', {'ordering': 'password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.data)
+
+    def test_ordering_carries_into_keyset_pages(self):
+        first = self.client.get('/api/users/', {'role': 'STUDENT,TRAINER', 'ordering': 'first_name', 'page_size': 2}).data
+        self.assertEqual([row['full_name'] for row in first['results']], ['Abe', 'Bea'])
+        self.assertEqual([row['full_name'] for row in self.client.get(first['next']).data['results']], ['Tess'])
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.course = Course.objects.create(name='Python Programming', description='Loops and functions')
+        self.batch = Batch.objects.create(course=self.course, name='Morning', start_date='2026-01-01', end_date='2026-02-01')
+        self.student = User.objects.create(
+            username='john.doe@example.com', email='john.doe@example.com', first_name='John', last_name='Doe', role='STUDENT',
+        )
+        self.batch.students.add(self.student)
+        self.notes = Material.objects.create(title='Python notes', course=self.course, type='PDF')
+        self.hidden = Material.objects.create(title='Python answers', course=Course.objects.create(name='Trainers only'), type='PDF')
+
+    def search(self, **params):
+        response = self.client.get('/api/search/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [(hit['kind'], hit['object_id']) for hit in response.data['results']]
+
+    def test_prefixes_and_email_parts_match(self):
+        self.assertIn(('USER', self.student.id), self.search(q='doe'))
+        self.assertIn(('USER', self.student.id), self.search(q='jo do'))
+        # The course matches on its title, its batch and material only on their subtitle
+        self.assertEqual(self.search(q='progr')[0], ('COURSE', self.course.id))
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.search(q='python notes'), [('MATERIAL', self.notes.id)])
+
+    def test_kind_filter(self):
+        self.assertEqual({kind for kind, _ in self.search(q='python', kind='material')}, {'MATERIAL'})
+
+    def test_index_follows_edits_and_deletes(self):
+        self.course.name = 'Advanced Python'
+        self.course.save()
+        # Materials and batches show their course's name
+        self.assertEqual(SearchEntry.objects.get(kind='BATCH', object_id=self.batch.id).subtitle, 'Advanced Python')
+        self.notes.delete()
+        self.assertNotIn(('MATERIAL', self.notes.id), self.search(q='python'))
+
+    def test_results_are_limited_to_what_the_role_sees(self):
+        self.client.force_authenticate(self.student)
+        hits = self.search(q='python')
+        self.assertIn(('MATERIAL', self.notes.id), hits)
+        self.assertNotIn(('MATERIAL', self.hidden.id), hits)
+        self.assertEqual(self.search(q='admin', kind='user'), [])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get('/api/search/').status_code, 400)
+        self.assertEqual(self.client.get('/api/search/', {'q': '@@'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/search/', {'q': 'python', 'kind': 'invoice'}).status_code, 400)
+
+    def test_rebuild_restores_missing_and_drops_stale_entries(self):
+        SearchEntry.objects.filter(kind='COURSE').delete()
+        SearchEntry.objects.create(kind='USER', object_id=9999, title='Gone')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search(q='progr', kind='course'), [('COURSE', self.course.id)])
+        self.assertFalse(SearchEntry.objects.filter(kind='USER', object_id=9999).exists())
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        python, java = Course.objects.create(name='Python'), Course.objects.create(name='Java')
+        self.college = College.objects.create(name='KSSEM')
+        self.python_batch = Batch.objects.create(course=python, college=self.college, name='Py', start_date='2026-01-01', end_date='2026-02-01')
+        self.java_batch = Batch.objects.create(course=java, college=self.college, name='Java', start_date='2026-01-01', end_date='2026-02-01')
+        self.python, self.java = python, java
+        self.student = User.objects.create(username='s@example.com', email='s@example.com', role='STUDENT')
+        self.other = User.objects.create(username='o@example.com', email='o@example.com', role='STUDENT')
+        self.student.batches.add(self.python_batch, self.java_batch)
+        self.other.batches.add(self.python_batch)
+        # Tagged by course name, and through a material of the course
+        self.python_quiz = Assessment.objects.create(title='Py quiz', course='Python', type='TEST')
+        slides = Material.objects.create(title='Slides', course=java, type='PDF', content='slides.pdf')
+        self.java_quiz = Assessment.objects.create(title='Java quiz', course='', type='TEST', material=slides)
+
+    def boards(self, student):
+        return {
+            (scope, scope_id): (total, attempts) for scope, scope_id, total, attempts in
+            LeaderboardEntry.objects.filter(student=student).values_list('scope', 'scope_id', 'total_score', 'attempts')
+        }
+
+    def assert_matches_a_rebuild(self):
+        live = {student: self.boards(student) for student in (self.student, self.other)}
+        refresh_leaderboard([self.student.id, self.other.id])
+        self.assertEqual(live, {student: self.boards(student) for student in (self.student, self.other)})
+
+    def test_scoped_boards_count_only_their_course(self):
+        StudentAttempt.objects.create(student=self.student, assessment=self.python_quiz, score=10)
+        StudentAttempt.objects.create(student=self.student, assessment=self.java_quiz, score=30)
+        self.assertEqual(self.boards(self.student), {
+            ('GLOBAL', 0): (40, 2),
+            ('COURSE', self.python.id): (10, 1), ('BATCH', self.python_batch.id): (10, 1),
+            ('COURSE', self.java.id): (30, 1), ('BATCH', self.java_batch.id): (30, 1),
+            ('COLLEGE', self.college.id): (40, 2),
+        })
+        self.assert_matches_a_rebuild()
+
+    def test_rank_within_a_batch(self):
+        StudentAttempt.objects.create(student=self.student, assessment=self.python_quiz, score=10)
+        StudentAttempt.objects.create(student=self.student, assessment=self.java_quiz, score=90) # Not a Py batch score
+        StudentAttempt.objects.create(student=self.other, assessment=self.python_quiz, score=20)
+        client = APIClient()
+        client.force_authenticate(self.student)
+        response = client.get(f'/api/leaderboard/?scope=batch&scope_id={self.python_batch.id}').json()
+        self.assertEqual([(entry['studentId'], entry['rank']) for entry in response['leaderboard']], [(self.other.id, 1), (self.student.id, 2)])
+        self.assertEqual((response['me']['totalScore'], response['me']['rank']), (10, 2))
+
+    def test_moving_an_attempt_refreshes_both_students(self):
+        attempt = StudentAttempt.objects.create(student=self.student, assessment=self.python_quiz, score=10)
+        attempt.student = self.other
+        attempt.save()
+        self.assertEqual(self.boards(self.student), {})
+        self.assertEqual(self.boards(self.other)[('BATCH', self.python_batch.id)], (10, 1))
+        self.assert_matches_a_rebuild()
+
+    def test_deleting_the_last_attempt_on_a_board_drops_it(self):
+        StudentAttempt.objects.create(student=self.student, assessment=self.python_quiz, score=10)
+        java_attempt = StudentAttempt.objects.create(student=self.student, assessment=self.java_quiz, score=30)
+        java_attempt.delete()
+        self.assertEqual(set(self.boards(self.student)), {
+            ('GLOBAL', 0), ('COURSE', self.python.id), ('BATCH', self.python_batch.id), ('COLLEGE', self.college.id),
+        })
+        self.assertEqual(self.boards(self.student)[('COLLEGE', self.college.id)], (10, 1))
+
+
+class ScoreAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear() # Reports outlive each test's rolled-back rows
+        self.admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.course = Course.objects.create(name='Python')
+        self.batch = Batch.objects.create(course=self.course, name='Morning', start_date='2026-01-01', end_date='2026-02-01')
+        self.quiz = Assessment.objects.create(title='Py quiz', course='Python', type='TEST')
+        self.other = Assessment.objects.create(title='Java quiz', course='Java', type='TEST')
+        self.students = [User.objects.create(username=f'{n}@example.com', email=f'{n}@example.com', role='STUDENT') for n in range(4)]
+        self.batch.students.add(*self.students[:2])
+        for student, score in zip(self.students, (10, 40, 70, 100)):
+            StudentAttempt.objects.create(student=student, assessment=self.quiz, score=score)
+        StudentAttempt.objects.create(student=self.students[0], assessment=self.other, score=90)
+
+    def report(self, **params):
+        return self.client.get('/api/reporting/analytics/', params)
+
+    def test_summary_statistics(self):
+        response = self.report(course=self.course.id, bins=4)
+        self.assertEqual(response.status_code, 200)
+        overall = response.data['overall']
+        self.assertEqual(overall['attempts'], 4)
+        self.assertEqual(overall['mean'], 55)
+        self.assertEqual(overall['median'], 55)
+        self.assertEqual(overall['p90'], 91)
+        self.assertEqual(overall['pass_rate'], 0.75)
+        self.assertEqual([bucket['count'] for bucket in overall['histogram']], [1, 1, 1, 1])
+        self.assertEqual([row['title'] for row in response.data['assessments']], ['Py quiz'])
+
+    def test_batch_filter_only_reports_that_batch(self):
+        data = self.report(batch=self.batch.id).data
+        self.assertEqual(data['overall']['attempts'], 3)
+        self.assertEqual([(row['batch_id'], row['attempts']) for row in data['batches']], [(self.batch.id, 3)])
+
+    def test_new_attempt_invalidates_the_cached_report(self):
+        self.assertEqual(self.report(assessment=self.quiz.id).data['overall']['attempts'], 4)
+        with CaptureQueriesContext(connection) as queries:
+            self.report(assessment=self.quiz.id)
+        self.assertFalse([q for q in queries if 'core_studentattempt' in q['sql']])
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentAttempt.objects.create(student=self.students[3], assessment=self.quiz, score=50)
+        self.assertEqual(self.report(assessment=self.quiz.id).data['overall']['attempts'], 5)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.report(bins='many').status_code, 400)
+        self.assertEqual(self.report(bins=0).status_code, 400)
+        self.assertEqual(self.report(course=9999).status_code, 404)
+
+    def test_students_are_forbidden(self):
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.report().status_code, 403)
+
+
+class ResumableUploadTests(MediaTestCase):
+    CONTENT = b'%PDF-1.4 ' + b'x' * 991
+
+    def setUp(self):
+        self.admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.course = Course.objects.create(name='Python')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.session = self.client.post('/api/uploads/', {'filename': 'big.pdf', 'size': len(self.CONTENT)}).json()
+
+    def put(self, start, end, total=None, body=None):
+        return self.client.put(
+            f"/api/uploads/{self.session['id']}/", body if body is not None else self.CONTENT[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f"bytes {start}-{end}/{total or len(self.CONTENT)}",
+        )
+
+    def finalize(self):
+        return self.client.post(f"/api/uploads/{self.session['id']}/finalize/", {'title': 'Big', 'course': self.course.id, 'type': 'PDF'})
+
+    def stored_hash(self):
+        return content_hash(Material.objects.get().content.name)
+
+    def test_chunks_must_continue_at_the_received_offset(self):
+        self.assertEqual(self.put(0, 499).json()['received'], 500)
+        response = self.put(600, 999)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['received'], 500)
+
+    def test_content_range_must_match_the_upload_size(self):
+        response = self.put(0, 499, total=5000)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['received'], 0)
+
+    def test_short_body_is_rejected_and_can_be_resent(self):
+        self.assertEqual(self.put(0, 499, body=self.CONTENT[:100]).status_code, 400)
+        self.assertEqual(self.put(0, 499).json()['received'], 500)
+
+    def test_finalize_uses_the_running_hash(self):
+        self.put(0, 499)
+        self.put(500, 999)
+        with mock.patch.object(hashlib, 'sha256', side_effect=AssertionError("finalize re-hashed the file")):
+            response = self.finalize()
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.stored_hash(), hashlib.sha256(self.CONTENT).hexdigest())
+
+    def test_finalize_hashes_the_file_without_a_running_hash(self):
+        self.put(0, 499)
+        uploads._running_hashes.clear() # As if the next chunk went to another worker process
+        self.put(500, 999)
+        self.assertEqual(self.finalize().status_code, 201)
+        self.assertEqual(self.stored_hash(), hashlib.sha256(self.CONTENT).hexdigest())
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncDeltaTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin@example.com', email='admin@example.com', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def sync(self, since):
+        return self.client.get(f'/api/sync/?since={since}').json()
+
+    def test_since_must_be_an_integer(self):
+        self.assertEqual(self.client.get('/api/sync/?since=yesterday').status_code, 400)
+
+    def test_changes_after_since_are_upserts(self):
+        since = self.client.get('/api/bootstrap/').json()['version']
+        course = Course.objects.create(name='Python')
+        response = self.sync(since)
+        self.assertEqual([row['id'] for row in response['upserts']['courses']], [course.id])
+        self.assertGreater(response['version'], since)
+        self.assertEqual(self.sync(response['version'])['upserts'], {})
+
+    @override_settings(SYNC_SETTLE_SECONDS=3600)
+    def test_unsettled_changes_are_sent_again(self):
+        since = self.client.get('/api/bootstrap/').json()['version']
+        Course.objects.create(name='Python')
+        response = self.sync(since)
+        self.assertIn('courses', response['upserts'])
+        self.assertEqual(response['version'], since) # Too recent to count as synced
+
+    def test_large_deltas_are_paged(self):
+        since = self.client.get('/api/bootstrap/').json()['version']
+        Course.objects.bulk_create([Course(name=f'Course {n}') for n in range(5)])
+        record_changes([('courses', course.id) for course in Course.objects.all()])
+        with mock.patch.object(SyncView, 'max_changes', 3):
+            first = self.sync(since)
+            second = self.sync(first['version'])
+        self.assertTrue(first['has_more'])
+        self.assertFalse(second['has_more'])
+        self.assertEqual(len(first['upserts']['courses']) + len(second['upserts']['courses']), 5)
+
+    def test_pruned_versions_reset(self):
+        Course.objects.create(name='Python')
+        Course.objects.create(name='Java')
+        Course.objects.create(name='Go')
+        ChangeLog.objects.update(changed_at=timezone.now() - timedelta(days=90))
+        call_command('prune_changelog', stdout=StringIO())
+        self.assertEqual(ChangeLog.objects.count(), 1) # The newest entry is kept
+        self.assertTrue(self.sync(0)['reset'])
+        self.assertFalse(self.sync(ChangeLog.objects.get().id)['reset'])
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncVisibilityTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name='Python')
+        self.material = Material.objects.create(title='Slides', course=self.course, type='PDF', content='slides.pdf')
+        self.batch = Batch.objects.create(course=self.course, name='Morning', start_date='2026-01-01', end_date='2026-02-01')
+        self.student = User.objects.create(username='s@example.com', email='s@example.com', role='STUDENT')
+        self.other = User.objects.create(username='o@example.com', email='o@example.com', role='STUDENT')
+        self.trainer = User.objects.create(username='t@example.com', email='t@example.com', role='TRAINER')
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def version(self, user):
+        return self.client_for(user).get('/api/bootstrap/').json()['version']
+
+    def sync(self, user, since):
+        return self.client_for(user).get(f'/api/sync/?since={since}').json()
+
+    def test_enrollment_resets_the_student(self):
+        since = self.version(self.student)
+        self.batch.students.add(self.student)
+        self.assertTrue(self.sync(self.student, since)['reset'])
+        snapshot = self.client_for(self.student).get('/api/bootstrap/').json()
+        self.assertEqual([course['id'] for course in snapshot['courses']], [self.course.id])
+        self.assertIn(self.material.id, [material['id'] for material in snapshot['materials']])
+
+    def test_unenrollment_resets_the_student(self):
+        self.batch.students.add(self.student)
+        since = self.version(self.student)
+        self.batch.students.remove(self.student)
+        self.assertTrue(self.sync(self.student, since)['reset'])
+        snapshot = self.client_for(self.student).get('/api/bootstrap/').json()
+        self.assertEqual(snapshot['courses'], [])
+
+    def test_clearing_a_batch_resets_its_students(self):
+        self.batch.students.add(self.student)
+        since = self.version(self.student)
+        self.batch.students.clear()
+        self.assertTrue(self.sync(self.student, since)['reset'])
+
+    def test_roster_import_resets_returning_students(self):
+        since = self.version(self.student)
+        import_students(self.batch, [(2, 'Sam Student', 's@example.com')])
+        self.assertTrue(self.sync(self.student, since)['reset'])
+
+    def test_other_users_are_not_reset(self):
+        since = self.version(self.other)
+        self.batch.students.add(self.student)
+        response = self.sync(self.other, since)
+        self.assertFalse(response['reset'])
+        self.assertEqual(response['tombstones'], {}) # The new student's id is none of their business
+
+    def test_schedule_trainer_change_resets_both_trainers(self):
+        schedule = Schedule.objects.create(trainer=self.trainer, batch=self.batch, start_date=timezone.now(), end_date=timezone.now())
+        replacement = User.objects.create(username='r@example.com', email='r@example.com', role='TRAINER')
+        since = self.version(self.trainer)
+        schedule.trainer = replacement
+        schedule.save()
+        self.assertTrue(self.sync(self.trainer, since)['reset'])
+        self.assertTrue(self.sync(replacement, since)['reset'])
+
+    def test_new_schedule_resets_its_trainer(self):
+        since = self.version(self.trainer)
+        Schedule.objects.create(trainer=self.trainer, batch=self.batch, start_date=timezone.now(), end_date=timezone.now())
+        self.assertTrue(self.sync(self.trainer, since)['reset'])
+
+    def test_recoursing_a_batch_resets_its_students(self):
+        self.batch.students.add(self.student)
+        since = self.version(self.student)
+        self.batch.course = Course.objects.create(name='Java')
+        self.batch.save()
+        self.assertTrue(self.sync(self.student, since)['reset'])
+
+    def test_batch_material_grant_resets_the_batch_students(self):
+        other_course = Course.objects.create(name='Java')
+        extra = Material.objects.create(title='Extra', course=other_course, type='PDF', content='extra.pdf')
+        self.batch.students.add(self.student)
+        since = self.version(self.student)
+        extra.assigned_batches.add(self.batch)
+        self.assertTrue(self.sync(self.student, since)['reset'])
+
+    def test_unrelated_edit_is_an_upsert_not_a_reset(self):
+        self.batch.students.add(self.student)
+        since = self.version(self.student)
+        self.material.title = 'New slides'
+        self.material.save()
+        response = self.sync(self.student, since)
+        self.assertFalse(response['reset'])
+        self.assertEqual([material['title'] for material in response['upserts']['materials']], ['New slides'])
+
+    def test_deleted_rows_are_tombstones(self):
+        self.batch.students.add(self.student)
+        since = self.version(self.student)
+        material_id = self.material.id
+        self.material.delete()
+        response = self.sync(self.student, since)
+        self.assertFalse(response['reset'])
+        self.assertEqual(response['tombstones'].get('materials'), [material_id])
@@ -0,0 +1,224 @@
+# backend/core/thumbnails.py
+
+import importlib.util
+import os
+import re
+import tempfile
+from functools import lru_cache
+
+from django.core.files.storage import FileSystemStorage
+from PIL import Image, ImageOps
+
+from .storage import content_hash
+
+# Widths (px) generated for each source; a source narrower than a width is
+# never upscaled, that variant is just the source size re-encoded
+COVER_WIDTHS = (320, 640, 1280)
+PREVIEW_WIDTHS = (320, 640)
+
+# format -> (Pillow format, extension, content type, save options)
+FORMATS = {
+    'webp': ('WEBP', 'webp', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Derivative names embed the source hash, so a given URL never changes content
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+# derived/<kind>/ab/cd/<rest of the source hash>-<width>.<ext>
+DERIVED_NAME = re.compile(r'^derived/(covers|previews)/([0-9a-f]{2})/([0-9a-f]{2})/([0-9a-f]{60})-(\d+)\.(webp|jpg)$')
+
+# Plain FileSystemStorage under MEDIA_ROOT: derivatives are already named by
+# content and must keep those names (and stay reachable for X-Accel-Redirect)
+derived_storage = FileSystemStorage()
+
+
+class DerivedFile:
+    """Just enough of FieldFile over a derivative for downloads.file_response()."""
+
+    def __init__(self, name):
+        self.name = name
+        self.storage = derived_storage
+
+    def __bool__(self):
+        return True
+
+    @property
+    def size(self):
+        return self.storage.size(self.name)
+
+    @property
+    def path(self):
+        return self.storage.path(self.name)
+
+    def open(self, mode='rb'):
+        return self.storage.open(self.name, mode)
+
+
+def derivative_name(kind, digest, width, fmt):
+    return f"derived/{kind}/{digest[:2]}/{digest[2:4]}/{digest[4:]}-{width}.{FORMATS[fmt][1]}"
+
+
+# Any derivative: derived/<kind>/ab/cd/<rest of the source hash>-<variant>
+DERIVED_SOURCE = re.compile(r'^derived/\w+/([0-9a-f]{2})/([0-9a-f]{2})/([0-9a-f]{60})-')
+
+
+def derived_source_hash(name):
+    """Content hash of the file a derivative was made from, or None."""
+    match = DERIVED_SOURCE.match(name or '')
+    return ''.join(match.groups()) if match else None
+
+
+def parse_derivative_name(name):
+    """(kind, source hash, width, format) for a derivative name, or None."""
+    match = DERIVED_NAME.match(name or '')
+    if not match:
+        return None
+    kind, first, second, rest, width, extension = match.groups()
+    fmt = next(fmt for fmt, spec in FORMATS.items() if spec[1] == extension)
+    return kind, first + second + rest, int(width), fmt
+
+
+def variant_names(kind, field_file, widths):
+    """
+    {format: [(width, name), ...]} for the derivatives of `field_file`.
+    Worked out from the stored name alone (no file access), so serializers
+    can list them cheaply. Empty for files not yet in the content-addressed
+    layout (run `manage.py dedupe_media`).
+    """
+    digest = content_hash(field_file.name) if field_file else None
+    if not digest:
+        return {}
+    return {fmt: [(width, derivative_name(kind, digest, width, fmt)) for width in widths] for fmt in FORMATS}
+
+
+def _flatten(image):
+    # JPEG has no alpha and WebP gains nothing from palettes; normalise to RGB(A)
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB') if image.mode != 'RGB' else image
+
+
+def write_derivative(name, write):
+    """Create derivative `name` by calling write(file); `file` is renamed into place once complete."""
+    path = derived_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Written aside then renamed, so a concurrent reader never sees half a file
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix='.derived-', delete=False) as temp:
+        try:
+            write(temp)
+        except BaseException:
+            temp.close()
+            os.unlink(temp.name)
+            raise
+    os.replace(temp.name, path)
+
+
+def write_image(image, name, fmt):
+    pil_format, _, _, options = FORMATS[fmt]
+    write_derivative(name, lambda file: image.save(file, pil_format, **options))
+
+
+def _render_variants(image, variants, force=False):
+    """Resize `image` to each (width, name) of {format: [...]}; returns the names written."""
+    written = []
+    # Largest first, each smaller size resampled from the previous one: far
+    # cheaper than going back to a multi-megapixel original every time
+    widths = sorted({width for names in variants.values() for width, _ in names}, reverse=True)
+    current = image
+    for width in widths:
+        if width < current.width:
+            current = current.resize((width, max(1, round(current.height * width / current.width))), Image.LANCZOS)
+        for fmt, names in variants.items():
+            for variant_width, name in names:
+                if variant_width == width and (force or not derived_storage.exists(name)):
+                    write_image(current, name, fmt)
+                    written.append(name)
+    return written
+
+
+def _missing(variants):
+    return any(not derived_storage.exists(name) for names in variants.values() for _, name in names)
+
+
+def build_cover_variants(course, force=False):
+    """Write the WebP/JPEG variants of `course.cover_photo` that aren't on disk yet."""
+    variants = variant_names('covers', course.cover_photo, COVER_WIDTHS)
+    if not variants or not (force or _missing(variants)):
+        return []
+    try:
+        with course.cover_photo.open('rb') as source:
+            image = Image.open(source)
+            # Let the JPEG decoder downscale by powers of two while reading
+            image.draft('RGB', (max(COVER_WIDTHS), max(COVER_WIDTHS)))
+            image.load() # Decode before the file closes
+            image = _flatten(ImageOps.exif_transpose(image))
+    except (OSError, Image.DecompressionBombError): # Missing, truncated or not an image
+        return []
+    return _render_variants(image, variants, force)
+
+
+def is_pdf(material):
+    return bool(material.content) and (
+        material.type == 'PDF' or material.content.name.lower().endswith('.pdf')
+    )
+
+
+@lru_cache(maxsize=None)
+def previews_enabled():
+    """Whether the optional PDF rasteriser (pypdfium2) is installed."""
+    return importlib.util.find_spec('pypdfium2') is not None
+
+
+def render_page(field_file, page_index, width):
+    """
+    Page `page_index` (0-based) of a stored PDF as an RGB image `width` px
+    wide, or None without pypdfium2 or for a page it can't render.
+    """
+    if not previews_enabled():
+        return None
+    import pypdfium2 # Lazily: optional, and only the workers that render pages need it
+
+    try:
+        source = field_file.path # A path lets pdfium read just the objects the page needs
+    except NotImplementedError:
+        with field_file.open('rb') as file:
+            source = file.read()
+    try:
+        document = pypdfium2.PdfDocument(source)
+    except pypdfium2.PdfiumError: # Encrypted or damaged
+        return None
+    try:
+        if not 0 <= page_index < len(document):
+            return None
+        page = document[page_index]
+        try:
+            bitmap = page.render(scale=width / page.get_width())
+            return _flatten(bitmap.to_pil().copy()) # Detach from the page's buffer
+        finally:
+            page.close()
+    finally:
+        document.close()
+
+
+def build_pdf_preview(material, force=False):
+    """
+    Write first-page previews of a PDF material. Needs the optional
+    `pypdfium2` package; without it (or for an unreadable PDF) nothing is
+    written and the material simply has no preview.
+    """
+    if not is_pdf(material):
+        return []
+    variants = variant_names('previews', material.content, PREVIEW_WIDTHS)
+    if not variants or not (force or _missing(variants)):
+        return []
+    try:
+        image = render_page(material.content, 0, max(PREVIEW_WIDTHS))
+    except OSError:
+        return []
+    if image is None:
+        return []
+    return _render_variants(image, variants, force)
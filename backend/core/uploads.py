@@ -0,0 +1,136 @@
+# backend/core/uploads.py
+
+import hashlib
+import os
+import re
+import uuid
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import UploadSession
+
+PARTIAL_DIR = 'partial_uploads'
+WRITE_BLOCK_SIZE = 64 * 1024
+
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+# SHA-256 of each upload so far, kept while its chunks arrive: session id -> (offset, hash).
+# hashlib state cannot be saved to the database, so this lives in the process;
+# a chunk handled by another worker skips it and store_upload() hashes the file once.
+_running_hashes = OrderedDict()
+MAX_RUNNING_HASHES = 256
+
+
+class ChunkError(ValueError):
+    """A chunk that was not stored: wrong offset, short body or bad checksum."""
+
+
+def new_part_name():
+    return f"{PARTIAL_DIR}/{uuid.uuid4().hex}.part"
+
+
+def partial_path(session):
+    # Under MEDIA_ROOT, so finalizing is a rename into the storage, not a copy
+    return os.path.join(settings.MEDIA_ROOT, session.part_name)
+
+
+def parse_content_range(header, size):
+    """(start, end) inclusive from `Content-Range: bytes start-end/total`; raises ChunkError."""
+    match = _CONTENT_RANGE.match((header or '').strip())
+    if not match:
+        raise ChunkError("Send each chunk with a `Content-Range: bytes <start>-<end>/<total>` header.")
+    start, end, total = match.groups()
+    start, end = int(start), int(end)
+    if total != '*' and int(total) != size:
+        raise ChunkError(f"The upload was created with a size of {size} bytes.")
+    if end < start or end >= size:
+        raise ChunkError(f"Chunk bytes {start}-{end} fall outside the {size}-byte upload.")
+    if end - start + 1 > settings.UPLOAD_CHUNK_SIZE:
+        raise ChunkError(f"Chunks may be at most {settings.UPLOAD_CHUNK_SIZE} bytes.")
+    return start, end
+
+
+def write_chunk(session, stream, start, end, sha256=None):
+    """
+    Stream bytes start..end of the upload from `stream` (the request body)
+    into the partial file, hashing as they go, and return the new offset.
+    The caller holds the session's row lock and has checked that `start`
+    is the offset expected. A short body or a checksum mismatch truncates
+    the file back to `start`, so the chunk can simply be sent again.
+    """
+    path = partial_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    length, written = end - start + 1, 0
+    digest, running = hashlib.sha256(), _running_hash(session, start)
+    with open(path, 'r+b' if os.path.exists(path) else 'w+b') as partial:
+        partial.seek(start)
+        while written < length:
+            block = stream.read(min(WRITE_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            partial.write(block)
+            digest.update(block)
+            if running is not None:
+                running.update(block)
+            written += len(block)
+        if written != length or (sha256 and sha256.lower() != digest.hexdigest()):
+            partial.truncate(start)
+            if written != length:
+                raise ChunkError(f"Expected {length} bytes but the request carried {written}.")
+            raise ChunkError("Chunk checksum mismatch.")
+        partial.truncate(end + 1) # Drops stale bytes of an earlier, abandoned attempt
+    if running is not None:
+        _running_hashes[session.pk] = (end + 1, running)
+        _running_hashes.move_to_end(session.pk)
+        while len(_running_hashes) > MAX_RUNNING_HASHES:
+            _running_hashes.popitem(last=False)
+    return end + 1
+
+
+def _running_hash(session, offset):
+    """A copy of the upload's hash up to `offset`, or None if this process doesn't have it."""
+    if offset == 0:
+        return hashlib.sha256()
+    cached = _running_hashes.get(session.pk)
+    if cached is None or cached[0] != offset:
+        return None
+    return cached[1].copy() # The cached state stays valid if this chunk fails
+
+
+def store_upload(session, upload_to):
+    """
+    Move the assembled file into the default storage under `upload_to` and
+    return its stored name. With ContentAddressedStorage this is a rename,
+    using the hash kept while the chunks arrived or else one hashing pass;
+    other storages get an ordinary save.
+    """
+    name = f"{upload_to.rstrip('/')}/{os.path.basename(session.filename)}"
+    path = partial_path(session)
+    offset, running = _running_hashes.pop(session.pk, (None, None))
+    if hasattr(default_storage, 'adopt'):
+        return default_storage.adopt(name, path, sha256=running.hexdigest() if offset == session.size else None)
+    with open(path, 'rb') as assembled:
+        stored = default_storage.save(name, File(assembled))
+    os.unlink(path)
+    return stored
+
+
+def discard(session):
+    """Delete a session and its partial file."""
+    _running_hashes.pop(session.pk, None)
+    try:
+        os.unlink(partial_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+def expired_sessions():
+    """Unfinished sessions nobody has written to for UPLOAD_SESSION_TTL seconds."""
+    cutoff = timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    return UploadSession.objects.filter(status='ACTIVE', updated_at__lt=cutoff)
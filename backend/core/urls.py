@@ -4,10 +4,10 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     UserViewSet, CollegeViewSet, MaterialViewSet, ScheduleViewSet,
-    TrainerApplicationViewSet, BillViewSet, AssessmentViewSet, StudentAttemptViewSet, ReportingDashboardView,
+    TrainerApplicationViewSet, BillViewSet, AssessmentViewSet, StudentAttemptViewSet, ReportingDashboardView, ScoreAnalyticsView, LeaderboardView, CoverVariantView, BootstrapView, SyncView, SearchView,
     CourseViewSet, BatchViewSet, SetPasswordView, ModuleViewSet,
     EmployeeApplicationViewSet, TaskViewSet, EmployeeDocumentViewSet, EducationEntryViewSet, 
-    WorkExperienceEntryViewSet, CertificationViewSet
+    WorkExperienceEntryViewSet, CertificationViewSet, OutboundEmailViewSet, ImportJobViewSet, UploadSessionViewSet
 )
 
 router = DefaultRouter()
@@ -28,9 +28,18 @@ router.register(r'employee-documents', EmployeeDocumentViewSet, basename='employ
 router.register(r'education-entries', EducationEntryViewSet, basename='education-entry')
 router.register(r'work-experience-entries', WorkExperienceEntryViewSet, basename='work-experience-entry')
 router.register(r'certification-entries', CertificationViewSet, basename='certification')
+router.register(r'email-outbox', OutboundEmailViewSet, basename='email-outbox')
+router.register(r'import-jobs', ImportJobViewSet, basename='import-job')
+router.register(r'uploads', UploadSessionViewSet, basename='upload')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('reporting/', ReportingDashboardView.as_view(), name='reporting-dashboard'),
+    path('reporting/analytics/', ScoreAnalyticsView.as_view(), name='score-analytics'),
+    path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path('covers/<path:name>', CoverVariantView.as_view(), name='cover-variant'),
+    path('bootstrap/', BootstrapView.as_view(), name='bootstrap'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('search/', SearchView.as_view(), name='search'),
     path('auth/set-password/', SetPasswordView.as_view(), name='set-password'),
 ]
\ No newline at end of file
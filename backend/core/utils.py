@@ -1,10 +1,98 @@
 # backend/core/utils.py
 
-from django.core.mail import send_mail
+import logging
+from datetime import timedelta
+
+from django.core import signing
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings # <-- Import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
 
-# Existing function for students
-def send_student_credentials(user, password):
+from .models import OutboundEmail, User
+
+logger = logging.getLogger(__name__)
+
+
+def queue_email(subject, message, recipient_list, from_email=None):
+    """
+    Write an email to the outbox instead of talking to SMTP in the request.
+    Being a plain insert, it commits or rolls back with the caller's transaction.
+    """
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.EMAIL_HOST_USER or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+    )
+
+
+def queue_emails(emails, from_email=None):
+    """Bulk version of queue_email for (subject, message, recipient_list) tuples; one INSERT."""
+    from_email = from_email or settings.EMAIL_HOST_USER or settings.DEFAULT_FROM_EMAIL
+    return OutboundEmail.objects.bulk_create([
+        OutboundEmail(subject=subject, body=message, from_email=from_email, recipients=list(recipient_list))
+        for subject, message, recipient_list in emails
+    ])
+
+
+def deliver_queued_emails(batch_size=100, max_attempts=5, retry_delay=60):
+    """
+    Send up to `batch_size` due outbox rows over a single SMTP connection.
+
+    Failed rows are retried with exponential backoff (retry_delay, 2x, 4x, ...
+    seconds) and marked FAILED after `max_attempts`. Returns (sent, failed).
+    """
+    sent = failed = 0
+    with transaction.atomic():
+        # skip_locked lets several workers drain the outbox side by side
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if not batch:
+            return sent, failed
+
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as e:
+            # Could not even connect: push the whole batch back without using up attempts
+            logger.warning("Could not connect to the mail server, retrying %d email(s) later: %s", len(batch), e)
+            OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                last_error=str(e), next_attempt_at=timezone.now() + timedelta(seconds=retry_delay)
+            )
+            return sent, len(batch)
+
+        try:
+            for email in batch:
+                message = EmailMessage(email.subject, email.body, email.from_email, email.recipients, connection=connection)
+                email.attempts += 1
+                try:
+                    connection.send_messages([message])
+                except Exception as e:
+                    email.last_error = str(e)
+                    if email.attempts >= max_attempts:
+                        email.status = 'FAILED'
+                        logger.error("Giving up on email #%s to %s after %d attempts: %s", email.pk, email.recipients, email.attempts, e)
+                    else:
+                        email.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay * 2 ** (email.attempts - 1))
+                    failed += 1
+                else:
+                    email.status = 'SENT'
+                    email.sent_at = timezone.now()
+                    email.body = ''
+                    email.last_error = ''
+                    sent += 1
+                email.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at', 'body'])
+        finally:
+            connection.close()
+    return sent, failed
+
+
+def student_credentials_email(user, password):
     subject = 'Your Parc Platform Account Credentials'
     message = (
         f'Hi {user.first_name},\n\n'
@@ -15,14 +103,65 @@ def send_student_credentials(user, password):
         'Login URL: [Your Frontend Login URL Here]\n\n' # <-- Consider adding the login URL
         'Best regards,\nThe Parc Platform Team'
     )
-    from_email = settings.EMAIL_HOST_USER # Use configured sender
-    recipient_list = [user.email]
+    return subject, message
+
+
+# --- Activation links (STUDENT_ONBOARDING_MODE / ROSTER_ONBOARDING_MODE = 'activation') ---
+
+ACTIVATION_SALT = 'core.activation'
+
 
+def uses_activation_links(roster=False):
+    mode = settings.ROSTER_ONBOARDING_MODE if roster else settings.STUDENT_ONBOARDING_MODE
+    return mode == 'activation'
+
+
+def _password_fingerprint(user):
+    # Changes as soon as a password is set, which makes the link single-use
+    return salted_hmac(ACTIVATION_SALT, user.password).hexdigest()[:16]
+
+
+def make_activation_token(user):
+    """Signed, timestamped token for `user`; costs an HMAC, not a password hash."""
+    return signing.dumps({'uid': user.pk, 'pw': _password_fingerprint(user)}, salt=ACTIVATION_SALT)
+
+
+def read_activation_token(token):
+    """Return the user an unexpired, unused activation token belongs to, or None."""
     try:
-        send_mail(subject, message, from_email, recipient_list, fail_silently=False)
-        print(f"--- SENT CREDENTIALS TO NEW STUDENT: {user.email} ---")
-    except Exception as e:
-        print(f"--- FAILED TO SEND CREDENTIALS TO STUDENT {user.email}: {e} ---")
+        payload = signing.loads(token, salt=ACTIVATION_SALT, max_age=settings.ACTIVATION_TOKEN_MAX_AGE)
+    except signing.BadSignature: # Includes SignatureExpired
+        return None
+    user = User.objects.filter(pk=payload.get('uid')).first()
+    if user is None or _password_fingerprint(user) != payload.get('pw'):
+        return None
+    return user
+
+
+def student_activation_email(user, token):
+    subject = 'Activate your Parc Platform Account'
+    message = (
+        f'Hi {user.first_name},\n\n'
+        'An account has been created for you on the Parc Platform. '
+        'Open the link below to choose your password and activate your account:\n\n'
+        f'{settings.FRONTEND_URL}/activate?token={token}\n\n'
+        f'Your username is {user.email}. This link expires in {settings.ACTIVATION_TOKEN_MAX_AGE // 86400} days.\n\n'
+        'Best regards,\nThe Parc Platform Team'
+    )
+    return subject, message
+
+
+def send_student_activation(user):
+    subject, message = student_activation_email(user, make_activation_token(user))
+    queue_email(subject, message, [user.email])
+    logger.info("Queued activation link for new student %s", user.email)
+
+
+# Existing function for students
+def send_student_credentials(user, password):
+    subject, message = student_credentials_email(user, password)
+    queue_email(subject, message, [user.email])
+    logger.info("Queued credentials for new student %s", user.email)
 
 
 # --- NEW function for employees ---
@@ -37,12 +176,6 @@ def send_employee_credentials(user, password):
         'Login URL: [Your Frontend Login URL Here]\n\n' # <-- Consider adding the login URL
         'Best regards,\nThe Parc Platform Team'
     )
-    from_email = settings.EMAIL_HOST_USER # Use configured sender
-    recipient_list = [user.email]
-
-    try:
-        send_mail(subject, message, from_email, recipient_list, fail_silently=False)
-        print(f"--- SENT CREDENTIALS TO NEW EMPLOYEE: {user.email} ---")
-    except Exception as e:
-        print(f"--- FAILED TO SEND CREDENTIALS TO EMPLOYEE {user.email}: {e} ---")
-# --- END NEW function ---
\ No newline at end of file
+    queue_email(subject, message, [user.email])
+    logger.info("Queued credentials for new employee %s", user.email)
+# --- END NEW function ---
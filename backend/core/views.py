@@ -1,10 +1,17 @@
 # backend/core/views.py
 
-from django.http import FileResponse, HttpResponse, Http404
-from django.core.mail import send_mail
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.db.models import Sum, Q
-from rest_framework import viewsets, status, permissions # <-- Added permissions
+from django.db.models import Q, Prefetch
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import conditional_page
+from rest_framework import viewsets, status, serializers
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -16,42 +23,74 @@ from .models import (
     User, College, Material, Schedule, TrainerApplication, Bill,
     Assessment, StudentAttempt, Course, Batch, Module,
     EmployeeApplication, Task, EmployeeDocument, EducationEntry, 
-    WorkExperienceEntry, Certification
+    WorkExperienceEntry, Certification, ChangeLog, Expense, OutboundEmail, ImportJob,
+    LeaderboardEntry, UploadSession, SearchEntry
 )
 from .serializers import (
     UserSerializer, CollegeSerializer, MaterialSerializer,
     ScheduleSerializer, MyTokenObtainPairSerializer, TrainerApplicationSerializer,
     BillSerializer, AssessmentSerializer, StudentAttemptSerializer, CourseSerializer, BatchSerializer, ModuleSerializer,
     EmployeeApplicationSerializer, TaskSerializer, EmployeeDocumentSerializer, EducationEntrySerializer, 
-    WorkExperienceEntrySerializer, CertificationSerializer
+    WorkExperienceEntrySerializer, CertificationSerializer, OutboundEmailSerializer, ImportJobSerializer,
+    UploadedMaterialSerializer, UploadSessionSerializer, UserListSerializer, RosterStudentSerializer, SearchEntrySerializer,
+    prefetch_plan
 )
-import secrets, os
+import secrets
+from PIL import Image as PILImage
 from rest_framework_simplejwt.views import TokenObtainPairView
-import pandas as pd
 from django.db import IntegrityError, transaction
-from .utils import send_student_credentials, send_employee_credentials
-import mimetypes
+from .utils import send_employee_credentials, queue_email, read_activation_token, send_student_activation
+from .mixins import ConditionalGetMixin
+from .downloads import file_response, download_name
+from .storage import content_hash, share_file
+from .thumbnails import (
+    COVER_WIDTHS, FORMATS as IMAGE_FORMATS, IMMUTABLE_MAX_AGE, PREVIEW_WIDTHS, DerivedFile,
+    build_cover_variants, build_pdf_preview, derivative_name, derived_storage, is_pdf, parse_derivative_name,
+    previews_enabled,
+)
+from .access import accessible_material_ids, can_view_material
+from .pdfpages import MAX_PAGE_RANGE, PAGE_WIDTHS, index_pdf, page_image_file, page_range_file
+from .uploads import ChunkError, discard, new_part_name, parse_content_range, partial_path, store_upload, write_chunk
+from .importers import import_students
+from .analytics import cached_score_report, college_summary
+from .pagination import RosterPagination, SearchPagination
+from .filters import FilterParam, moment, month, month_of
+from .leaderboard import SCOPES as LEADERBOARD_SCOPES, top_entries, rank_of, serialize_entry
+from .rosters import read_roster
+from .search import KINDS as SEARCH_KINDS, match, search_terms
+
+logger = logging.getLogger(__name__)
 
 # --- Token and Password Views (Unchanged) ---
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
 class SetPasswordView(APIView):
-    permission_classes = [IsAuthenticated]
+    # Logged-in users change their password here; new students in activation
+    # mode also land here unauthenticated, with the token from their email.
+    permission_classes = [AllowAny]
 
     def post(self, request, *args, **kwargs):
-        user = request.user
         password = request.data.get("password")
         if not password or len(password) < 8:
             return Response({"error": "Password must be at least 8 characters long."}, status=status.HTTP_400_BAD_REQUEST)
 
-        user.set_password(password)
+        token = request.data.get("token")
+        if token or not request.user.is_authenticated:
+            # The link's account, even if the browser is still logged in as someone else
+            user = read_activation_token(token or "")
+            if user is None:
+                return Response({"error": "This activation link is invalid or has expired."}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            user = request.user
+
+        user.set_password(password) # The one password hash activation-mode accounts ever pay for
         user.must_change_password = False
         user.save()
         return Response({"status": "Password set successfully. Please log in again."}, status=status.HTTP_200_OK)
 
 # --- Trainer Application ViewSet (Unchanged, but ensure email content is appropriate) ---
-class TrainerApplicationViewSet(viewsets.ModelViewSet):
+class TrainerApplicationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = TrainerApplication.objects.filter(status='PENDING')
     serializer_class = TrainerApplicationSerializer
     # AllowAny for creation, IsAuthenticated for approval/decline/resume view
@@ -61,6 +100,7 @@ class TrainerApplicationViewSet(viewsets.ModelViewSet):
         return [AllowAny()]
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @transaction.atomic # Outbox email commits with the status change
     def approve(self, request, pk=None):
         application = self.get_object()
         user, created = User.objects.get_or_create(
@@ -85,36 +125,36 @@ class TrainerApplicationViewSet(viewsets.ModelViewSet):
             # If user exists but is not a TRAINER, maybe update role? Or reject?
             # Current logic: Reject if user already exists.
             return Response({'error': 'A user with this email already exists.'}, status=status.HTTP_400_BAD_REQUEST)
+        share_file(application.resume) # The user row now points at the application's file too
 
         application.status = 'APPROVED'
         application.save()
 
         # No automatic credential email here - it's sent upon first schedule assignment for trainers
 
-        send_mail(
+        queue_email(
             'Your Trainer Application has been Approved!',
             f'Hi {user.first_name},\n\nCongratulations! Your application to become a trainer at Parc Platform has been approved. '
             'You will receive another email with your login credentials once you have been assigned to your first schedule.\n\n'
             'Best regards,\nThe Parc Platform Team',
-            'admin@parcplatform.com', # Use settings.EMAIL_HOST_USER
             [user.email],
-            fail_silently=False,
+            'admin@parcplatform.com', # Use settings.EMAIL_HOST_USER
         )
 
         return Response(UserSerializer(user).data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @transaction.atomic # Outbox email commits with the status change
     def decline(self, request, pk=None):
         application = self.get_object()
-        send_mail(
+        queue_email(
             'Update on Your Parc Platform Trainer Application',
             f'Hi {application.name},\n\nThank you for your interest in becoming a trainer. '
             'After careful consideration, we have decided not to move forward with your application at this time.\n\n'
             'We wish you the best in your future endeavors.\n\n'
             'Best regards,\nThe Parc Platform Team',
-            'admin@parcplatform.com', # Use settings.EMAIL_HOST_USER
             [application.email],
-            fail_silently=False,
+            'admin@parcplatform.com', # Use settings.EMAIL_HOST_USER
         )
         application.delete()
         return Response({'status': 'Trainer application declined and deleted'}, status=status.HTTP_200_OK)
@@ -128,11 +168,7 @@ class TrainerApplicationViewSet(viewsets.ModelViewSet):
                 if request.user.role != 'ADMIN' and not request.user.is_staff:
                     raise PermissionDenied("You do not have permission to view this resume.")
 
-                with application.resume.open('rb') as f:
-                    resume_data = f.read()
-                content_type, _ = mimetypes.guess_type(application.resume.name)
-                content_type = content_type or 'application/octet-stream'
-                return HttpResponse(resume_data, content_type=content_type)
+                return file_response(request, application.resume, filename=download_name(f"{application.name} - Resume", application.resume))
             except FileNotFoundError:
                 return Response({'error': 'Resume file not found on server.'}, status=status.HTTP_404_NOT_FOUND)
         else:
@@ -140,7 +176,7 @@ class TrainerApplicationViewSet(viewsets.ModelViewSet):
 
 
 # --- NEW Employee Application ViewSet ---
-class EmployeeApplicationViewSet(viewsets.ModelViewSet):
+class EmployeeApplicationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = EmployeeApplication.objects.filter(status='PENDING')
     serializer_class = EmployeeApplicationSerializer
 
@@ -152,6 +188,7 @@ class EmployeeApplicationViewSet(viewsets.ModelViewSet):
         return [AllowAny()] # For creating application
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated]) # Add Admin permission check later if needed
+    @transaction.atomic # Outbox email commits with the status change
     def approve(self, request, pk=None):
         # Add permission check: Only Admin
         if request.user.role != 'ADMIN' and not request.user.is_staff:
@@ -175,6 +212,7 @@ class EmployeeApplicationViewSet(viewsets.ModelViewSet):
 
         if not created:
             return Response({'error': 'A user with this email already exists.'}, status=status.HTTP_400_BAD_REQUEST)
+        share_file(application.resume) # The user row now points at the application's file too
 
         # Generate password and send credentials
         password = secrets.token_urlsafe(8)
@@ -186,34 +224,33 @@ class EmployeeApplicationViewSet(viewsets.ModelViewSet):
         application.save()
 
         # Send separate approval confirmation email (optional)
-        send_mail(
+        queue_email(
             'Your Employee Application has been Approved!',
             f'Hi {user.first_name},\n\nCongratulations! Your application to become an employee at Parc Platform has been approved. '
             'You should receive another email shortly with your temporary login credentials.\n\n'
             'Best regards,\nThe Parc Platform Team',
-            'admin@parcplatform.com', # Use settings.EMAIL_HOST_USER
             [user.email],
-            fail_silently=False,
+            'admin@parcplatform.com', # Use settings.EMAIL_HOST_USER
         )
 
         return Response(UserSerializer(user).data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated]) # Add Admin permission check later if needed
+    @transaction.atomic # Outbox email commits with the status change
     def decline(self, request, pk=None):
         # Add permission check: Only Admin
         if request.user.role != 'ADMIN' and not request.user.is_staff:
              raise PermissionDenied("Only Admins can decline employee applications.")
 
         application = self.get_object()
-        send_mail(
+        queue_email(
             'Update on Your Parc Platform Employee Application',
             f'Hi {application.name},\n\nThank you for your interest in joining Parc Platform. '
             'After careful consideration, we have decided not to move forward with your application at this time.\n\n'
             'We wish you the best in your future endeavors.\n\n'
             'Best regards,\nThe Parc Platform Team',
-            'admin@parcplatform.com', # Use settings.EMAIL_HOST_USER
             [application.email],
-            fail_silently=False,
+            'admin@parcplatform.com', # Use settings.EMAIL_HOST_USER
         )
         application.delete()
         return Response({'status': 'Employee application declined and deleted'}, status=status.HTTP_200_OK)
@@ -227,22 +264,37 @@ class EmployeeApplicationViewSet(viewsets.ModelViewSet):
         application = self.get_object()
         if hasattr(application, 'resume') and application.resume:
             try:
-                with application.resume.open('rb') as f:
-                    resume_data = f.read()
-                content_type, _ = mimetypes.guess_type(application.resume.name)
-                content_type = content_type or 'application/octet-stream'
-                return HttpResponse(resume_data, content_type=content_type)
+                return file_response(request, application.resume, filename=download_name(f"{application.name} - Resume", application.resume))
             except FileNotFoundError:
                 return Response({'error': 'Resume file not found on server.'}, status=status.HTTP_404_NOT_FOUND)
         else:
             return Response({'error': 'Resume not found for this application.'}, status=status.HTTP_404_NOT_FOUND)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated] # Base permission
     queryset = User.objects.all()
     serializer_class = UserSerializer
-      
+    etag_models = (User, EducationEntry, WorkExperienceEntry, Certification)
+    filter_params = {
+        'role': FilterParam('role', serializers.ChoiceField(choices=User.ROLE_CHOICES), many=True),
+        'batch': FilterParam('batches', serializers.IntegerField(), many=True, distinct=True),
+        'college': FilterParam('batches__college', serializers.IntegerField(), many=True, distinct=True),
+        'is_active': FilterParam('is_active', serializers.BooleanField()),
+    }
+    ordering_fields = ('id', 'first_name', 'last_name', 'email', 'date_joined')
+
+    def get_serializer_class(self):
+        # Lists leave out the employee-profile nests; retrieve/update keep them
+        if self.action == 'list':
+            return UserListSerializer
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        # Prefetch exactly what this action's serializer renders, so a list costs
+        # the same handful of queries for 10 users or 10,000
+        return super().get_queryset().prefetch_related(*prefetch_plan(self.get_serializer_class()))
+
     def get_serializer_context(self):
         # Pass request to serializer context (useful for UserSerializer if it needs it)
         context = super().get_serializer_context()
@@ -278,16 +330,22 @@ class UserViewSet(viewsets.ModelViewSet):
 
         if hasattr(user_obj, 'resume') and user_obj.resume:
             try:
-                with user_obj.resume.open('rb') as f:
-                    resume_data = f.read()
-                content_type, _ = mimetypes.guess_type(user_obj.resume.name)
-                content_type = content_type or 'application/octet-stream'
-                return HttpResponse(resume_data, content_type=content_type)
+                return file_response(request, user_obj.resume, filename=download_name(f"{user_obj.first_name} {user_obj.last_name} - Resume", user_obj.resume))
             except FileNotFoundError:
                 return Response({'error': 'Resume file not found on server.'}, status=status.HTTP_404_NOT_FOUND)
         else:
             return Response({'error': 'Resume not found for this user.'}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=True, methods=['post'])
+    def resend_activation(self, request, pk=None):
+        if request.user.role != 'ADMIN' and not request.user.is_staff:
+            raise PermissionDenied("Only Admins can resend activation links.")
+        user = self.get_object()
+        if user.has_usable_password():
+            return Response({'error': 'This account is already activated.'}, status=status.HTTP_400_BAD_REQUEST)
+        send_student_activation(user)
+        return Response({'status': f'Activation link queued for {user.email}.'}, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['post'])
     def assign_materials(self, request, pk=None):
         # Same as before
@@ -303,9 +361,11 @@ class UserViewSet(viewsets.ModelViewSet):
         # No need for user.save() when using set() on ManyToManyField
         return Response(UserSerializer(user).data, status=status.HTTP_200_OK)
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = TaskSerializer
+    etag_models = (Task, User)
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ('-updated_at', '-id')
 
     def get_queryset(self):
         user = self.request.user
@@ -358,8 +418,9 @@ class TaskViewSet(viewsets.ModelViewSet):
         else:
             raise PermissionDenied("You do not have permission to delete this task.")
         
-class EmployeeDocumentViewSet(viewsets.ModelViewSet):
+class EmployeeDocumentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = EmployeeDocumentSerializer
+    etag_models = (EmployeeDocument, User)
     permission_classes = [IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser) # For file upload
 
@@ -396,10 +457,7 @@ class EmployeeDocumentViewSet(viewsets.ModelViewSet):
         user = self.request.user
         # Allow employee to delete their own document, or Admin to delete any
         if instance.employee == user or user.role == 'ADMIN' or user.is_staff:
-            # Delete the actual file from storage
-            if instance.document:
-                instance.document.delete(save=False) # Delete file, don't save model yet
-            instance.delete() # Delete the model instance
+            instance.delete() # Its file reference is released by signals.py
         else:
             raise PermissionDenied("You do not have permission to delete this document.")
 
@@ -420,18 +478,14 @@ class EmployeeDocumentViewSet(viewsets.ModelViewSet):
              return Response({'detail': 'No file found for this document.'}, status=status.HTTP_404_NOT_FOUND)
         
         try:
-            f = file_field.open('rb')
-            content_type, _ = mimetypes.guess_type(file_field.name)
-            content_type = content_type or 'application/octet-stream'
-            # Use 'inline' to try opening in browser, 'attachment' to force download
-            response = FileResponse(f, content_type=content_type)
-            response['Content-Disposition'] = f'inline; filename="{os.path.basename(file_field.name)}"'
-            return response
+            # Inline, so it opens in the browser; Range requests are honoured
+            return file_response(request, file_field, filename=download_name(doc.title, file_field))
         except FileNotFoundError:
              return Response({'detail': 'File not found on server.'}, status=status.HTTP_404_NOT_FOUND)
         
-class EducationEntryViewSet(viewsets.ModelViewSet):
+class EducationEntryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = EducationEntrySerializer
+    etag_models = (EducationEntry, User)
     permission_classes = [IsAuthenticated]
     # --- ADD THIS LINE ---
     parser_classes = (MultiPartParser, FormParser) # For file upload
@@ -468,11 +522,7 @@ class EducationEntryViewSet(viewsets.ModelViewSet):
         user = self.request.user
         # Allow employee to delete their own entry, or Admin to delete any
         if instance.employee == user or user.role == 'ADMIN' or user.is_staff:
-            # --- ADDED: Delete the file from storage ---
-            if instance.marksheet_file:
-                instance.marksheet_file.delete(save=False)
-            # --- END ADD ---
-            instance.delete()
+            instance.delete() # Its file reference is released by signals.py
         else:
             raise PermissionDenied("You do not have permission to delete this document.")
 
@@ -491,18 +541,14 @@ class EducationEntryViewSet(viewsets.ModelViewSet):
              return Response({'detail': 'No marksheet file found for this entry.'}, status=status.HTTP_404_NOT_FOUND)
         
         try:
-            f = file_field.open('rb')
-            content_type, _ = mimetypes.guess_type(file_field.name)
-            content_type = content_type or 'application/octet-stream'
-            response = FileResponse(f, content_type=content_type)
-            response['Content-Disposition'] = f'inline; filename="{os.path.basename(file_field.name)}"'
-            return response
+            return file_response(request, file_field, filename=download_name(f"{doc.title} - Marksheet", file_field))
         except FileNotFoundError:
              return Response({'detail': 'File not found on server.'}, status=status.HTTP_404_NOT_FOUND)
     # --- END ADD ---
 
-class WorkExperienceEntryViewSet(viewsets.ModelViewSet):
+class WorkExperienceEntryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = WorkExperienceEntrySerializer
+    etag_models = (WorkExperienceEntry, User)
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -535,8 +581,9 @@ class WorkExperienceEntryViewSet(viewsets.ModelViewSet):
         else:
             raise PermissionDenied("You do not have permission to delete this entry.")
 
-class CertificationViewSet(viewsets.ModelViewSet):
+class CertificationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = CertificationSerializer
+    etag_models = (Certification, User)
     permission_classes = [IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser) # For file upload
 
@@ -571,10 +618,7 @@ class CertificationViewSet(viewsets.ModelViewSet):
     def perform_destroy(self, instance):
         user = self.request.user
         if instance.employee == user or user.role == 'ADMIN' or user.is_staff:
-            # Delete the associated file from storage
-            if instance.certificate_file:
-                instance.certificate_file.delete(save=False)
-            instance.delete()
+            instance.delete() # Its file reference is released by signals.py
         else:
             raise PermissionDenied("You do not have permission to delete this entry.")
 
@@ -591,16 +635,192 @@ class CertificationViewSet(viewsets.ModelViewSet):
              return Response({'detail': 'No file found for this certificate.'}, status=status.HTTP_404_NOT_FOUND)
         
         try:
-            response = FileResponse(file_field.open('rb'), as_attachment=False)
-            response['Content-Disposition'] = f'inline; filename="{os.path.basename(file_field.name)}"'
-            return response
+            return file_response(request, file_field, filename=download_name(doc.title, file_field))
         except FileNotFoundError:
              return Response({'detail': 'File not found on server.'}, status=status.HTTP_404_NOT_FOUND)
 
-class CollegeViewSet(viewsets.ModelViewSet):
+class OutboundEmailViewSet(viewsets.ReadOnlyModelViewSet):
+    """Delivery status of queued emails (Admin only). Filter with ?status= and ?recipient=."""
+    serializer_class = OutboundEmailSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role != 'ADMIN' and not user.is_staff:
+            return OutboundEmail.objects.none()
+        queryset = OutboundEmail.objects.order_by('-id')
+        email_status = self.request.query_params.get('status')
+        if email_status:
+            queryset = queryset.filter(status=email_status.upper())
+        recipient = self.request.query_params.get('recipient')
+        if recipient:
+            queryset = queryset.filter(recipients__icontains=recipient)
+        return queryset
+
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Progress of background roster imports; poll /api/import-jobs/<id>/."""
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = ImportJob.objects.select_related('batch')
+        if user.role == 'ADMIN' or user.is_staff:
+            return queryset
+        return queryset.filter(created_by=user)
+
+class UploadSessionViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Resumable uploads for large files (see core.uploads):
+
+        POST   /api/uploads/                {filename, size, target}  -> session
+        PUT    /api/uploads/<id>/           raw bytes, Content-Range: bytes <start>-<end>/<size>
+        GET    /api/uploads/<id>/           `received` is where to resume
+        POST   /api/uploads/<id>/finalize/  material fields (or {course} for a cover)
+        DELETE /api/uploads/<id>/           abort
+
+    Chunks go straight from the request body to a partial file, so no
+    request spools more than UPLOAD_CHUNK_SIZE bytes and a dropped
+    connection only costs the chunk in flight.
+    """
+    serializer_class = UploadSessionSerializer
     permission_classes = [IsAuthenticated]
-    queryset = College.objects.all()
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(created_by=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = request.user
+        is_admin = user.role == 'ADMIN' or user.is_staff
+        if serializer.validated_data.get('target', 'MATERIAL') == 'COURSE_COVER':
+            if not is_admin:
+                raise PermissionDenied("Only Admins can upload course covers.")
+        elif not (is_admin or user.role == 'TRAINER'):
+            raise PermissionDenied("Only Admins or Trainers can upload materials.")
+        serializer.save(created_by=user, part_name=new_part_name())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @transaction.atomic
+    def update(self, request, *args, **kwargs):
+        # The row lock keeps two PUTs for the same session from interleaving their writes
+        session = get_object_or_404(self.get_queryset().select_for_update(), pk=kwargs['pk'])
+        if session.status != 'ACTIVE':
+            return Response({'error': 'This upload is already finalized.'}, status=status.HTTP_409_CONFLICT)
+        try:
+            start, end = parse_content_range(request.headers.get('Content-Range'), session.size)
+            if start != session.received:
+                # Resend from `received` (e.g. the reply to the previous chunk was lost)
+                return Response({'error': f"Expected a chunk starting at byte {session.received}.", 'received': session.received},
+                                status=status.HTTP_409_CONFLICT)
+            session.received = write_chunk(session, request, start, end, request.headers.get('X-Chunk-SHA256'))
+        except ChunkError as e:
+            return Response({'error': str(e), 'received': session.received}, status=status.HTTP_400_BAD_REQUEST)
+        session.save(update_fields=['received', 'updated_at'])
+        return Response(self.get_serializer(session).data)
+
+    def destroy(self, request, *args, **kwargs):
+        discard(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'])
+    @transaction.atomic
+    def finalize(self, request, pk=None):
+        session = get_object_or_404(self.get_queryset().select_for_update(), pk=pk)
+        if session.status == 'COMPLETED': # A retry after a lost reply; nothing more to do
+            return self.finalized_response(session, status.HTTP_200_OK)
+        if session.received != session.size:
+            return Response({'error': f"Only {session.received} of {session.size} bytes have been received.", 'received': session.received},
+                            status=status.HTTP_409_CONFLICT)
+
+        if session.target == 'COURSE_COVER':
+            course = Course.objects.filter(pk=request.data.get('course')).first()
+            if course is None:
+                return Response({'error': 'A valid course is required.'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                with PILImage.open(partial_path(session)) as image:
+                    image.verify()
+            except (OSError, PILImage.DecompressionBombError):
+                discard(session)
+                return Response({'error': 'The uploaded file is not an image.'}, status=status.HTTP_400_BAD_REQUEST)
+            name = store_upload(session, Course._meta.get_field('cover_photo').upload_to)
+            if not self.checksum_matches(request, name):
+                return self.checksum_mismatch(session, name)
+            course.cover_photo = name
+            course.save()
+            session.course = course
+        else:
+            user = request.user
+            serializer = UploadedMaterialSerializer(data=request.data, context=self.get_serializer_context())
+            serializer.is_valid(raise_exception=True)
+            name = store_upload(session, Material._meta.get_field('content').upload_to)
+            if not self.checksum_matches(request, name):
+                return self.checksum_mismatch(session, name)
+            # Same ownership rule as MaterialViewSet.perform_create
+            session.material = serializer.save(content=name, uploader=user if user.role == 'TRAINER' else None)
+
+        session.status = 'COMPLETED'
+        session.save()
+        return self.finalized_response(session, status.HTTP_201_CREATED)
+
+    def checksum_matches(self, request, name):
+        # Optional whole-file check; the content-addressed name already is the SHA-256
+        expected = str(request.data.get('sha256') or '').lower()
+        actual = content_hash(name)
+        return not expected or actual is None or expected == actual
+
+    def checksum_mismatch(self, session, name):
+        default_storage.delete(name)
+        session.delete() # The partial file became `name`; the client has to start over
+        return Response({'error': 'The assembled file does not match the sha256 given; upload it again.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    def finalized_response(self, session, status_code):
+        context = self.get_serializer_context()
+        if session.target == 'COURSE_COVER':
+            data = CourseSerializer(session.course, context=context).data if session.course else None
+        else:
+            data = MaterialSerializer(session.material, context=context).data if session.material else None
+        return Response({'upload': self.get_serializer(session).data, 'result': data}, status=status_code)
+
+class CollegeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    permission_classes = [IsAuthenticated]
+    queryset = College.objects.prefetch_related(
+        Prefetch('courses__modules__materials', queryset=Material.objects.select_related('course'))
+    )
     serializer_class = CollegeSerializer
+    etag_models = (College, Course, Module, Material)
+
+    def check_admin(self, request):
+        if request.user.role != 'ADMIN' and not request.user.is_staff:
+            raise PermissionDenied("Only Admins can view college rosters and summaries.")
+
+    @action(detail=True, methods=['get'])
+    def summary(self, request, pk=None):
+        """Student, batch, course and schedule counts for one college (core.analytics.college_summary)."""
+        self.check_admin(request)
+        # Not get_object(): the summary needs none of the nested course prefetches
+        return Response(college_summary(get_object_or_404(College, pk=pk)))
+
+    @action(detail=True, methods=['get'])
+    def roster(self, request, pk=None):
+        """
+        The college's students, a page at a time (`?page_size=`, `?cursor=`),
+        each with their batches and courses at this college.
+        """
+        self.check_admin(request)
+        college = get_object_or_404(College, pk=pk)
+        students = (
+            User.objects.filter(role='STUDENT', batches__college=college).distinct()
+            .prefetch_related(
+                'assigned_materials',
+                Prefetch('batches', queryset=Batch.objects.filter(college=college).select_related('course'), to_attr='college_batches'),
+            )
+        )
+        paginator = RosterPagination()
+        page = paginator.paginate_queryset(students, request, view=self)
+        return paginator.get_paginated_response(RosterStudentSerializer(page, many=True, context=self.get_serializer_context()).data)
 
     @action(detail=True, methods=['post'])
     def manage_courses(self, request, pk=None):
@@ -611,44 +831,42 @@ class CollegeViewSet(viewsets.ModelViewSet):
         college.courses.set(courses_to_set)
         return Response(self.get_serializer(college).data, status=status.HTTP_200_OK)
 
-class MaterialViewSet(viewsets.ModelViewSet):
+class MaterialViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = MaterialSerializer
+    etag_models = (Material, Course)
     parser_classes = (MultiPartParser, FormParser)
     queryset = Material.objects.all()
+    filter_params = {
+        'course': FilterParam('course', serializers.IntegerField(), many=True),
+        'type': FilterParam('type', serializers.ChoiceField(choices=Material.MATERIAL_TYPE_CHOICES), many=True),
+        'uploader': FilterParam('uploader', serializers.IntegerField(), many=True),
+    }
+    ordering_fields = ('id', 'title', 'duration_in_minutes')
+
+    def wants_accessible_only(self):
+        return str(self.request.query_params.get('accessible', '')).lower() in ('1', 'true', 'yes')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        # ?accessible=true: only what the caller can open (admins can open everything)
+        if self.wants_accessible_only() and not (user.role == 'ADMIN' or user.is_staff):
+            queryset = queryset.filter(id__in=accessible_material_ids(user))
+        return queryset
+
+    def get_etag_models(self):
+        if self.wants_accessible_only(): # Also depends on enrollment, grants and schedules
+            return (Material, Course, User, Batch, Schedule)
+        return super().get_etag_models()
 
     @action(detail=True, methods=['get'])
     def view_content(self, request, pk=None):
         material = self.get_object()
-        user = request.user
-        allowed = False
-        role = getattr(user, 'role', None)
-
-        # Admin/Staff access
-        if role == 'ADMIN' or user.is_staff:
-            allowed = True
-        # Trainer access
-        elif role == 'TRAINER':
-            # Own uploads or public materials
-            if material.uploader_id == user.id or material.uploader_id is None:
-                allowed = True
-            # Materials linked via current/future schedules
-            else:
-                allowed = Schedule.objects.filter(
-                    trainer=user,
-                    materials__id=material.id,
-                    end_date__gte=timezone.now() # Check if schedule is active/upcoming
-                ).exists()
-        # Student access
-        elif role == 'STUDENT':
-             # Directly assigned materials
-            if user.assigned_materials.filter(id=material.id).exists():
-                 allowed = True
-             # Materials linked via Modules in their enrolled Courses (check batches)
-            elif material.course_id is not None:
-                 allowed = user.batches.filter(course_id=material.course_id).exists()
-
-        if not allowed:
+
+        # Admins see everything; trainers and students are checked against their
+        # cached access index (see core.access), a set lookup instead of queries
+        if not can_view_material(request.user, material.id):
             return Response({'detail': 'You do not have permission to view this material.'}, status=status.HTTP_403_FORBIDDEN)
 
         file_field = material.content
@@ -656,16 +874,111 @@ class MaterialViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'No content found for this material.'}, status=status.HTTP_404_NOT_FOUND)
 
         try:
-            f = file_field.open('rb')
-            content_type, _ = mimetypes.guess_type(file_field.name)
-            content_type = content_type or 'application/octet-stream'
-            response = FileResponse(f, content_type=content_type)
-             # Use inline for browser viewing, attachment for download prompt
-            response['Content-Disposition'] = f'inline; filename="{file_field.name.rsplit("/", 1)[-1]}"'
-            return response
+            # Streams byte ranges, so seeking in a video only fetches what is played
+            return file_response(request, file_field, filename=download_name(material.title, file_field))
         except FileNotFoundError:
              return Response({'detail': 'File not found on server.'}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=True, methods=['get'])
+    def preview(self, request, pk=None):
+        # First-page image of a PDF: ?w=<one of PREVIEW_WIDTHS>&type=webp|jpeg (not ?format=, DRF's renderer override)
+        material = self.get_object()
+        if not can_view_material(request.user, material.id):
+            return Response({'detail': 'You do not have permission to view this material.'}, status=status.HTTP_403_FORBIDDEN)
+        fmt = request.query_params.get('type', 'webp')
+        try:
+            width = int(request.query_params.get('w', max(PREVIEW_WIDTHS)))
+        except ValueError:
+            width = None
+        if fmt not in IMAGE_FORMATS or width not in PREVIEW_WIDTHS:
+            return Response({'error': f"type must be one of {', '.join(IMAGE_FORMATS)} and w one of {', '.join(map(str, PREVIEW_WIDTHS))}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        digest = content_hash(material.content.name) if is_pdf(material) else None
+        if not digest:
+            return Response({'detail': 'No preview available for this material.'}, status=status.HTTP_404_NOT_FOUND)
+        name = derivative_name('previews', digest, width, fmt)
+        if not derived_storage.exists(name):
+            build_pdf_preview(material) # Built on upload; this covers older files and cleared caches
+            if not derived_storage.exists(name):
+                return Response({'detail': 'No preview available for this material.'}, status=status.HTTP_404_NOT_FOUND)
+
+        image = DerivedFile(name)
+        response = file_response(request, image, content_type=IMAGE_FORMATS[fmt][2], filename=download_name(material.title, image))
+        if request.query_params.get('v') == digest[:16]:
+            # A versioned URL (as the serializer hands out) always means these bytes
+            patch_cache_control(response, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+        return response
+
+
+    @action(detail=True, methods=['get'])
+    def pages(self, request, pk=None):
+        # Page count, sizes and document info of a PDF, so a viewer can lay
+        # the document out and fetch pages one at a time
+        material = self.get_object()
+        if not can_view_material(request.user, material.id):
+            return Response({'detail': 'You do not have permission to view this material.'}, status=status.HTTP_403_FORBIDDEN)
+        index = index_pdf(material)
+        if index is None:
+            return Response({'detail': 'Page access is not available for this material.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'page_count': index.page_count,
+            'metadata': index.metadata,
+            'pages': [{'number': number, 'width': width, 'height': height}
+                      for number, (width, height) in enumerate(index.page_sizes, start=1)],
+            'version': index.sha256[:16], # Pass back as ?v= to get cacheable page responses
+            'max_range': MAX_PAGE_RANGE,
+            'formats': ['pdf', *(IMAGE_FORMATS if previews_enabled() else ())],
+            'widths': PAGE_WIDTHS,
+        })
+
+    @action(detail=True, methods=['get'], url_path=r'pages/(?P<number>[0-9]+)')
+    def page(self, request, pk=None, number=None):
+        """
+        GET .../pages/<n>/?to=<m>&type=pdf   pages n..m as a standalone PDF
+        GET .../pages/<n>/?type=webp&w=640    page n as an image
+
+        Split out of the stored file once and kept on disk, so the cost of a
+        request doesn't grow with the size of the document.
+        """
+        material = self.get_object()
+        if not can_view_material(request.user, material.id):
+            return Response({'detail': 'You do not have permission to view this material.'}, status=status.HTTP_403_FORBIDDEN)
+        index = index_pdf(material)
+        if index is None:
+            return Response({'detail': 'Page access is not available for this material.'}, status=status.HTTP_404_NOT_FOUND)
+
+        fmt = request.query_params.get('type', 'pdf')
+        try:
+            first = int(number)
+            last = int(request.query_params.get('to', first))
+            width = int(request.query_params.get('w', max(PAGE_WIDTHS)))
+        except ValueError:
+            return Response({'error': 'to and w must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= first <= last <= index.page_count:
+            return Response({'error': f"Pages must be within 1-{index.page_count}, in order."}, status=status.HTTP_400_BAD_REQUEST)
+        if last - first + 1 > MAX_PAGE_RANGE:
+            return Response({'error': f"At most {MAX_PAGE_RANGE} pages per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if fmt == 'pdf':
+            name = page_range_file(material, first, last)
+            content_type = 'application/pdf'
+            label = f"{material.title} - page {first}" if first == last else f"{material.title} - pages {first}-{last}"
+        elif fmt in IMAGE_FORMATS:
+            if first != last or width not in PAGE_WIDTHS:
+                return Response({'error': f"Images are one page each, w one of {', '.join(map(str, PAGE_WIDTHS))}."}, status=status.HTTP_400_BAD_REQUEST)
+            name = page_image_file(material, first, width, fmt)
+            if name is None:
+                return Response({'detail': 'Page images are not available on this server.'}, status=status.HTTP_404_NOT_FOUND)
+            content_type = IMAGE_FORMATS[fmt][2]
+            label = f"{material.title} - page {first}"
+        else:
+            return Response({'error': f"type must be one of pdf, {', '.join(IMAGE_FORMATS)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        artefact = DerivedFile(name)
+        response = file_response(request, artefact, content_type=content_type, filename=download_name(label, artefact))
+        if request.query_params.get('v') == index.sha256[:16]:
+            patch_cache_control(response, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+        return response
 
     def perform_create(self, serializer):
         # Allow Admin or Trainer to upload
@@ -697,21 +1010,32 @@ class MaterialViewSet(viewsets.ModelViewSet):
         else:
             raise PermissionDenied("You do not have permission to delete this material.")
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated] # Or IsAdminUser if only admins manage courses
     queryset = Course.objects.all().prefetch_related('modules__materials')
     serializer_class = CourseSerializer
+    etag_models = (Course, Module, Material)
     parser_classes = (MultiPartParser, FormParser) # For cover_photo upload
 
-class ModuleViewSet(viewsets.ModelViewSet):
+class ModuleViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated] # Or IsAdminUser
     queryset = Module.objects.all()
     serializer_class = ModuleSerializer
+    etag_models = (Module, Material, Course)
 
-class BatchViewSet(viewsets.ModelViewSet):
+def wants_async_import(request):
+    # Opt-in: the upload is stored and processed by `manage.py process_import_jobs`.
+    # Without a worker (IMPORT_JOBS_ASYNC off) the job would never run, so import now
+    if not settings.IMPORT_JOBS_ASYNC:
+        return False
+    value = request.query_params.get('async') or request.data.get('async')
+    return str(value).lower() in ('1', 'true', 'yes')
+
+class BatchViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated] # Or IsAdminUser
-    queryset = Batch.objects.select_related('course', 'college').prefetch_related('students').all() # Optimize queries
+    queryset = Batch.objects.select_related('course', 'college').prefetch_related('students', 'materials').all() # Optimize queries
     serializer_class = BatchSerializer
+    etag_models = (Batch, Course, College, User, Material)
 
     def destroy(self, request, *args, **kwargs):
         # Existing logic is fine
@@ -750,58 +1074,20 @@ class BatchViewSet(viewsets.ModelViewSet):
              # Handle unique_together constraint error specifically if needed
             return Response({'error': f'Failed to create batch: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Student processing remains the same
+        if wants_async_import(request):
+            job = ImportJob.objects.create(kind='CREATE_BATCH', batch=batch, file=file_obj, created_by=request.user)
+            response_data = self.get_serializer(batch).data
+            response_data['import_job'] = ImportJobSerializer(job).data
+            return Response(response_data, status=status.HTTP_202_ACCEPTED)
+
         try:
-            df = pd.read_excel(file_obj) if file_obj.name.endswith(('.xls', '.xlsx')) else pd.read_csv(file_obj)
-            users_to_add = []
-            created_count = 0
-            skipped_count = 0
-            errors = []
-
-            with transaction.atomic(): # Process students within a transaction
-                for index, row in df.iterrows():
-                    name, email = row.get('name'), row.get('email')
-                    if not name or not email or not isinstance(email, str):
-                        errors.append(f"Row {index+2}: Missing name or invalid email.")
-                        skipped_count += 1
-                        continue
-
-                    email = email.strip().lower()
-                    name = str(name).strip()
-
-                    user, created = User.objects.get_or_create(
-                        username=email,
-                        defaults={
-                            'email': email,
-                            'first_name': name.split(" ", 1)[0],
-                            'last_name': name.split(" ", 1)[1] if len(name.split(" ", 1)) > 1 else "",
-                            'role': 'STUDENT',
-                            'must_change_password': True
-                        }
-                    )
-                    if created:
-                        created_count += 1
-                        password = secrets.token_urlsafe(8)
-                        user.set_password(password)
-                        user.save()
-                        send_student_credentials(user, password) # Send credentials only for newly created users
-                    elif user.role != 'STUDENT':
-                         errors.append(f"Row {index+2}: Email {email} exists but is not a student.")
-                         skipped_count += 1
-                         continue # Don't add non-students
-
-                    users_to_add.append(user)
-
-                batch.students.add(*users_to_add)
+            # All-or-nothing for a new batch, so the cleanup below finds it empty
+            with transaction.atomic():
+                import_summary = import_students(batch, read_roster(file_obj))
 
             serializer = self.get_serializer(batch)
             response_data = serializer.data
-            response_data['import_summary'] = {
-                 'added_to_batch': len(users_to_add),
-                 'newly_created': created_count,
-                 'skipped': skipped_count,
-                 'errors': errors
-            }
+            response_data['import_summary'] = import_summary
             return Response(response_data, status=status.HTTP_201_CREATED)
 
         except Exception as e:
@@ -819,57 +1105,18 @@ class BatchViewSet(viewsets.ModelViewSet):
         if not file_obj:
             return Response({'error': 'No file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            df = pd.read_excel(file_obj) if file_obj.name.endswith(('.xls', '.xlsx')) else pd.read_csv(file_obj)
-            users_to_add = []
-            created_count = 0
-            skipped_count = 0
-            errors = []
+        if wants_async_import(request):
+            job = ImportJob.objects.create(kind='ADD_TO_BATCH', batch=batch, file=file_obj, created_by=request.user)
+            response_data = self.get_serializer(batch).data
+            response_data['import_job'] = ImportJobSerializer(job).data
+            return Response(response_data, status=status.HTTP_202_ACCEPTED)
 
-            with transaction.atomic():
-                for index, row in df.iterrows():
-                    name, email = row.get('name'), row.get('email')
-                    if not name or not email or not isinstance(email, str):
-                        errors.append(f"Row {index+2}: Missing name or invalid email.")
-                        skipped_count += 1
-                        continue
-
-                    email = email.strip().lower()
-                    name = str(name).strip()
-
-                    user, created = User.objects.get_or_create(
-                        username=email,
-                        defaults={
-                            'email': email,
-                            'first_name': name.split(" ", 1)[0],
-                            'last_name': name.split(" ", 1)[1] if len(name.split(" ", 1)) > 1 else "",
-                            'role': 'STUDENT',
-                            'must_change_password': True
-                        }
-                    )
-                    if created:
-                        created_count += 1
-                        password = secrets.token_urlsafe(8)
-                        user.set_password(password)
-                        user.save()
-                        send_student_credentials(user, password)
-                    elif user.role != 'STUDENT':
-                         errors.append(f"Row {index+2}: Email {email} exists but is not a student.")
-                         skipped_count += 1
-                         continue
-
-                    users_to_add.append(user)
-
-                batch.students.add(*users_to_add)
+        try:
+            import_summary = import_students(batch, read_roster(file_obj))
 
-            serializer = self.get_serializer(batch)
+            serializer = self.get_serializer(self.get_object()) # Re-read so student_count is current
             response_data = serializer.data
-            response_data['import_summary'] = {
-                 'added_to_batch': len(users_to_add),
-                 'newly_created': created_count,
-                 'skipped': skipped_count,
-                 'errors': errors
-            }
+            response_data['import_summary'] = import_summary
             return Response(response_data, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -913,21 +1160,34 @@ class BatchViewSet(viewsets.ModelViewSet):
                 invalid_ids = [mid for mid in material_ids if mid not in valid_ids]
                 return Response({'error': f'Invalid material IDs provided: {invalid_ids}'}, status=status.HTTP_400_BAD_REQUEST)
 
-            students_in_batch = batch.students.all()
+            # One grant row per material; students (including later joiners) inherit it through the batch
+            batch.materials.add(*materials_to_assign)
 
-            with transaction.atomic():
-                for student in students_in_batch:
-                    student.assigned_materials.add(*materials_to_assign)
-
-            return Response({'status': f'Materials assigned to {students_in_batch.count()} students in batch {batch.name}.'}, status=status.HTTP_200_OK)
+            return Response({'status': f'Materials assigned to {batch.students.count()} students in batch {batch.name}.'}, status=status.HTTP_200_OK)
 
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class ScheduleViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['post'])
+    def remove_materials(self, request, pk=None):
+        batch = self.get_object()
+        material_ids = request.data.get('material_ids', [])
+        batch.materials.remove(*Material.objects.filter(id__in=material_ids))
+        return Response(self.get_serializer(self.get_object()).data, status=status.HTTP_200_OK)
+
+class ScheduleViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated] # Or IsAdminUser
     queryset = Schedule.objects.select_related('trainer', 'batch__course', 'batch__college').prefetch_related('materials').all() # Optimize
     serializer_class = ScheduleSerializer
+    etag_models = (Schedule, User, Batch, Course, College, Material)
+    # ?since=&until= selects the schedules overlapping that window
+    filter_params = {
+        'trainer': FilterParam('trainer', serializers.IntegerField(), many=True),
+        'batch': FilterParam('batch', serializers.IntegerField(), many=True),
+        'since': FilterParam('end_date__gte', moment()),
+        'until': FilterParam('start_date__lt', moment()),
+    }
+    ordering_fields = ('id', 'start_date', 'end_date')
 
     # _update_trainer_expiry_and_send_credentials - existing logic is fine
     def _update_trainer_expiry_and_send_credentials(self, trainer):
@@ -959,7 +1219,7 @@ class ScheduleViewSet(viewsets.ModelViewSet):
 
             if password_changed:
                 # Send email with credentials only if the password was actually reset
-                send_mail(
+                queue_email(
                     'Your Parc Platform Login Credentials & Schedule Update',
                     f'Hi {trainer.first_name},\n\nYou have been assigned to a new schedule or your access needed reactivation. '
                     'Please use the following temporary credentials to log in. You may change your password after logging in if you wish.\n\n'
@@ -968,11 +1228,10 @@ class ScheduleViewSet(viewsets.ModelViewSet):
                     f'Your access will be valid until: {trainer.access_expiry_date.strftime("%Y-%m-%d %H:%M")}\n\n'
                     'Login URL: [Your Frontend Login URL Here]\n\n'
                     'Best regards,\nThe Parc Platform Team',
-                    'admin@parcplatform.com', # Use settings.EMAIL_HOST_USER
                     [trainer.email],
-                    fail_silently=False,
+                    'admin@parcplatform.com', # Use settings.EMAIL_HOST_USER
                 )
-                print(f"--- SENT/RESET CREDENTIALS TO TRAINER: {trainer.email} | TEMP PASSWORD: {temp_password} ---")
+                logger.info("Queued reset credentials for trainer %s", trainer.email)
         else:
             # If no upcoming schedules, deactivate and clear expiry, unless already inactive
             if trainer.is_active or trainer.access_expiry_date is not None:
@@ -981,23 +1240,34 @@ class ScheduleViewSet(viewsets.ModelViewSet):
                 trainer.save(update_fields=['is_active', 'access_expiry_date'])
 
 
+    @transaction.atomic
     def perform_create(self, serializer):
         schedule = serializer.save()
         self._update_trainer_expiry_and_send_credentials(schedule.trainer)
 
+    @transaction.atomic
     def perform_update(self, serializer):
         schedule = serializer.save()
         self._update_trainer_expiry_and_send_credentials(schedule.trainer)
 
+    @transaction.atomic
     def perform_destroy(self, instance):
         trainer = instance.trainer
         instance.delete()
         self._update_trainer_expiry_and_send_credentials(trainer) # Recalculate expiry after deletion
 
-class BillViewSet(viewsets.ModelViewSet):
+class BillViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     queryset = Bill.objects.select_related('trainer').prefetch_related('expenses').all().order_by('-date') # Optimize
     serializer_class = BillSerializer
+    etag_models = (Bill, Expense, User)
+    cursor_ordering = ('-date', '-id')
+    filter_params = {
+        'status': FilterParam('status', serializers.ChoiceField(choices=Bill.STATUS_CHOICES), many=True),
+        'trainer': FilterParam('trainer', serializers.IntegerField(), many=True),
+        'month': FilterParam(month_of('date'), month(), many=True), # ?month=2026-03
+    }
+    ordering_fields = ('id', 'date', 'invoice_number')
 
     # Add permission checks if needed (e.g., Trainer can only CRUD own bills, Admin can CRUD all)
     def get_queryset(self):
@@ -1033,40 +1303,462 @@ class BillViewSet(viewsets.ModelViewSet):
              raise PermissionDenied("You do not have permission to create bills.")
 
 
-class AssessmentViewSet(viewsets.ModelViewSet):
+class AssessmentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated] # Or IsAdminUser/IsTrainerOrAdmin
     queryset = Assessment.objects.all()
     serializer_class = AssessmentSerializer
 
-class StudentAttemptViewSet(viewsets.ModelViewSet):
+class StudentAttemptViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     queryset = StudentAttempt.objects.select_related('student', 'assessment').all() # Optimize
     serializer_class = StudentAttemptSerializer
+    etag_models = (StudentAttempt, User, Assessment)
+    cursor_ordering = ('-timestamp', '-id')
+    filter_params = {
+        'student': FilterParam('student', serializers.IntegerField(), many=True),
+        'assessment': FilterParam('assessment', serializers.IntegerField(), many=True),
+        'since': FilterParam('timestamp__gte', moment()),
+        'until': FilterParam('timestamp__lt', moment()),
+    }
+    ordering_fields = ('id', 'timestamp', 'score')
     # Add permission checks (Student can CRUD own, Admin/Trainer can List/Retrieve?)
 
+    # The leaderboard rows are updated from the attempt signals; keep both in one transaction
+    @transaction.atomic
+    def perform_create(self, serializer):
+        serializer.save()
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+
+def build_reporting_snapshot():
+    # Shared by the reporting endpoint and the bootstrap snapshot
+    # Read from the maintained leaderboard table rather than summing every attempt
+    leaderboard = [serialize_entry(entry) for entry in top_entries('GLOBAL', 0, 20)] # Limit leaderboard size
+
+    recent_attempts_queryset = StudentAttempt.objects.select_related('student', 'assessment').order_by('-timestamp')[:15] # Limit attempts shown
+    recent_attempts = StudentAttemptSerializer(recent_attempts_queryset, many=True).data
+
+    return {
+        'leaderboard': leaderboard,
+        'student_attempts': recent_attempts,
+    }
+
+class ScoreAnalyticsView(APIView):
+    """
+    GET /api/reporting/analytics/?course=<id or name>&assessment=<id>&batch=<id>&bins=10&pass_mark=40
+
+    Histogram, mean, median, p90 and pass rate per assessment and per batch.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        if not (user.role == 'ADMIN' or user.is_staff):
+            raise PermissionDenied("Only admins can view score analytics.")
+
+        params = request.query_params
+        try:
+            filters = {
+                'assessment_id': int(params['assessment']) if params.get('assessment') else None,
+                'batch_id': int(params['batch']) if params.get('batch') else None,
+                'bins': int(params.get('bins', 10)),
+                'pass_mark': int(params['pass_mark']) if params.get('pass_mark') else None,
+            }
+        except ValueError:
+            return Response({'error': 'assessment, batch, bins and pass_mark must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= filters['bins'] <= 100:
+            return Response({'error': 'bins must be between 1 and 100.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Assessments reference their course by name
+        course = params.get('course')
+        if course and course.isdigit():
+            course = Course.objects.filter(id=course).values_list('name', flat=True).first()
+            if course is None:
+                return Response({'error': 'Course not found.'}, status=status.HTTP_404_NOT_FOUND)
+        filters['course'] = course or None
+
+        return Response(cached_score_report(**filters))
+
+
+class LeaderboardView(APIView):
+    """
+    GET /api/leaderboard/?scope=batch&scope_id=3&limit=20
+
+    Top-N of a scope (global, batch, college or course) plus the caller's own
+    entry and rank, all served from the leaderboard table's score index.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        scope = request.query_params.get('scope', 'global').upper()
+        if scope not in LEADERBOARD_SCOPES:
+            return Response({'error': f"Unknown scope. Use one of: {', '.join(s.lower() for s in LEADERBOARD_SCOPES)}."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            scope_id = 0 if scope == 'GLOBAL' else int(request.query_params['scope_id'])
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except (KeyError, ValueError):
+            return Response({'error': 'scope_id is required for this scope and must be an integer; limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        entries, rank, previous_score = [], 0, None
+        for position, entry in enumerate(top_entries(scope, scope_id, limit), start=1):
+            if entry.total_score != previous_score: # Ties share a rank
+                rank, previous_score = position, entry.total_score
+            entries.append(serialize_entry(entry, rank))
+
+        own_entry = LeaderboardEntry.objects.select_related('student').filter(
+            scope=scope, scope_id=scope_id, student=request.user
+        ).first()
+        return Response({
+            'scope': scope.lower(),
+            'scope_id': scope_id,
+            'leaderboard': entries,
+            'me': serialize_entry(own_entry, rank_of(own_entry)) if own_entry else None,
+        })
+
+
+class CoverVariantView(APIView):
+    """
+    GET /api/covers/<ab>/<cd>/<hash>-<width>.<webp|jpg>
+
+    Resized course covers (see core.thumbnails). Public like the original
+    cover, and the name is the source's content hash, so responses are
+    cacheable by anyone, forever.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = [] # An expired token must not turn an <img> into a 401
+
+    def get(self, request, name, *args, **kwargs):
+        parsed = parse_derivative_name('derived/covers/' + name)
+        if parsed is None or parsed[2] not in COVER_WIDTHS:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        _, digest, width, fmt = parsed
+        full_name = derivative_name('covers', digest, width, fmt)
+        if not derived_storage.exists(full_name):
+            # Built on upload; covers from before the pipeline are built on first request
+            stored = f"{digest[:2]}/{digest[2:4]}/{digest[4:]}"
+            course = Course.objects.filter(cover_photo__contains=stored).first()
+            if course is not None:
+                build_cover_variants(course)
+            if not derived_storage.exists(full_name):
+                return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        response = file_response(request, DerivedFile(full_name), content_type=IMAGE_FORMATS[fmt][2])
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+        return response
+
+
 class ReportingDashboardView(APIView):
     permission_classes = [IsAuthenticated] # Or IsAdminUser/IsTrainerOrAdmin
 
     def get(self, request, *args, **kwargs):
         # Existing logic seems fine, assumes Admin view
-        leaderboard_data = User.objects.filter(role='STUDENT') \
-            .annotate(total_score=Sum('attempts__score')) \
-            .filter(total_score__isnull=False) \
-            .order_by('-total_score') \
-            .values('id', 'first_name', 'last_name', 'total_score')[:20] # Limit leaderboard size
-
-        leaderboard = [
-            {
-                'studentId': entry['id'], # Include ID if needed on frontend
-                'studentName': f"{entry['first_name']} {entry['last_name']}".strip(),
-                'totalScore': entry['total_score'] or 0
-            } for entry in leaderboard_data
-        ]
-
-        recent_attempts_queryset = StudentAttempt.objects.select_related('student', 'assessment').order_by('-timestamp')[:15] # Limit attempts shown
-        recent_attempts = StudentAttemptSerializer(recent_attempts_queryset, many=True).data
+        return Response(build_reporting_snapshot())
+
+
+class RoleScopedSnapshotMixin:
+    """
+    Which collections each role receives and which rows of them it may see.
+
+    Shared by the bootstrap snapshot and the delta-sync endpoint so both
+    apply exactly the same visibility rules.
+    """
+    ROLE_SECTIONS = {
+        'ADMIN': (
+            'users', 'materials', 'schedules', 'colleges', 'trainer_applications',
+            'employee_applications', 'bills', 'reporting', 'assessments', 'courses',
+            'batches', 'tasks', 'employee_documents',
+        ),
+        'TRAINER': ('users', 'materials', 'schedules', 'bills', 'assessments', 'courses', 'batches'),
+        'STUDENT': ('users', 'materials', 'schedules', 'reporting', 'assessments', 'courses', 'batches'),
+        'EMPLOYEE': ('users', 'tasks', 'employee_documents'),
+    }
+
+    SECTION_SERIALIZERS = {
+        'users': UserSerializer,
+        'materials': MaterialSerializer,
+        'schedules': ScheduleSerializer,
+        'colleges': CollegeSerializer,
+        'trainer_applications': TrainerApplicationSerializer,
+        'employee_applications': EmployeeApplicationSerializer,
+        'bills': BillSerializer,
+        'student_attempts': StudentAttemptSerializer,
+        'assessments': AssessmentSerializer,
+        'courses': CourseSerializer,
+        'batches': BatchSerializer,
+        'tasks': TaskSerializer,
+        'employee_documents': EmployeeDocumentSerializer,
+    }
+
+    def get_role(self, user):
+        return 'ADMIN' if user.is_staff else user.role
+
+    def settled_version(self):
+        """
+        The newest ChangeLog id a client may be handed as its version.
+
+        Ids are assigned when a row is inserted, not when its transaction
+        commits, so a recent id can be visible while a smaller one is still
+        uncommitted; a client at the larger id would skip the smaller one for
+        good. Entries younger than SYNC_SETTLE_SECONDS are therefore still sent
+        but not counted as synced: the client gets them again next time
+        (upserts are idempotent) along with anything that committed late.
+        """
+        cutoff = timezone.now() - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+        return ChangeLog.objects.filter(changed_at__lt=cutoff).order_by('-id').values_list('id', flat=True).first() or 0
+
+    def get_role_sections(self, role):
+        sections = self.ROLE_SECTIONS.get(role, ())
+        # 'reporting' is the leaderboard plus the attempts collection
+        return tuple('student_attempts' if section == 'reporting' else section for section in sections)
+
+    def get_section_queryset(self, section, user, role):
+        return getattr(self, f'_{section}_queryset')(user, role)
+
+    def _users_queryset(self, user, role):
+        queryset = User.objects.prefetch_related(*prefetch_plan(UserSerializer))
+        if role == 'TRAINER':
+            queryset = queryset.filter(
+                Q(id=user.id) | Q(role='STUDENT', batches__schedules__trainer=user)
+            ).distinct()
+        elif role != 'ADMIN':
+            queryset = queryset.filter(id=user.id)
+        return queryset
+
+    def _materials_queryset(self, user, role):
+        queryset = Material.objects.select_related('course')
+        if role == 'TRAINER':
+            # Mirrors the access rules in MaterialViewSet.view_content
+            queryset = queryset.filter(
+                Q(uploader=user) | Q(uploader__isnull=True) | Q(schedule__trainer=user)
+            ).distinct()
+        elif role == 'STUDENT':
+            queryset = queryset.filter(
+                Q(assigned_users=user) | Q(assigned_batches__students=user) | Q(course__batches__students=user)
+            ).distinct()
+        return queryset
+
+    def _schedules_queryset(self, user, role):
+        queryset = Schedule.objects.select_related('trainer', 'batch__course', 'batch__college') \
+            .prefetch_related(Prefetch('materials', queryset=Material.objects.select_related('course')))
+        if role == 'TRAINER':
+            queryset = queryset.filter(trainer=user)
+        elif role == 'STUDENT':
+            queryset = queryset.filter(batch__students=user)
+        return queryset
 
-        return Response({
-            'leaderboard': leaderboard,
-            'student_attempts': recent_attempts,
-        })
\ No newline at end of file
+    def _colleges_queryset(self, user, role):
+        return College.objects.prefetch_related(
+            Prefetch('courses__modules__materials', queryset=Material.objects.select_related('course'))
+        )
+
+    def _trainer_applications_queryset(self, user, role):
+        return TrainerApplication.objects.filter(status='PENDING')
+
+    def _employee_applications_queryset(self, user, role):
+        return EmployeeApplication.objects.filter(status='PENDING')
+
+    def _bills_queryset(self, user, role):
+        queryset = Bill.objects.select_related('trainer').prefetch_related('expenses').order_by('-date')
+        if role == 'TRAINER':
+            queryset = queryset.filter(trainer=user)
+        return queryset
+
+    def _student_attempts_queryset(self, user, role):
+        queryset = StudentAttempt.objects.select_related('student', 'assessment').order_by('-timestamp')
+        if role == 'STUDENT':
+            queryset = queryset.filter(student=user)
+        elif role != 'ADMIN':
+            queryset = queryset.none()
+        return queryset
+
+    def _assessments_queryset(self, user, role):
+        return Assessment.objects.all()
+
+    def _courses_queryset(self, user, role):
+        queryset = Course.objects.prefetch_related(
+            Prefetch('modules__materials', queryset=Material.objects.select_related('course'))
+        )
+        if role == 'STUDENT':
+            queryset = queryset.filter(batches__students=user).distinct()
+        return queryset
+
+    def _batches_queryset(self, user, role):
+        queryset = Batch.objects.select_related('course', 'college').prefetch_related('students', 'materials')
+        if role == 'TRAINER':
+            queryset = queryset.filter(schedules__trainer=user).distinct()
+        elif role == 'STUDENT':
+            queryset = queryset.filter(students=user)
+        return queryset
+
+    def _tasks_queryset(self, user, role):
+        queryset = Task.objects.select_related('employee').order_by('-updated_at')
+        if role != 'ADMIN':
+            queryset = queryset.filter(employee=user)
+        return queryset
+
+    def _employee_documents_queryset(self, user, role):
+        queryset = EmployeeDocument.objects.select_related('employee')
+        if role != 'ADMIN':
+            queryset = queryset.filter(employee=user)
+        return queryset
+
+    def serialize_section(self, section, queryset, context):
+        return self.SECTION_SERIALIZERS[section](queryset, many=True, context=context).data
+
+
+@method_decorator(conditional_page, name='dispatch')
+class BootstrapView(RoleScopedSnapshotMixin, APIView):
+    """
+    One role-scoped snapshot of everything a dashboard needs after login.
+
+    Replaces the per-collection fan-out in DataContext.jsx. Every section is
+    built from a single queryset with its nested relations prefetched, so the
+    query count depends on the role, not on the amount of data. The response
+    is compressed (core.middleware) and carries an ETag, so an unchanged
+    snapshot comes back as 304.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        role = self.get_role(user)
+        context = {'request': request, 'sparse_selection': None} # Snapshots are never trimmed by ?fields=
+        # Clients continue with /api/sync/?since=<version> from here; read before the
+        # sections, so whatever commits meanwhile is sent again by the next sync
+        snapshot = {'role': role, 'version': self.settled_version()}
+        for section in self.get_role_sections(role):
+            if section == 'student_attempts':
+                snapshot.update(self._reporting(user, role, context))
+                continue
+            queryset = self.get_section_queryset(section, user, role)
+            snapshot[section] = self.serialize_section(section, queryset, context)
+        response = Response(snapshot)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def _reporting(self, user, role, context):
+        reporting = build_reporting_snapshot()
+        if role == 'STUDENT':
+            attempts = self.get_section_queryset('student_attempts', user, role)
+            reporting['student_attempts'] = self.serialize_section('student_attempts', attempts, context)
+        return reporting
+
+
+class SyncView(RoleScopedSnapshotMixin, APIView):
+    """
+    Delta sync: everything that changed after `?since=<version>`.
+
+    Changed ids come from the ChangeLog (fed by the signals in signals.py).
+    Rows the caller can see are returned as upserts and deleted rows as
+    tombstone ids. `reset` tells the client to reload /api/bootstrap/
+    instead: its version predates the retained log, or what it may see has
+    changed since (an 'access' entry for the caller).
+    """
+    permission_classes = [IsAuthenticated]
+    max_changes = 2000
+
+    def get(self, request, *args, **kwargs):
+        try:
+            since = int(request.query_params.get('since', 0))
+        except (TypeError, ValueError):
+            return Response({'error': 'since must be an integer version.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        role = self.get_role(user)
+        sections = self.get_role_sections(role)
+
+        # Before reading the log: an entry committing in between is then sent, not skipped
+        settled = self.settled_version()
+        # prune_changelog keeps the newest entry, so a pruned-away version always lands here
+        oldest = ChangeLog.objects.order_by('id').values_list('id', flat=True).first()
+        # So does a change to what the caller may see at all (enrollment, a schedule's
+        # trainer, a grant, ...; signals.log_access_change): rows can appear or vanish
+        # without being edited themselves, which only a fresh snapshot gets right
+        access_changed = ChangeLog.objects.filter(id__gt=since, section='access', object_id=user.id).exists()
+        if (oldest is not None and since < oldest - 1) or access_changed:
+            return Response({'version': settled, 'reset': True, 'has_more': False, 'upserts': {}, 'tombstones': {}})
+
+        entries = list(
+            ChangeLog.objects.filter(id__gt=since, section__in=sections)
+            .order_by('id').values_list('id', 'section', 'object_id')[:self.max_changes + 1]
+        )
+        has_more = len(entries) > self.max_changes
+        entries = entries[:self.max_changes]
+        version = max(since, min(settled, entries[-1][0]) if has_more else settled)
+        # A full page of unsettled entries can't advance the version; don't have the client spin on it
+        has_more = has_more and version > since
+
+        changed = {}
+        for _, section, object_id in entries:
+            changed.setdefault(section, set()).add(object_id)
+
+        context = {'request': request, 'sparse_selection': None} # Snapshots are never trimmed by ?fields=
+        upserts, tombstones = {}, {}
+        for section, ids in changed.items():
+            queryset = self.get_section_queryset(section, user, role).filter(pk__in=ids)
+            data = self.serialize_section(section, queryset, context)
+            visible = {row['id'] for row in data}
+            if data:
+                upserts[section] = data
+            # Only rows that are gone: an unchanged scope (see the reset above) means
+            # the rest were never the caller's to see, and their ids are not theirs to learn
+            model = self.SECTION_SERIALIZERS[section].Meta.model
+            gone = (ids - visible) - set(model.objects.filter(pk__in=ids - visible).values_list('pk', flat=True))
+            if gone:
+                tombstones[section] = sorted(gone)
+
+        payload = {'version': version, 'reset': False, 'has_more': has_more, 'upserts': upserts, 'tombstones': tombstones}
+        if 'student_attempts' in changed and 'reporting' in self.ROLE_SECTIONS.get(role, ()):
+            payload['leaderboard'] = build_reporting_snapshot()['leaderboard']
+        return Response(payload)
+
+
+class SearchView(RoleScopedSnapshotMixin, APIView):
+    """
+    GET /api/search/?q=<text>[&kind=USER,COURSE][&page=2]
+
+    Ranked, paginated search over users, courses, materials, colleges and
+    batches (core.search). Each hit is limited to the rows the caller would
+    receive in their bootstrap snapshot, so search never reveals a record
+    the role can't otherwise see.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        q = request.query_params.get('q', '')
+        if not search_terms(q):
+            return Response({'error': "A search query (?q=) is required."}, status=status.HTTP_400_BAD_REQUEST)
+        kinds = [kind.strip().upper() for kind in request.query_params.get('kind', '').split(',') if kind.strip()]
+        unknown = [kind for kind in kinds if kind not in SEARCH_KINDS]
+        if unknown:
+            return Response(
+                {'error': f"Unknown kind: {', '.join(unknown)}; allowed: {', '.join(SEARCH_KINDS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        user = request.user
+        role = self.get_role(user)
+        sections = self.get_role_sections(role)
+        visible = Q()
+        for kind, (_, section, _, _) in SEARCH_KINDS.items():
+            if (kinds and kind not in kinds) or section not in sections:
+                continue
+            if role == 'ADMIN':
+                visible |= Q(kind=kind)
+            else:
+                ids = self.get_section_queryset(section, user, role).prefetch_related(None).order_by().values('id')
+                visible |= Q(kind=kind, object_id__in=ids)
+        if not visible:
+            return Response({'count': 0, 'next': None, 'previous': None, 'results': []})
+
+        queryset = match(SearchEntry.objects.filter(visible), q).order_by('-rank', 'id')
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(SearchEntrySerializer(page, many=True, context={'request': request}).data)
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware', # Early, so it compresses what everything below produced
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -127,15 +128,41 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:5173",
     "http://127.0.0.1:5174",
 ]
+# Resumable upload chunks carry their offset and checksum in headers (core.uploads)
+from corsheaders.defaults import default_headers
+CORS_ALLOW_HEADERS = (*default_headers, 'content-range', 'x-chunk-sha256')
 
 AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    # Keyset pagination is opt-in: only requests sending ?page_size= or ?cursor= get paged
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    # Declared filter_params and ordering_fields (validated), then ?fields= / ?expand= trimming
+    'DEFAULT_FILTER_BACKENDS': (
+        'core.filters.ParamFilter',
+        'core.filters.CheckedOrderingFilter',
+        'core.filters.SparseFieldsFilter',
+    ),
+    'PAGE_SIZE': 50,
+    # orjson-backed when the optional `orjson` package is installed, DRF's stdlib json otherwise
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
+# JSON/text responses at least this large are gzip- or brotli-compressed
+# (core.middleware; brotli needs the optional `brotli` package)
+API_COMPRESSION_MIN_SIZE = 1024 # bytes
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
@@ -148,10 +175,79 @@ SIMPLE_JWT = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored once per distinct content, sharded by SHA-256 (see core.storage)
+STORAGES = {
+    'default': {'BACKEND': 'core.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 # --- EMAIL CONFIGURATION FOR GMAIL ---
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
-EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
\ No newline at end of file
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
+
+# --- STUDENT ONBOARDING ---
+# 'password': email a temporary password (hashed during the create/import request)
+# 'activation': create the account with an unusable password and email a signed,
+#               expiring link to FRONTEND_URL/activate (ActivateAccountForm.jsx); the password is
+#               hashed once, when the student sets it there
+STUDENT_ONBOARDING_MODE = os.environ.get('STUDENT_ONBOARDING_MODE', 'password')
+# The same choice for roster imports (core.importers). 'password' costs one PBKDF2 hash
+# (~0.1 s) per new student, minutes for a large roster, so imports default to activation links
+ROSTER_ONBOARDING_MODE = os.environ.get('ROSTER_ONBOARDING_MODE', 'activation')
+ACTIVATION_TOKEN_MAX_AGE = 60 * 60 * 24 * 7 # seconds
+FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://localhost:5173')
+
+# --- ROSTER IMPORT JOBS (core.importers) ---
+# Set IMPORT_JOBS_ASYNC=1 only where a worker runs `python manage.py process_import_jobs --loop`;
+# otherwise `?async=true` uploads are imported during the request as before
+IMPORT_JOBS_ASYNC = os.environ.get('IMPORT_JOBS_ASYNC', '').lower() in ('1', 'true', 'yes')
+IMPORT_JOB_STALE_AFTER = 10 * 60 # seconds without progress before a RUNNING job is requeued
+
+# --- SCORE ANALYTICS (/api/reporting/analytics/) ---
+ANALYTICS_PASS_MARK = int(os.environ.get('ANALYTICS_PASS_MARK', 40)) # Attempt scores are percentages
+ANALYTICS_CACHE_TIMEOUT = 60 * 60 # seconds; the cache key changes with every new attempt anyway
+
+# --- FILE DELIVERY (core.downloads) ---
+# 'python': Django streams the file itself (development default)
+# 'nginx':  Django checks permissions, then replies with X-Accel-Redirect to
+#           FILE_DELIVERY_INTERNAL_URL, an `internal` nginx location aliased to MEDIA_ROOT
+# 'apache': same, with an X-Sendfile header for mod_xsendfile
+FILE_DELIVERY_BACKEND = os.environ.get('FILE_DELIVERY_BACKEND', 'python')
+FILE_DELIVERY_INTERNAL_URL = os.environ.get('FILE_DELIVERY_INTERNAL_URL', '/protected-media/')
+
+# --- RESUMABLE UPLOADS (/api/uploads/, core.uploads) ---
+# The web server's body limit (nginx client_max_body_size) must exceed UPLOAD_CHUNK_SIZE
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024 # bytes; the largest chunk one PUT may carry
+UPLOAD_MAX_SIZE = int(os.environ.get('UPLOAD_MAX_SIZE', 5 * 1024 ** 3)) # bytes per file
+UPLOAD_SESSION_TTL = 60 * 60 * 24 # seconds without a chunk before `purge_upload_sessions` drops a session
+
+# --- DELTA SYNC (/api/bootstrap/, /api/sync/) ---
+# ChangeLog entries younger than this are sent but not yet counted as synced, so a
+# transaction that commits after a later one has (an older id) is never skipped.
+# Must exceed the longest transaction that writes ChangeLog entries.
+SYNC_SETTLE_SECONDS = 30
+# `prune_changelog` (run daily) drops older entries; clients behind that get `reset` and re-bootstrap
+CHANGELOG_RETENTION_DAYS = int(os.environ.get('CHANGELOG_RETENTION_DAYS', 30))
+
+# --- CACHE ---
+# Shared cache for the material access index and analytics. Use Redis in
+# production (REDIS_URL, needs the `redis` package): with the per-process
+# default, invalidations made by one worker are not seen by the others.
+if os.environ.get('REDIS_URL'):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': os.environ['REDIS_URL']}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+MATERIAL_ACCESS_CACHE_TIMEOUT = 15 * 60 # seconds; upper bound on staleness if an invalidation is missed
+
+# --- LOGGING ---
+# core.* messages (queued credential emails, delivery failures) go to the console
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {'core': {'handlers': ['console'], 'level': os.environ.get('CORE_LOG_LEVEL', 'INFO')}},
+}
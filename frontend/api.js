@@ -115,4 +115,37 @@ apiClient.interceptors.response.use(
   }
 );
 
+// Resumable upload (backend core.uploads): create a session, PUT the file in chunks and
+// finalize it into a material. A failed chunk is retried from the offset the server reports,
+// so a flaky connection costs one chunk rather than the whole file.
+export async function uploadInChunks(file, finalizeData = {}, { target = 'MATERIAL', onProgress, retries = 5 } = {}) {
+  const { data: session } = await apiClient.post('/uploads/', {
+    filename: file.name, size: file.size, content_type: file.type, target,
+  });
+  let offset = session.received;
+  let failures = 0;
+  while (offset < file.size) {
+    const end = Math.min(offset + session.chunk_size, file.size);
+    try {
+      const { data } = await apiClient.put(`/uploads/${session.id}/`, file.slice(offset, end), {
+        headers: { 'Content-Type': 'application/octet-stream', 'Content-Range': `bytes ${offset}-${end - 1}/${file.size}` },
+        timeout: 0,
+      });
+      offset = data.received;
+      failures = 0;
+      if (onProgress) onProgress(offset / file.size);
+    } catch (error) {
+      if (++failures > retries) throw error;
+      const received = error.response?.data?.received;
+      if (typeof received === 'number') {
+        offset = received; // The server is ahead of (or behind) us; continue from its offset
+      } else {
+        await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+      }
+    }
+  }
+  const { data } = await apiClient.post(`/uploads/${session.id}/finalize/`, finalizeData, { timeout: 0 });
+  return data.result;
+}
+
 export default apiClient;
\ No newline at end of file
@@ -12,6 +12,9 @@ import ManageBatchStudentsModal from './ManageBatchStudentsModal'; // Import the
 import jsPDF from 'jspdf';
 import 'jspdf-autotable';
 import Spinner from '../shared/Spinner';
+import apiClient from '../../api';
+
+const ROSTER_PAGE_SIZE = 50;
 
 // Reusable StatCard component
 const StatCard = ({ title, value, icon: Icon }) => (
@@ -41,20 +44,27 @@ const StudentTab = ({ college }) => {
 
     const collegeBatches = useMemo(() => batches.filter(b => b.college === college.id), [batches, college.id]);
 
-    const collegeStudents = useMemo(() => {
-        if (!college || !batches || !students) return [];
-        const collegeBatchIds = new Set(collegeBatches.map(b => b.id));
-        const studentSet = new Set();
-        return students.filter(s => {
-            if (Array.isArray(s.batches) && s.batches.some(studentBatchId => collegeBatchIds.has(studentBatchId))) {
-                if (!studentSet.has(s.id)) {
-                    studentSet.add(s.id);
-                    return true;
-                }
-            }
-            return false;
-        });
-    }, [students, batches, college.id, collegeBatches]);
+    // The roster is paged server-side (GET /colleges/<id>/roster/); reload it when students or batches change
+    const [collegeStudents, setCollegeStudents] = useState([]);
+    const [nextPage, setNextPage] = useState(null);
+    const [isRosterLoading, setIsRosterLoading] = useState(false);
+
+    const loadRoster = async (url, append) => {
+        setIsRosterLoading(true);
+        try {
+            const response = await apiClient.get(url);
+            setCollegeStudents(prev => append ? [...prev, ...response.data.results] : response.data.results);
+            setNextPage(response.data.next);
+        } catch (error) {
+            console.error("Failed to load college roster:", error);
+        } finally {
+            setIsRosterLoading(false);
+        }
+    };
+
+    useEffect(() => {
+        loadRoster(`/colleges/${college.id}/roster/?page_size=${ROSTER_PAGE_SIZE}`, false);
+    }, [college.id, students, batches]);
 
     const handleStudentInputChange = (e) => {
         const { name, value } = e.target;
@@ -108,7 +118,7 @@ const StudentTab = ({ college }) => {
                     </thead>
                     <tbody className="bg-white divide-y divide-slate-200">
                         {collegeStudents.map(s => {
-                            const studentCourses = [...new Set(batches.filter(b => Array.isArray(s.batches) && s.batches.includes(b.id)).map(b => b.course_name))].join(', ');
+                            const studentCourses = s.courses.join(', ');
                             return (
                                 <tr key={s.id} className="hover:bg-slate-50 transition-colors">
                                     <td className="px-6 py-4 whitespace-nowrap text-sm font-medium text-slate-900">{s.full_name}</td>
@@ -124,6 +134,12 @@ const StudentTab = ({ college }) => {
                     </tbody>
                 </table>
             </div>
+            {isRosterLoading && <Spinner />}
+            {nextPage && !isRosterLoading && (
+                <div className="flex justify-center">
+                    <button onClick={() => loadRoster(nextPage, true)} className="px-4 py-2 text-sm font-medium text-violet-600 bg-white border border-slate-300 rounded-md shadow-sm hover:bg-slate-50">Load more students</button>
+                </div>
+            )}
             {isAddStudentModalOpen && (
                  <Modal isOpen={isAddStudentModalOpen} onClose={() => setIsAddStudentModalOpen(false)} title={`Add Student to ${college.name}`}>
                     <form onSubmit={handleStudentSubmit} className="space-y-4">
@@ -385,26 +401,13 @@ const CollegeInformationDashboard = ({ college, onBack }) => {
     const [activeTab, setActiveTab] = useState('students');
     const { students, schedules, batches } = useData();
 
-    const collegeStudents = useMemo(() => {
-        if (!college || !batches || !students) return [];
-        const collegeBatchIds = new Set(batches.filter(b => b.college === college.id).map(b => b.id));
-        const studentSet = new Set();
-        return students.filter(s => {
-            if (Array.isArray(s.batches) && s.batches.some(studentBatchId => collegeBatchIds.has(studentBatchId))) {
-                if (!studentSet.has(s.id)) {
-                    studentSet.add(s.id);
-                    return true;
-                }
-            }
-            return false;
-        });
-    }, [students, batches, college.id]);
-
-    const collegeCourses = college.courses;
-    const collegeSchedules = useMemo(() => schedules.filter(s => {
-        const batch = batches.find(b => b.id === s.batch);
-        return batch && batch.college === college.id;
-    }), [schedules, batches, college.id]);
+    // Counts come from GET /colleges/<id>/summary/ (SQL aggregates); refreshed after local changes
+    const [summary, setSummary] = useState(null);
+    useEffect(() => {
+        apiClient.get(`/colleges/${college.id}/summary/`)
+            .then(response => setSummary(response.data))
+            .catch(error => console.error("Failed to load college summary:", error));
+    }, [college.id, students, schedules, batches]);
 
     const renderTabContent = () => {
         switch (activeTab) {
@@ -424,9 +427,9 @@ const CollegeInformationDashboard = ({ college, onBack }) => {
                 </div>
             </div>
             <div className="grid grid-cols-1 sm:grid-cols-3 gap-6">
-                <StatCard title="Total Students" value={collegeStudents.length} icon={UsersIcon} />
-                <StatCard title="Courses Offered" value={collegeCourses.length} icon={GraduationCapIcon} />
-                <StatCard title="Total Schedules" value={collegeSchedules.length} icon={CalendarIcon} />
+                <StatCard title="Total Students" value={summary ? summary.student_count : '…'} icon={UsersIcon} />
+                <StatCard title="Courses Offered" value={summary ? summary.course_count : college.courses.length} icon={GraduationCapIcon} />
+                <StatCard title="Total Schedules" value={summary ? summary.schedule_count : '…'} icon={CalendarIcon} />
             </div>
             <div className="border-b border-slate-200">
                 <nav className="-mb-px flex space-x-8" aria-label="Tabs">
@@ -90,8 +90,15 @@ const EmployeeManager = () => {
       setViewingDocsEmployeeId(employeeId);
   };
 
-  const handleViewProfile = (employee) => {
+  const handleViewProfile = async (employee) => {
       setViewingProfileEmployee(employee);
+      // The users list leaves out education/experience/certifications; load the full record
+      try {
+          const response = await apiClient.get(`/users/${employee.id}/`);
+          setViewingProfileEmployee(current => current && current.id === employee.id ? response.data : current);
+      } catch (error) {
+          console.error("Failed to load employee profile:", error);
+      }
   };
 
   const handleCopyLink = () => {
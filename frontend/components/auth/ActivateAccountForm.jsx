@@ -0,0 +1,110 @@
+// frontend/components/auth/ActivateAccountForm.jsx
+
+import React, { useState } from 'react';
+import { PygenicArcTextLogo, LockIcon } from '../icons/Icons';
+import Spinner from '../shared/Spinner';
+import { useNavigate, useSearchParams } from 'react-router-dom';
+import apiClient from '../../api';
+
+// Landing page of the activation email (backend: core.utils.student_activation_email).
+// The token in the link identifies the student to /auth/set-password/; no login needed.
+const ActivateAccountForm = () => {
+  const [password, setPassword] = useState('');
+  const [confirmPassword, setConfirmPassword] = useState('');
+  const [error, setError] = useState('');
+  const [success, setSuccess] = useState('');
+  const [loading, setLoading] = useState(false);
+  const [searchParams] = useSearchParams();
+  const token = searchParams.get('token') || '';
+  const navigate = useNavigate();
+
+  const handleSubmit = async (e) => {
+    e.preventDefault();
+    if (password.length < 8) {
+        setError('Password must be at least 8 characters long.');
+        return;
+    }
+    if (password !== confirmPassword) {
+      setError('Passwords do not match.');
+      return;
+    }
+    setError('');
+    setLoading(true);
+    try {
+      await apiClient.post('/auth/set-password/', { password, token });
+      setSuccess('Your account is active! Redirecting you to log in...');
+      setTimeout(() => navigate('/login'), 2000);
+    } catch (err) {
+      setError(err?.response?.data?.error || 'An unexpected error occurred.');
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  return (
+    <div className="flex items-center justify-center min-h-screen w-full main-bg">
+      <div className="w-full max-w-md p-8 md:p-12 bg-white dark:bg-slate-900 rounded-2xl shadow-2xl border border-slate-800">
+          <div className="text-left mb-8">
+            <PygenicArcTextLogo className="h-10 w-auto text-violet-500" />
+            <h2 className="mt-6 text-3xl font-bold text-slate-900 dark:text-white">
+              Activate Your Account
+            </h2>
+            <p className="text-slate-500 dark:text-slate-400 mt-2">
+              Welcome! Choose a password to finish setting up your student account.
+            </p>
+          </div>
+          {!token && (
+            <p className="mb-6 text-sm text-center text-red-500 bg-red-100 dark:bg-red-900/30 p-3 rounded-md">
+              This activation link is incomplete. Please open the link from your email again.
+            </p>
+          )}
+          <form className="space-y-6" onSubmit={handleSubmit}>
+            {error && <p className="text-sm text-center text-red-500 bg-red-100 dark:bg-red-900/30 p-3 rounded-md">{error}</p>}
+            {success && <p className="text-sm text-center text-green-600 bg-green-100 dark:bg-green-900/30 p-3 rounded-md">{success}</p>}
+            
+            <div className="relative">
+              <div className="absolute inset-y-0 left-0 flex items-center pl-3 pointer-events-none">
+                <LockIcon className="w-5 h-5 text-slate-400" />
+              </div>
+              <input
+                id="password"
+                name="password"
+                type="password"
+                required
+                className="w-full py-3 pl-10 pr-4 text-slate-900 bg-slate-50 border border-slate-300 rounded-md placeholder:text-slate-400 focus:ring-2 focus:ring-inset focus:ring-violet-600 sm:text-sm dark:bg-slate-800 dark:border-slate-700 dark:text-white dark:placeholder-slate-400 focus:border-violet-500"
+                placeholder="New Password (min. 8 characters)"
+                value={password}
+                onChange={(e) => setPassword(e.target.value)}
+              />
+            </div>
+            <div className="relative">
+              <div className="absolute inset-y-0 left-0 flex items-center pl-3 pointer-events-none">
+                <LockIcon className="w-5 h-5 text-slate-400" />
+              </div>
+              <input
+                id="confirmPassword"
+                name="confirmPassword"
+                type="password"
+                required
+                className="w-full py-3 pl-10 pr-4 text-slate-900 bg-slate-50 border border-slate-300 rounded-md placeholder:text-slate-400 focus:ring-2 focus:ring-inset focus:ring-violet-600 sm:text-sm dark:bg-slate-800 dark:border-slate-700 dark:text-white dark:placeholder-slate-400 focus:border-violet-500"
+                placeholder="Confirm New Password"
+                value={confirmPassword}
+                onChange={(e) => setConfirmPassword(e.target.value)}
+              />
+            </div>
+            <div>
+              <button
+                type="submit"
+                disabled={loading || success || !token}
+                className="flex items-center justify-center w-full px-4 py-3 text-sm font-semibold text-white bg-violet-600 rounded-md shadow-sm hover:bg-violet-500 focus-visible:outline focus-visible:outline-2 focus-visible:outline-offset-2 focus-visible:outline-violet-600 disabled:bg-violet-400"
+              >
+                {loading ? <Spinner size="sm" color="text-white"/> : 'Activate Account'}
+              </button>
+            </div>
+          </form>
+      </div>
+    </div>
+  );
+};
+
+export default ActivateAccountForm;
\ No newline at end of file
@@ -27,6 +27,9 @@ function getSingletonPdfWorker() {
 pdfjs.GlobalWorkerOptions.workerPort = getSingletonPdfWorker();
 // --- End Worker setup ---
 
+// Page index endpoint next to view_content (see MaterialViewSet.pages); other URLs load whole
+const pagesUrlFor = (fetchUrl) => (/\/view_content\/?$/.test(fetchUrl || '') ? fetchUrl.replace(/view_content\/?$/, 'pages/') : null);
+
 // --- COMPONENT UPDATED ---
 const PdfViewer = ({ fetchUrl, downloadFilename = "document.pdf" }) => {
   const { user } = useAuth(); // Get user role for download permissions
@@ -35,9 +38,28 @@ const PdfViewer = ({ fetchUrl, downloadFilename = "document.pdf" }) => {
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
   const [fileBlobUrl, setFileBlobUrl] = useState(null);
+  // Page mode: { pagesUrl, version } once the backend has indexed the PDF; each page is then a
+  // small standalone PDF, so page one shows without downloading the whole document
+  const [pageIndex, setPageIndex] = useState(null);
 
   const requestIdRef = useRef(0);
   const blobUrlRef = useRef(null);
+  const pageBlobsRef = useRef(new Map()); // page number -> Promise of a blob URL
+
+  const revokePageBlobs = () => {
+    pageBlobsRef.current.forEach(p => p.then(url => { try { URL.revokeObjectURL(url); } catch {} }).catch(() => {}));
+    pageBlobsRef.current = new Map();
+  };
+
+  const loadPage = (index, number) => {
+    if (!pageBlobsRef.current.has(number)) {
+      const request = apiClient.get(`${index.pagesUrl}${number}/`, { params: { v: index.version }, responseType: 'blob' })
+        .then(response => URL.createObjectURL(new Blob([response.data], { type: 'application/pdf' })));
+      request.catch(() => pageBlobsRef.current.delete(number)); // Let a later visit retry
+      pageBlobsRef.current.set(number, request);
+    }
+    return pageBlobsRef.current.get(number);
+  };
 
   useEffect(() => {
     if (!fetchUrl) {
@@ -53,11 +75,28 @@ const PdfViewer = ({ fetchUrl, downloadFilename = "document.pdf" }) => {
       setIsLoading(true);
       setError(null);
       setFileBlobUrl(null); // Clear previous blob
+      setPageIndex(null);
+      revokePageBlobs();
       if (blobUrlRef.current) {
          try { URL.revokeObjectURL(blobUrlRef.current); } catch {}
          blobUrlRef.current = null;
       }
 
+      const pagesUrl = pagesUrlFor(fetchUrl);
+      if (pagesUrl) {
+        try {
+          const { data } = await apiClient.get(pagesUrl, { signal: controller.signal });
+          if (currentId !== requestIdRef.current) return; // Stale response
+          setPageNumber(1);
+          setNumPages(data.page_count);
+          setPageIndex({ pagesUrl, version: data.version });
+          return;
+        } catch (err) {
+          if (controller.signal.aborted) return;
+          // Not indexed (older upload, not a PDF): load the whole file below
+        }
+      }
+
       try {
         const response = await apiClient.get(fetchUrl, { // Use the provided fetchUrl
           responseType: 'blob',
@@ -88,18 +127,36 @@ const PdfViewer = ({ fetchUrl, downloadFilename = "document.pdf" }) => {
     };
   }, [fetchUrl]); // Re-fetch only when the URL changes
 
-  // Revoke blob URL only when component unmounts
+  // Page mode: fetch the current page (and the next one ahead of the click)
+  useEffect(() => {
+    if (!pageIndex) return;
+    let cancelled = false;
+    setIsLoading(true);
+    loadPage(pageIndex, pageNumber)
+      .then(url => { if (!cancelled) { setFileBlobUrl(url); setIsLoading(false); } })
+      .catch(err => {
+        if (cancelled) return;
+        console.error("Failed to fetch PDF page:", err);
+        setError("Could not load this page of the document.");
+        setIsLoading(false);
+      });
+    if (pageNumber < numPages) loadPage(pageIndex, pageNumber + 1).catch(() => {});
+    return () => { cancelled = true; };
+  }, [pageIndex, pageNumber]);
+
+  // Revoke blob URLs only when component unmounts
   useEffect(() => {
     return () => {
       if (blobUrlRef.current) {
         try { URL.revokeObjectURL(blobUrlRef.current); } catch {}
         blobUrlRef.current = null;
       }
+      revokePageBlobs();
     };
   }, []);
 
   function onDocumentLoadSuccess({ numPages }) {
-    setNumPages(numPages);
+    if (!pageIndex) setNumPages(numPages); // In page mode each file is one page; the index has the count
     setIsLoading(false);
   }
 
@@ -109,6 +166,21 @@ const PdfViewer = ({ fetchUrl, downloadFilename = "document.pdf" }) => {
     setIsLoading(false);
   }
 
+  // Page mode only holds single pages, so the download fetches the full file on demand
+  const downloadFull = async () => {
+    try {
+      const response = await apiClient.get(fetchUrl, { responseType: 'blob' });
+      const url = URL.createObjectURL(new Blob([response.data], { type: response.headers['content-type'] }));
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = downloadFilename;
+      link.click();
+      setTimeout(() => URL.revokeObjectURL(url), 0);
+    } catch (err) {
+      console.error("Failed to download PDF:", err);
+    }
+  };
+
   const goToPrevPage = () => setPageNumber(prev => Math.max(prev - 1, 1));
   const goToNextPage = () => setPageNumber(prev => Math.min(prev + 1, numPages));
 
@@ -129,9 +201,11 @@ const PdfViewer = ({ fetchUrl, downloadFilename = "document.pdf" }) => {
                 <p className="text-sm">Page {pageNumber} of {numPages || '...'}</p>
                 <button onClick={goToNextPage} disabled={!numPages || pageNumber >= numPages} className="px-3 py-1 bg-white border rounded-md disabled:opacity-50 text-sm">Next</button>
                 {/* Admin can download anything */}
-                {user?.role === Role.ADMIN && (
+                {user?.role === Role.ADMIN && (pageIndex ? (
+                    <button onClick={downloadFull} className="px-3 py-1 bg-violet-600 text-white rounded-md hover:bg-violet-700 text-sm">Download</button>
+                ) : (
                     <a href={fileBlobUrl} download={downloadFilename} className="px-3 py-1 bg-violet-600 text-white rounded-md hover:bg-violet-700 text-sm">Download</a>
-                )}
+                ))}
             </div>
             <div 
               className="max-h-[60vh] overflow-auto flex justify-center border bg-slate-50" 
@@ -147,7 +221,7 @@ const PdfViewer = ({ fetchUrl, downloadFilename = "document.pdf" }) => {
                     className="prevent-print" // This class prevents printing
                 >
                     {numPages ? (
-                        <Page pageNumber={pageNumber} />
+                        <Page pageNumber={pageIndex ? 1 : pageNumber} />
                     ) : null}
                 </Document>
             </div>
@@ -207,13 +207,22 @@ const MyCourses = () => {
                              const isAbs = /^https?:\/\//i.test(raw);
                              const needsSlash = raw && !raw.startsWith('/');
                              const src = isAbs ? raw : `${BACKEND_URL}${needsSlash ? '/' : ''}${raw}`;
+                             // Resized copies (see core.thumbnails); the browser picks the smallest that fits
+                             const srcSet = (variants) => (variants || []).map(v => `${v.url} ${v.width}w`).join(', ');
+                             const variants = course.cover_variants || {};
+                             const sizes = '(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw';
                              return (
-                               <img
-                                src={src}
-                                alt={course.name}
-                                className="w-full h-full object-cover"
-                                onError={(e) => { e.currentTarget.onerror = null; e.currentTarget.style.display = 'none'; }}
-                               />
+                               <picture className="w-full h-full">
+                                {variants.webp?.length > 0 && <source type="image/webp" srcSet={srcSet(variants.webp)} sizes={sizes} />}
+                                {variants.jpeg?.length > 0 && <source type="image/jpeg" srcSet={srcSet(variants.jpeg)} sizes={sizes} />}
+                                <img
+                                 src={src}
+                                 alt={course.name}
+                                 loading="lazy"
+                                 className="w-full h-full object-cover"
+                                 onError={(e) => { e.currentTarget.onerror = null; e.currentTarget.style.display = 'none'; }}
+                                />
+                               </picture>
                              );
                          })() : (
                              <p className="font-bold text-slate-500 text-lg">{course.name}</p>
@@ -2,9 +2,12 @@
 
 import React, { createContext, useState, useContext, useEffect, useMemo, useRef } from 'react';
 import { Role } from '../types';
-import apiClient from '../api';
+import apiClient, { uploadInChunks } from '../api';
 import { useAuth } from './AuthContext';
 
+// Files above this go through the resumable upload API (see uploadInChunks in api.js)
+const CHUNKED_UPLOAD_THRESHOLD = 20 * 1024 * 1024;
+
 const DataContext = createContext(undefined);
 
 export const DataProvider = ({ children }) => {
@@ -86,69 +89,38 @@ export const DataProvider = ({ children }) => {
             try {
                 if (import.meta.env.DEV) console.debug('[DataContext] Fetching initial data for role', user.role);
 
-                // Define endpoints
-                const endpoints = [
-                    { key: 'users', url: '/users/' },
-                    { key: 'materials', url: '/materials/' },
-                    { key: 'schedules', url: '/schedules/' },
-                    { key: 'colleges', url: '/colleges/' },
-                    { key: 'trainerApplications', url: '/trainer-applications/' }, // Corrected URL
-                    { key: 'employeeApplications', url: '/employee-applications/' }, // Added
-                    { key: 'bills', url: '/bills/' },
-                    { key: 'reporting', url: '/reporting/' }, // Leaderboard + Attempts
-                    { key: 'assessments', url: '/assessments/' },
-                    { key: 'courses', url: '/courses/' },
-                    { key: 'batches', url: '/batches/' },
-                    { key: 'tasks', url: '/tasks/' },
-                    { key: 'employeeDocuments', url: '/employee-documents/' },
-                ];
-
+                // One role-scoped snapshot replaces the old per-collection fan-out.
+                // Sections the role doesn't get are simply absent from the payload.
                 const start = performance.now();
-                const results = await Promise.allSettled(endpoints.map(ep => {
-                    if (import.meta.env.DEV) console.debug('[DataContext] GET', ep.url);
-                    // Increased individual timeout
-                    return apiClient.get(ep.url, { timeout: 10000 }).catch(err => Promise.reject({ key: ep.key, error: err }));
-                }));
+                if (import.meta.env.DEV) console.debug('[DataContext] GET /bootstrap/');
+                const response = await apiClient.get('/bootstrap/', { timeout: 15000 });
                 const elapsed = (performance.now() - start).toFixed(0);
-                if (import.meta.env.DEV) console.debug('[DataContext] Fetch batch settled in', elapsed,'ms');
+                if (import.meta.env.DEV) console.debug('[DataContext] Bootstrap snapshot loaded in', elapsed,'ms');
                 if (cancelled) return;
 
-                let hadErrors = false;
-                let had401 = false;
-                results.forEach((res, idx) => {
-                    const { key } = endpoints[idx];
-                    if (res.status === 'fulfilled') {
-                        const data = res.value.data;
-                        // Safely set state, defaulting to empty arrays if data is not array
-                        switch (key) {
-                            case 'users': setUsers(Array.isArray(data) ? data : []); break;
-                            case 'materials': setMaterials(Array.isArray(data) ? data : []); break;
-                            case 'schedules': setSchedules(Array.isArray(data) ? data.map(s => ({ ...s, startDate: new Date(s.start_date), endDate: new Date(s.end_date) })) : []); break;
-                            case 'colleges': setColleges(Array.isArray(data) ? data : []); break;
-                            case 'trainerApplications': setTrainerApplications(Array.isArray(data) ? data : []); break;
-                            case 'employeeApplications': setEmployeeApplications(Array.isArray(data) ? data : []); break;
-                            case 'bills': setBills(Array.isArray(data) ? data.map(b => ({ ...b, date: new Date(b.date + 'T00:00:00') })) : []); break; // Ensure date is parsed correctly
-                            case 'assessments': setAssessments(Array.isArray(data) ? data : []); break;
-                            case 'courses': setCourses(Array.isArray(data) ? data : []); break;
-                            case 'batches': setBatches(Array.isArray(data) ? data : []); break;
-                            case 'tasks': setTasks(Array.isArray(data) ? data : []); break;
-                            case 'employeeDocuments': setEmployeeDocuments(Array.isArray(data) ? data : []); break;
-                            case 'reporting':
-                                setLeaderboard(data?.leaderboard && Array.isArray(data.leaderboard) ? data.leaderboard : []);
-                                setStudentAttempts(data?.student_attempts && Array.isArray(data.student_attempts) ? data.student_attempts.map(a => ({ ...a, timestamp: new Date(a.timestamp) })) : []);
-                                break;
-                            default:
-                                console.warn(`[DataContext] Unhandled key in fetch results: ${key}`);
-                        }
-                    } else {
-                        hadErrors = true;
-                        const respStatus = res.reason?.error?.response?.status;
-                        if (respStatus === 401) had401 = true;
-                        console.warn('[DataContext] Failed', key, res.reason?.error?.message || respStatus, 'status:', respStatus);
-                    }
-                });
-
-                if (had401) {
+                const data = response.data || {};
+                const asArray = (value) => (Array.isArray(value) ? value : []);
+                setUsers(asArray(data.users));
+                setMaterials(asArray(data.materials));
+                setSchedules(asArray(data.schedules).map(s => ({ ...s, startDate: new Date(s.start_date), endDate: new Date(s.end_date) })));
+                setColleges(asArray(data.colleges));
+                setTrainerApplications(asArray(data.trainer_applications));
+                setEmployeeApplications(asArray(data.employee_applications));
+                setBills(asArray(data.bills).map(b => ({ ...b, date: new Date(b.date + 'T00:00:00') }))); // Ensure date is parsed correctly
+                setLeaderboard(asArray(data.leaderboard));
+                setStudentAttempts(asArray(data.student_attempts).map(a => ({ ...a, timestamp: new Date(a.timestamp) })));
+                setAssessments(asArray(data.assessments));
+                setCourses(asArray(data.courses));
+                setBatches(asArray(data.batches));
+                setTasks(asArray(data.tasks));
+                setEmployeeDocuments(asArray(data.employee_documents));
+
+                setError(null);
+                fetchedRef.current = true;
+                if (import.meta.env.DEV) console.debug('[DataContext] Fetch successful, fetchedRef=true');
+            } catch (error) {
+                const status = error?.response?.status;
+                if (status === 401) {
                     setError('Session expired. Attempting to refresh...');
                     fetchedRef.current = false; // Allow refetch after potential token refresh
                     // If we haven't retried yet, schedule one quick retry to handle token race
@@ -157,23 +129,13 @@ export const DataProvider = ({ children }) => {
                         if (import.meta.env.DEV) console.debug('[DataContext] Scheduling one retry after 200ms due to 401');
                         setTimeout(() => {
                             if (!cancelled) {
-                                // allow fetch to run again
                                 fetchedRef.current = false;
-                                // trigger effect by forcing a state update harmlessly
                                 setError(e => e);
                             }
                         }, 200);
                     }
-                } else if (hadErrors) {
-                    setError('Some data failed to load. Functionality may be limited.');
-                    fetchedRef.current = true; // Mark as fetched even with partial failure
-                } else {
-                    setError(null);
-                    fetchedRef.current = true; // Mark fetch as successful only if all succeed
-                    if (import.meta.env.DEV) console.debug('[DataContext] Fetch successful, fetchedRef=true');
+                    return;
                 }
-            } catch (error) { // Catch errors not caught by Promise.allSettled
-                const status = error?.response?.status;
                 const detail = error?.response?.data;
                 console.error('[DataContext] Unexpected error during fetch batch:', { status, detail, error });
                 setError('Failed loading essential data.');
@@ -536,6 +498,14 @@ export const DataProvider = ({ children }) => {
     // Material Functions
     const addMaterial = async (materialData) => {
         try {
+            const file = materialData instanceof FormData ? materialData.get('content') : null;
+            if (file instanceof File && file.size > CHUNKED_UPLOAD_THRESHOLD) {
+                // Large files go up in resumable chunks instead of one multipart request
+                const fields = Object.fromEntries([...materialData.entries()].filter(([key]) => key !== 'content'));
+                const material = await uploadInChunks(file, fields);
+                setMaterials(prev => [material, ...prev]);
+                return;
+            }
             const response = await apiClient.post('/materials/', materialData, {
                  headers: { 'Content-Type': 'multipart/form-data' },
             });
@@ -786,6 +756,36 @@ export const DataProvider = ({ children }) => {
     };
 
     // Batch Functions
+    // Roster uploads come back either imported (import_summary) or, where the server runs an
+    // import worker, as a background job (import_job) that is polled until it settles or we give up.
+    const IMPORT_POLL_INTERVAL = 2000;
+    const IMPORT_POLL_ATTEMPTS = 150; // ~5 minutes; the job keeps running server-side after that
+    const waitForImportJob = async (jobId) => {
+        let job;
+        for (let attempt = 0; attempt < IMPORT_POLL_ATTEMPTS; attempt++) {
+            ({ data: job } = await apiClient.get(`/import-jobs/${jobId}/`));
+            if (job.status === 'COMPLETED' || job.status === 'FAILED') return job;
+            await new Promise(resolve => setTimeout(resolve, IMPORT_POLL_INTERVAL));
+        }
+        return job;
+    };
+    const importSummaryFromJob = (job) => ({
+        added_to_batch: job.added_to_batch, newly_created: job.newly_created, skipped: job.skipped,
+        errors: job.error ? [job.error, ...job.errors] : job.errors,
+    });
+    const settleImport = async (data) => {
+        if (!data.import_job) {
+            return { batchId: data.id, status: 'COMPLETED', summary: data.import_summary };
+        }
+        const job = await waitForImportJob(data.import_job.id);
+        return { batchId: job.batch, status: job.status, error: job.error, summary: importSummaryFromJob(job) };
+    };
+    const importMessage = (result) => (
+        result.status === 'COMPLETED' || result.status === 'FAILED'
+            ? JSON.stringify(result.summary)
+            : "The import is still running in the background. Refresh the batch later to see the new students."
+    );
+
     const addBatchWithStudents = async (batchData, file) => {
         const formData = new FormData();
         formData.append('course', batchData.course);
@@ -794,15 +794,21 @@ export const DataProvider = ({ children }) => {
         formData.append('start_date', batchData.start_date);
         formData.append('end_date', batchData.end_date);
         formData.append('file', file);
+        formData.append('async', 'true');
         try {
             const response = await apiClient.post('/batches/create_with_students/', formData, {
                 headers: { 'Content-Type': 'multipart/form-data' }, timeout: 60000,
             });
-            setBatches(prev => [response.data.batch || response.data, ...prev]);
+            const result = await settleImport(response.data);
+            if (result.status === 'FAILED' && !result.batchId) {
+                throw { response: { data: { error: `File processing error: ${result.error}` } } };
+            }
+            const batchRes = await apiClient.get(`/batches/${result.batchId}/`);
+            setBatches(prev => [batchRes.data, ...prev]);
              // Force user refresh after potential creations
              const usersRes = await apiClient.get('/users/');
              setUsers(usersRes.data);
-            return { success: true, message: JSON.stringify(response.data.import_summary || { added_to_batch: 'N/A', newly_created: 'N/A', skipped: 0, errors: [] }) };
+            return { success: true, message: importMessage(result) };
         } catch (error) {
             const errorMsg = error.response?.data?.error || "Could not create batch with students.";
             console.error("Failed to add batch with students:", error);
@@ -813,15 +819,18 @@ export const DataProvider = ({ children }) => {
     const addStudentsToBatchFromFile = async (batchId, file) => {
         const formData = new FormData();
         formData.append('file', file);
+        formData.append('async', 'true');
         try {
             const response = await apiClient.post(`/batches/${batchId}/add_students_from_file/`, formData, {
                 headers: { 'Content-Type': 'multipart/form-data' }, timeout: 60000,
             });
-            setBatches(prev => prev.map(b => b.id === batchId ? (response.data.batch || response.data) : b));
+            const result = await settleImport(response.data);
+            const batchRes = await apiClient.get(`/batches/${batchId}/`);
+            setBatches(prev => prev.map(b => b.id === batchId ? batchRes.data : b));
             // Force user refresh after potential creations
             const usersRes = await apiClient.get('/users/');
             setUsers(usersRes.data);
-            return { success: true, message: JSON.stringify(response.data.import_summary || { added_to_batch: 'N/A', newly_created: 'N/A', skipped: 0, errors: [] }) };
+            return { success: result.status !== 'FAILED', message: importMessage(result) };
         } catch (error) {
             const errorMsg = error.response?.data?.error || "Failed to upload students.";
             console.error("Failed to add students from file:", error);